@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+
+from label_codec import LabelCodec
+
+
+class AugmentedEpochBank:
+    """Renders a number of augmented epochs of a LicensePlateDatasetGenerator once and stores them as uint8 arrays
+    on disk, so that later epochs and runs stream the images at disk speed instead of augmenting them again.
+
+    A bank lives in <bank_dir>/<version>, the version is a hash of the source datasets, the augmentation parameters,
+    the training split and the number of epochs. If any of them change, a new bank is rendered next to the others,
+    so that runs with different datasets or seeds can share the bank directory. Banks of other versions are only
+    removed on request (prune).
+    """
+
+    @staticmethod
+    def __fingerprint__(path):
+        # size and modification time of the dataset file, or of every file of a MemmapDataset directory
+        paths = [path] if os.path.isfile(path) else \
+            sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+        return [(os.path.basename(p), os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in paths]
+
+    @staticmethod
+    def version(generator, source_paths, num_epochs, seed=None):
+        key = {"sources": [AugmentedEpochBank.__fingerprint__(p) for p in source_paths],
+               "augmentation": generator.augmentor.get_config(),
+               # the rows of the split, not their shuffled order, which changes with every unseeded generator
+               "split": hashlib.sha1(np.sort(generator.indexes)).hexdigest(),
+               "num_images": generator.numImages, "max_text_len": generator.max_text_len,
+               "num_epochs": num_epochs, "seed": seed}
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+    @staticmethod
+    def exists(bank_path):
+        return os.path.isfile(os.path.join(bank_path, "meta.json"))
+
+    @staticmethod
+    def render(bank_dir, generator, source_paths, num_epochs, seed=None, prune=False):
+        """Returns the path of the bank for the generator, renders it first if there is no bank of this version.
+        With prune, the complete banks of other versions are removed first."""
+        version = AugmentedEpochBank.version(generator, source_paths, num_epochs, seed)
+        bank_path = os.path.join(bank_dir, version)
+        if AugmentedEpochBank.exists(bank_path):
+            print("[INFO] using augmented epoch bank {}".format(bank_path))
+            return bank_path
+
+        # banks being rendered (.tmp) may belong to other processes and are never removed
+        if prune and os.path.isdir(bank_dir):
+            for stale in os.listdir(bank_dir):
+                if not AugmentedEpochBank.exists(os.path.join(bank_dir, stale)):
+                    continue
+                print("[INFO] removing outdated epoch bank {}".format(os.path.join(bank_dir, stale)))
+                shutil.rmtree(os.path.join(bank_dir, stale), ignore_errors=True)
+
+        # rendered aside per process, runs of the same version do not write into each other's files
+        tmp_path = "{}.{}.tmp".format(bank_path, os.getpid())
+        os.makedirs(tmp_path, exist_ok=True)
+
+        rows = num_epochs * generator.numImages
+        # stored in the input layout of the model (width, height), batches need no transposition
+        images = np.lib.format.open_memmap(os.path.join(tmp_path, "images.npy"), mode="w+", dtype=np.uint8,
+                                           shape=(rows, generator.img_w, generator.img_h))
+        labels = np.lib.format.open_memmap(os.path.join(tmp_path, "labels.npy"), mode="w+", dtype=np.float32,
+                                           shape=(rows, generator.max_text_len))
+        label_lengths = np.lib.format.open_memmap(os.path.join(tmp_path, "label_lengths.npy"), mode="w+",
+                                                  dtype=np.int32, shape=(rows,))
+
+        order_random = random.Random(seed)
+        row = 0
+        for epoch in range(num_epochs):
+            indexes = list(generator.indexes)
+            order_random.shuffle(indexes)
+            for index in indexes:
+                image = generator.augmentor.generate_plate_image(generator.images[index])
+                number = generator.labels[index]
+                images[row] = np.round(image.T * 255.) if generator.augmentor.normalize else image.T
+                labels[row] = 1
+                labels[row, 0:len(number)] = LabelCodec.encode_number(number)
+                label_lengths[row] = len(number)
+                row += 1
+            print("[INFO] rendered augmented epoch {}/{}".format(epoch + 1, num_epochs))
+
+        for array in (images, labels, label_lengths):
+            array.flush()
+        del images, labels, label_lengths
+
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"num_epochs": num_epochs, "num_images": generator.numImages, "rows": rows}, f)
+        try:
+            os.replace(tmp_path, bank_path)
+        except OSError:
+            # another run has completed the same version first
+            if not AugmentedEpochBank.exists(bank_path):
+                raise
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        print("[INFO] augmented epoch bank saved to {}".format(bank_path))
+        return bank_path
+
+
+class AugmentedEpochBankGenerator:
+    """Streams batches from an AugmentedEpochBank in the format of LicensePlateDatasetGenerator.
+
+    Batches are contiguous rows of the bank and are read in a shuffled order, so that every read is sequential.
+    With fresh_ratio > 0, that fraction of every batch is replaced by images augmented on the fly by the wrapped
+    generator, which keeps some variety beyond the rendered epochs.
+    """
+
+    def __init__(self, bank_path, generator, fresh_ratio=0., seed=None):
+        self.images = np.load(os.path.join(bank_path, "images.npy"), mmap_mode="r")
+        self.labels = np.load(os.path.join(bank_path, "labels.npy"), mmap_mode="r")
+        self.label_lengths = np.load(os.path.join(bank_path, "label_lengths.npy"), mmap_mode="r")
+
+        self.dataset_generator = generator
+        self.batch_size = generator.batch_size
+        self.numImages = generator.numImages
+        self.input_length = generator.input_length
+        self.fresh_size = int(round(fresh_ratio * self.batch_size))
+        self.normalize = generator.augmentor.normalize
+
+        self.random = random.Random(seed)
+        self.batches = list(range(len(self.images) // self.batch_size))
+        self.random.shuffle(self.batches)
+        self.batch_index = 0
+
+    def next_batch(self):
+        if self.batch_index >= len(self.batches):
+            self.batch_index = 0
+            self.random.shuffle(self.batches)
+
+        start = self.batches[self.batch_index] * self.batch_size
+        self.batch_index += 1
+        rows = slice(start, start + self.batch_size)
+        images = self.images[rows].astype(np.float32) / 255. if self.normalize else np.array(self.images[rows])
+        return (images, np.array(self.labels[rows], dtype=np.float64),
+                np.array(self.label_lengths[rows], dtype=np.float64))
+
+    def generator(self, passes=np.inf):
+        epochs = 0
+        while epochs < passes:
+            images, labels, label_lengths = self.next_batch()
+            input_length = np.ones((self.batch_size, 1)) * self.input_length
+
+            if self.fresh_size > 0:
+                # fresh augmentations of random plates of the same split
+                x_data, y_data = self.dataset_generator.next_batch()
+                for i, (image, number) in enumerate(zip(x_data[:self.fresh_size], y_data[:self.fresh_size])):
+                    images[i] = self.dataset_generator.augmentor.generate_plate_image(image).T
+                    labels[i] = 1
+                    labels[i, 0:len(number)] = LabelCodec.encode_number(number)
+                    label_lengths[i] = len(number)
+
+            yield {'input': np.expand_dims(images, -1), 'labels': labels, 'input_length': input_length,
+                   'label_length': np.expand_dims(label_lengths, -1)}
+
+            epochs += 1
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class BackgroundTileBank:
+    """Pre-cropped background tiles of the augmentor output size, held as one contiguous uint8 array of shape
+    (num_tiles, height, width).
+
+    Instead of random-cropping a window out of a full background image for every plate, the augmentor gathers the
+    tiles of a whole batch with a single fancy index. The bank can be saved as .npy and loaded memory-mapped, so that
+    several training processes share it, and refreshed with new crops in a background thread to keep the variety of
+    the backgrounds.
+    """
+
+    def __init__(self, background_images, tile_shape, num_tiles=20000, seed=None, tiles=None):
+        self.background_images = background_images
+        self.tile_shape = tuple(tile_shape)
+        self.num_tiles = num_tiles
+        self.random = np.random.RandomState(seed)
+
+        self.tiles = self.crop(num_tiles) if tiles is None else tiles
+        self.refreshes = 0
+        self.__stop__ = None
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def crop(self, n):
+        # random windows of random backgrounds, gathered with one fancy index instead of n slices
+        height, width = self.tile_shape
+        images = self.random.randint(len(self.background_images), size=n)
+        ys = self.random.randint(self.background_images.shape[1] - height + 1, size=n)
+        xs = self.random.randint(self.background_images.shape[2] - width + 1, size=n)
+
+        # sorted reads are sequential for memory-mapped backgrounds
+        order = np.argsort(images, kind="stable")
+        rows = ys[order, None, None] + np.arange(height)[None, :, None]
+        columns = xs[order, None, None] + np.arange(width)[None, None, :]
+        tiles = np.empty((n, height, width), dtype=np.uint8)
+        tiles[order] = np.asarray(self.background_images)[images[order, None, None], rows, columns]
+        return tiles
+
+    def sample(self, n, random_state=None):
+        """Returns n random tiles as an (n, height, width) uint8 array."""
+        random_state = self.random if random_state is None else random_state
+        tiles = self.tiles
+        return tiles[random_state.randint(len(tiles), size=n)]
+
+    def refresh(self):
+        # the new tiles are cropped aside and swapped in at once, samplers never see a half refreshed bank
+        self.tiles = self.crop(self.num_tiles)
+        self.refreshes += 1
+
+    def start_refresh(self, interval):
+        """Refreshes the bank every interval seconds in a daemon thread, until stop_refresh is called."""
+        self.stop_refresh()
+        self.__stop__ = threading.Event()
+
+        def run(stop):
+            while not stop.wait(interval):
+                self.refresh()
+
+        threading.Thread(target=run, args=(self.__stop__,), daemon=True).start()
+
+    def stop_refresh(self):
+        if self.__stop__ is not None:
+            self.__stop__.set()
+            self.__stop__ = None
+
+    def save(self, path):
+        # written aside and renamed, so that processes loading the bank never see a partial file
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, self.tiles)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def load(path, background_images=None, seed=None):
+        # memory-mapped read-only, a refresh replaces the mapping by an in-memory array
+        tiles = np.load(path, mmap_mode="r")
+        return BackgroundTileBank(background_images, tiles.shape[1:], len(tiles), seed, tiles=tiles)
+
+    @staticmethod
+    def create(background_images, tile_shape, num_tiles=20000, seed=None, path=None):
+        """Returns the bank saved at path if it has the tile shape and size, crops and saves a new one otherwise."""
+        if path is not None and os.path.isfile(path):
+            bank = BackgroundTileBank.load(path, background_images, seed)
+            if bank.tile_shape == tuple(tile_shape) and len(bank) == num_tiles:
+                print("[INFO] using background tile bank {}".format(path))
+                return bank
+
+        start = time.perf_counter()
+        bank = BackgroundTileBank(background_images, tile_shape, num_tiles, seed)
+        print("[INFO] cropped {} background tiles in {:.1f}s".format(num_tiles, time.perf_counter() - start))
+        if path is not None:
+            bank.save(path)
+        return bank
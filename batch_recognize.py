@@ -0,0 +1,212 @@
+"""
+Usage:
+
+# Recognize all images of a directory tree (or a tar archive) with 8 worker processes:
+python batch_recognize.py --input=<PATH_TO_IMAGES_OR_TAR> --output=<PATH_TO_OUTPUT>/results.csv --workers=8 --detection_model=output/plate_detection/glpd-model.tflite --recognition_model=output/license_recognition/glpr-model.tflite
+
+Results are appended to the output file (.csv or .parquet) as they arrive. The keys of completed images are stored in
+<output>.done, so an interrupted run continues where it stopped when started again with the same arguments.
+Images which can't be read or decoded are reported as failed and listed in <output>.failed, a later run tries them
+again.
+
+"""
+
+import argparse
+import csv
+import os
+import tarfile
+import time
+from collections import defaultdict
+from itertools import islice
+from multiprocessing import Pool
+
+from config.license_recognition import config
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+RESULT_COLUMNS = ["key", "number", "score", "ymin", "xmin", "ymax", "xmax"]
+
+# pipeline of the current worker process, every worker holds its own interpreters
+pipeline = None
+
+
+def init_worker(detection_model, recognition_model, score_threshold, num_threads):
+    global pipeline
+    from utils.inference import LicensePlatePipeline
+
+    pipeline = LicensePlatePipeline(detection_model, recognition_model, config.IMAGE_WIDTH, config.IMAGE_HEIGHT,
+                                    score_threshold, num_threads)
+
+
+def recognize(item):
+    # returns the result row, or the error if the image failed, one bad image must not abort the whole batch
+    key, path, buffer = item
+    start = time.perf_counter()
+
+    try:
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = f.read()
+
+        image = pipeline.decode_image(buffer)
+        if image is None:
+            return [key], "not decodable", os.getpid(), time.perf_counter() - start
+        number, box, score = pipeline.process(image)
+    except Exception as e:
+        return [key], "{}: {}".format(type(e).__name__, e), os.getpid(), time.perf_counter() - start
+
+    box = [None] * 4 if box is None else [float(c) for c in box]
+    return [key, number, score] + box, None, os.getpid(), time.perf_counter() - start
+
+
+def list_directory(input_dir):
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, input_dir), path, None
+
+
+def list_archive(archive_path):
+    # stream the archive member by member, the member list is never held in memory
+    with tarfile.open(archive_path, mode="r|*") as tar:
+        for member in tar:
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                f = tar.extractfile(member)
+                yield member.name, None, f.read()
+
+
+class CsvResultWriter:
+    def __init__(self, output_path):
+        exists = os.path.exists(output_path)
+        self.file = open(output_path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(RESULT_COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    def __init__(self, output_path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # parquet files can't be appended, a resumed run writes an additional part file
+        root, ext = os.path.splitext(output_path)
+        part = 0
+        while os.path.exists(output_path):
+            part += 1
+            output_path = "{}.part{:03d}{}".format(root, part, ext)
+
+        self.pa = pa
+        self.schema = pa.schema([("key", pa.string()), ("number", pa.string()), ("score", pa.float32()),
+                                 ("ymin", pa.float32()), ("xmin", pa.float32()), ("ymax", pa.float32()),
+                                 ("xmax", pa.float32())])
+        self.writer = pq.ParquetWriter(output_path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(c, type=f.type) for c, f in zip(columns, self.schema)], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.completed = set(line.rstrip("\n") for line in f)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def add(self, keys):
+        self.file.writelines(key + "\n" for key in keys)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Parallel offline license plate recognition")
+    parser.add_argument("--input", help="Image directory tree or tar archive", type=str, required=True)
+    parser.add_argument("--output", help="Result file (.csv or .parquet)", type=str, required=True)
+    parser.add_argument("--detection_model", help="Path to the plate detection TFLite model", type=str,
+                        default="output/plate_detection/glpd-model.tflite")
+    parser.add_argument("--recognition_model", help="Path to the license recognition TFLite model", type=str,
+                        default="output/license_recognition/glpr-model.tflite")
+    parser.add_argument("--workers", help="Number of worker processes", type=int, default=os.cpu_count())
+    parser.add_argument("--threads", help="Interpreter threads per worker", type=int, default=1)
+    parser.add_argument("--score_threshold", help="Minimum plate detection score", type=float, default=0.5)
+    parser.add_argument("--chunk_size", help="Images per write and checkpoint", type=int, default=256)
+    args = parser.parse_args()
+
+    items = list_archive(args.input) if os.path.isfile(args.input) else list_directory(args.input)
+
+    checkpoint = Checkpoint(args.output + ".done")
+    items = (item for item in items if item[0] not in checkpoint.completed)
+    print("[INFO] {} images already processed".format(len(checkpoint.completed)))
+
+    writer = ParquetResultWriter(args.output) if args.output.endswith(".parquet") else CsvResultWriter(args.output)
+
+    worker_images = defaultdict(int)
+    worker_time = defaultdict(float)
+    total = failed = 0
+    failed_file = open(args.output + ".failed", "a", encoding="utf-8")
+    start = time.perf_counter()
+
+    with Pool(args.workers, initializer=init_worker,
+              initargs=(args.detection_model, args.recognition_model, args.score_threshold, args.threads)) as pool:
+        while True:
+            # only a bounded window of images is in flight, tar members are read as the workers catch up
+            chunk = list(islice(items, args.chunk_size))
+            if not chunk:
+                break
+
+            rows = []
+            for row, error, pid, elapsed in pool.imap_unordered(recognize, chunk, chunksize=4):
+                worker_images[pid] += 1
+                worker_time[pid] += elapsed
+                if error is not None:
+                    # failed images are neither written nor checkpointed
+                    print("[WARNING] failed {}: {}".format(row[0], error))
+                    failed_file.write("{}\t{}\n".format(row[0], error))
+                    failed += 1
+                    continue
+                rows.append(row)
+
+            # results are written before the checkpoint, a crash in between only repeats work
+            if rows:
+                writer.write(rows)
+                checkpoint.add(row[0] for row in rows)
+
+            failed_file.flush()
+            total += len(rows)
+            print("[INFO] {} images, {:.1f} images/sec".format(total, total / (time.perf_counter() - start)))
+
+    writer.close()
+    checkpoint.close()
+    failed_file.close()
+
+    elapsed = time.perf_counter() - start
+    for pid in sorted(worker_images):
+        print("[INFO] worker {}: {} images, {:.1f} images/sec".format(
+            pid, worker_images[pid], worker_images[pid] / max(worker_time[pid], 1e-9)))
+    print("[INFO] {} images in {:.1f} sec, {:.1f} images/sec overall".format(total, elapsed, total / max(elapsed, 1e-9)))
+    if failed:
+        print("[WARNING] {} images failed, see {}".format(failed, args.output + ".failed"))
+
+
+if __name__ == '__main__':
+    main()
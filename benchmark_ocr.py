@@ -0,0 +1,50 @@
+"""
+Usage:
+
+# Compare parameters, MACs and TFLite CPU latency of the OCR architectures:
+python benchmark_ocr.py --builders=conv_bgru,ds_cnn_bgru,ds_cnn_ctc --threads=1 --runs=200
+
+"""
+
+import argparse
+
+from tensorflow.keras.models import Model
+
+from config.license_recognition import config
+from label_codec import LabelCodec
+from utils.nn.conv import OCR
+from utils.nn.export import TFLiteExporter
+from utils.nn.profiling import ModelProfiler
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Params/MACs/latency table of the OCR architectures")
+    parser.add_argument("--builders", help="Comma separated OCR builders, the first one is the baseline", type=str,
+                        default="conv_bgru,conv_blstm,vgg_bgru,ds_cnn_bgru,ds_cnn_ctc")
+    parser.add_argument("--threads", help="TFLite interpreter threads", type=int, default=1)
+    parser.add_argument("--runs", help="Timed inference runs per model", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = []
+    for builder in args.builders.split(","):
+        inputs, outputs = getattr(OCR, builder)((config.IMAGE_WIDTH, config.IMAGE_HEIGHT, 1),
+                                                len(LabelCodec.ALPHABET) + 1)
+        model = Model(inputs=inputs, outputs=outputs)
+
+        tflite_model = TFLiteExporter.convert(model)
+        median, p90 = ModelProfiler.tflite_latency(tflite_model, args.runs, num_threads=args.threads)
+        rows.append((builder, ModelProfiler.count_params(model), ModelProfiler.count_macs(model),
+                     len(tflite_model), median, p90))
+
+    baseline = rows[0]
+    print("| {:<12} | {:>10} | {:>8} | {:>10} | {:>10} | {:>10} | {:>10} |".format(
+        "builder", "params", "MMACs", "tflite KB", "median ms", "p90 ms", "speedup"))
+    print("|" + "|".join(["-" * 14] + ["-" * 12] + ["-" * 10] + ["-" * 12] * 4) + "|")
+    for builder, params, macs, size, median, p90 in rows:
+        print("| {:<12} | {:>10,} | {:>8.1f} | {:>10.0f} | {:>10.2f} | {:>10.2f} | {:>9.1f}x |".format(
+            builder, params, macs / 1e6, size / 1024., median, p90, baseline[4] / median))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Usage:
+
+# Measure cold-start time (imports + model loading + first inference) of the inference path:
+python benchmark_startup.py --detection_model=output/plate_detection/glpd-model.tflite --recognition_model=output/license_recognition/glpr-model.tflite --image=<PATH_TO_TEST_IMAGE> --runs=5
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# executed in a fresh interpreter for every run, so that nothing is cached between the measurements
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import numpy as np
+from config.license_recognition import config
+from utils.inference import LicensePlatePipeline
+from utils.inference.interpreter import get_interpreter_class
+import_time = time.perf_counter() - start
+
+start = time.perf_counter()
+pipeline = LicensePlatePipeline(sys.argv[1], sys.argv[2], config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
+load_time = time.perf_counter() - start
+
+image = LicensePlatePipeline.load_image(sys.argv[3]) if sys.argv[3] else np.zeros((480, 640, 3), dtype=np.uint8)
+
+start = time.perf_counter()
+pipeline.process(image)
+first_inference_time = time.perf_counter() - start
+
+print(json.dumps({
+    "import": import_time,
+    "load": load_time,
+    "first_inference": first_inference_time,
+    "backend": get_interpreter_class().__module__,
+    "heavy_modules": [m for m in ("tensorflow", "keras", "h5py") if m in sys.modules],
+}))
+"""
+
+
+def run_once(detection_model, recognition_model, image):
+    output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, detection_model, recognition_model, image or ""],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True,
+                            text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the license plate inference path")
+    parser.add_argument("--detection_model", help="Path to the plate detection TFLite model", type=str,
+                        required=True)
+    parser.add_argument("--recognition_model", help="Path to the license recognition TFLite model", type=str,
+                        required=True)
+    parser.add_argument("--image", help="Test image, a black frame is used if omitted", type=str, default=None)
+    parser.add_argument("--runs", help="Number of fresh interpreter runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once(args.detection_model, args.recognition_model, args.image) for _ in range(args.runs)]
+
+    print("Interpreter backend: {}".format(results[0]["backend"]))
+    print("Heavy modules loaded: {}".format(", ".join(results[0]["heavy_modules"]) or "none"))
+    print("{:<16} {:>10} {:>10} {:>10}".format("phase", "median ms", "min ms", "max ms"))
+    for phase in ["import", "load", "first_inference"]:
+        times = [r[phase] * 1000. for r in results]
+        print("{:<16} {:>10.1f} {:>10.1f} {:>10.1f}".format(phase, statistics.median(times), min(times), max(times)))
+
+    totals = [(r["import"] + r["load"] + r["first_inference"]) * 1000. for r in results]
+    print("{:<16} {:>10.1f} {:>10.1f} {:>10.1f}".format("total", statistics.median(totals), min(totals), max(totals)))
+
+
+if __name__ == '__main__':
+    main()
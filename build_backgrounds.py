@@ -0,0 +1,155 @@
+"""
+Usage:
+
+# Build the background dataset of notebook 3 from the SUN2012 archive with 8 decoder processes, about 100000 images:
+python build_backgrounds.py --archive=data/license_recognition/SUN2012.tar.gz --output=data/license_recognition/background.h5 --max_items=100000 --workers=8
+
+The archive is read as a stream. Every image gets a key from the hash of its name, the first pass over the member
+headers keeps the --max_items images with the smallest keys (reservoir sampling, a uniform sample over all categories
+although the archive is ordered by category), the second pass decodes them. Without a cap (--max_items=0) the
+images are taken by --fraction in a single pass. The keys are stable, so a run which is started again with the same
+arguments selects the same images and continues after the last one written.
+
+"""
+
+import argparse
+import collections
+import heapq
+import os
+import tarfile
+import time
+import zlib
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from utils.io import HDF5DatasetWriter
+
+
+def sample_key(name, seed):
+    # pseudo-random key of a member, independent of the archive order and stable across runs
+    return zlib.crc32("{}:{}".format(seed, name).encode("utf-8"))
+
+
+def is_selected(name, fraction, seed):
+    # O(1) sampling decision per member, independent of the archive size
+    return sample_key(name, seed) < fraction * 2 ** 32
+
+
+def decode(item):
+    name, buffer, size = item
+    image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return name, None  # skip non image files
+
+    # make same width and height, by cutting the larger dimension to the smaller dimension
+    if image.shape[0] > image.shape[1]:
+        image = image[:image.shape[1], :]
+    else:
+        image = image[:, :image.shape[0]]
+
+    # resize to target-width and -height
+    if image.shape[0] != size:
+        image = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+    return name, image
+
+
+def image_members(tar, prefix):
+    # stream the archive member by member, the member list is never held in memory
+    for member in tar:
+        name = member.name[2:] if member.name.startswith("./") else member.name
+        if member.isfile() and name.startswith(prefix) and name.lower().endswith(".jpg"):
+            yield name, member
+
+
+def sample_names(archive_path, prefix, fraction, seed, max_items):
+    # reservoir sampling over the member headers, nothing is extracted: a bounded heap of the max_items
+    # selected names with the smallest keys
+    heap = []
+    with tarfile.open(archive_path, mode="r|*") as tar:
+        for name, _ in image_members(tar, prefix):
+            key = sample_key(name, seed)
+            if key >= fraction * 2 ** 32:
+                continue
+            if len(heap) < max_items:
+                heapq.heappush(heap, (-key, name))
+            elif (-key, name) > heap[0]:
+                heapq.heapreplace(heap, (-key, name))
+    return {name for _, name in heap}
+
+
+def list_selected(archive_path, prefix, fraction, seed, done, selected=None):
+    # the sampled names, or without a sample the images selected by fraction
+    with tarfile.open(archive_path, mode="r|*") as tar:
+        for name, member in image_members(tar, prefix):
+            taken = is_selected(name, fraction, seed) if selected is None else name in selected
+            if not taken or name in done:
+                continue
+            yield name, tar.extractfile(member).read()
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Build the background image dataset from the SUN2012 archive")
+    parser.add_argument("--archive", type=str, default="data/license_recognition/SUN2012.tar.gz")
+    parser.add_argument("--output", help="HDF5 output file, continued if it exists", type=str,
+                        default="data/license_recognition/background.h5")
+    parser.add_argument("--prefix", help="Path prefix of the images in the archive", type=str,
+                        default="SUN2012/Images/")
+    parser.add_argument("--fraction", help="Fraction of the images to take", type=float, default=1.)
+    parser.add_argument("--max_items", help="Number of images, a uniform sample of the selected images, 0: all",
+                        type=int, default=100000)
+    parser.add_argument("--size", help="Width and height of the background images", type=int, default=256)
+    parser.add_argument("--workers", help="Decoder processes", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", help="Seed of the sampling decisions", type=int, default=0)
+    args = parser.parse_args()
+
+    writer = HDF5DatasetWriter((args.max_items, args.size, args.size), args.output, bufSize=1000, append=True)
+    # the images are written in archive order and labeled with their name, which tells a resumed run what is done
+    done = set(l.decode("utf-8") if isinstance(l, bytes) else l for l in writer.labels[:writer.idx])
+    if done:
+        print("[INFO] continuing {} with {} images".format(args.output, len(done)))
+
+    start = time.perf_counter()
+    selected = None
+    if args.max_items:
+        selected = sample_names(args.archive, args.prefix, args.fraction, args.seed, args.max_items)
+        print("[INFO] sampled {} images in {:.1f}s".format(len(selected), time.perf_counter() - start))
+    max_items = args.max_items or np.inf
+
+    written, skipped = writer.idx, 0
+    window = collections.deque()
+    items = ((name, buffer, args.size) for name, buffer in
+             list_selected(args.archive, args.prefix, args.fraction, args.seed, done, selected))
+
+    def write(result):
+        nonlocal written, skipped
+        name, image = result
+        if image is None or written >= max_items:
+            skipped += image is None
+            return
+        writer.add([image], [name])
+        written += 1
+        if written % 1000 == 0:
+            print("[INFO] {} images, {:.0f} images/sec".format(written, (written - len(done)) /
+                                                              (time.perf_counter() - start)))
+
+    with Pool(args.workers) as pool:
+        for item in items:
+            if written >= max_items:
+                break
+            # a bounded window of decodes in flight, results are written in archive order
+            window.append(pool.apply_async(decode, (item,)))
+            if len(window) >= 4 * args.workers:
+                write(window.popleft().get())
+        while window:
+            write(window.popleft().get())
+
+    writer.close()
+    print("[INFO] {} images saved to {} ({} not decodable) in {:.1f}s".format(written, args.output, skipped,
+                                                                               time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
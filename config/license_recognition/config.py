@@ -3,5 +3,5 @@ IMAGE_WIDTH = 128
 IMAGE_HEIGHT = 64
 
 # license number construction
-DOWNSAMPLE_FACTOR = 2 ** 2  # <= pool size ** number of pool layers
+DOWNSAMPLE_FACTOR = 2 ** 2  # <= pool size ** number of pool layers, OCRSpec.downsample_factor for custom specs
 MAX_TEXT_LEN = 10
@@ -0,0 +1,96 @@
+"""
+Usage:
+
+# Distill a trained conv_bgru teacher into a small ds_cnn_bgru student and export the student to TFLite:
+python distill.py --teacher_model=output/license_recognition/adagrad/glpr-model.h5 --student=ds_cnn_bgru --optimizer=adam --output_path=output/license_recognition/distilled
+
+"""
+
+import argparse
+import os
+from itertools import islice
+
+from tensorflow.keras.models import Model, load_model
+
+from config.license_recognition import config
+from label_codec import LabelCodec
+from train_helper import TrainHelper
+from utils.nn.compression import Distiller
+from utils.nn.conv import OCR
+from utils.nn.export import TFLiteExporter
+from utils.nn.profiling import ModelProfiler
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Knowledge distillation of the license recognition model")
+    parser.add_argument("--teacher_model", help="Trained predict model (.h5) used as teacher", type=str,
+                        required=True)
+    parser.add_argument("--student", help="OCR builder of the student model", type=str, default="ds_cnn_bgru")
+    parser.add_argument("--plates", help="HDF5 license plate dataset", type=str,
+                        default="data/license_recognition/glp.h5")
+    parser.add_argument("--backgrounds", help="HDF5 background dataset", type=str,
+                        default="data/license_recognition/background.h5")
+    parser.add_argument("--alpha", help="Weight of the distillation loss", type=float, default=0.5)
+    parser.add_argument("--temperature", help="Softmax temperature of the distillation loss", type=float,
+                        default=2.0)
+    parser.add_argument("--optimizer", help="sdg, rmsprop, adam, adagrad or adadelta", type=str, default="adam")
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--epochs", help="Maximum number of epochs", type=int, default=1000)
+    parser.add_argument("--eval_steps", help="Test batches for the accuracy report", type=int, default=20)
+    parser.add_argument("--output_path", type=str, default="output/license_recognition/distilled")
+    parser.add_argument("--model_name", type=str, default="glpr-student-model")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_path, exist_ok=True)
+    model_weights_path = os.path.join(args.output_path, args.model_name) + "-weights.h5"
+    model_path = os.path.join(args.output_path, args.model_name) + ".h5"
+    tflite_model_path = os.path.join(args.output_path, args.model_name) + ".tflite"
+
+    train_generator, val_generator, test_generator = TrainHelper.create_generators(
+        args.plates, args.backgrounds, config.IMAGE_WIDTH, config.IMAGE_HEIGHT, config.DOWNSAMPLE_FACTOR,
+        config.MAX_TEXT_LEN, args.batch_size)
+
+    teacher = load_model(args.teacher_model, compile=False)
+    inputs, outputs = getattr(OCR, args.student)((config.IMAGE_WIDTH, config.IMAGE_HEIGHT, 1),
+                                                 len(LabelCodec.ALPHABET) + 1)
+    student = Model(inputs=inputs, outputs=outputs)
+    student.summary()
+
+    distiller = Distiller(student, teacher, args.alpha, args.temperature)
+    distiller.compile(optimizer=TrainHelper.get_optimizer(args.optimizer))
+
+    distiller.fit(
+        train_generator.generator(),
+        steps_per_epoch=train_generator.numImages // args.batch_size,
+        validation_data=val_generator.generator(),
+        validation_steps=val_generator.numImages // args.batch_size,
+        epochs=args.epochs,
+        callbacks=TrainHelper.get_callbacks(args.output_path, args.model_name, args.optimizer, model_weights_path),
+        verbose=1)
+
+    # restore the best weights and export the student through the regular TFLite conversion
+    distiller.load_weights(model_weights_path)
+    student.save(model_path, save_format="h5")
+    student_tflite = TFLiteExporter.save(student, tflite_model_path)
+    teacher_tflite = TFLiteExporter.convert(teacher)
+
+    # both models are evaluated on the same augmented test batches
+    batches = list(islice(test_generator.generator(), args.eval_steps))
+    teacher_accuracy = TrainHelper.evaluate_accuracy(teacher, batches)
+    student_accuracy = TrainHelper.evaluate_accuracy(student, batches)
+    teacher_latency, _ = ModelProfiler.tflite_latency(teacher_tflite)
+    student_latency, _ = ModelProfiler.tflite_latency(student_tflite)
+
+    print("[INFO] {:<8} {:>10} {:>10} {:>12}".format("model", "params", "accuracy", "latency ms"))
+    print("[INFO] {:<8} {:>10,} {:>10.4f} {:>12.2f}".format("teacher", teacher.count_params(), teacher_accuracy,
+                                                            teacher_latency))
+    print("[INFO] {:<8} {:>10,} {:>10.4f} {:>12.2f}".format("student", student.count_params(), student_accuracy,
+                                                            student_latency))
+    print("[INFO] accuracy gap: {:.4f}, latency speedup: {:.1f}x".format(teacher_accuracy - student_accuracy,
+                                                                         teacher_latency / student_latency))
+    print("[INFO] student model saved to {} and {}".format(model_path, tflite_model_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Usage:
+
+# Fetch 1000 license numbers as front and rear plates from the plate generator web service, at most 5 requests/sec:
+python fetch_plates.py --count=1000 --rate=5 --concurrency=8 --output=data/license_recognition/glp-web.h5
+
+# The same against a local stand-in server which fails 10% of the requests, without network access:
+python fetch_plates.py --count=100 --stand_in --failure_rate=0.1 --rate=0 --output=output/glp-stand-in.h5
+
+An interrupted run can be started again with the same output, it samples the same license numbers with the seed
+stored in the dataset and skips the plates already in the dataset.
+
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from utils.io import HDF5DatasetWriter
+from utils.synthesis import AsyncPlateFetcher, CountyRegistry, LicenseNumberSampler, StandInPlateServer
+
+
+async def fetch(args, jobs, writer):
+    runner = None
+    base_url = args.base_url
+    if args.stand_in:
+        runner, base_url = await StandInPlateServer(failure_rate=args.failure_rate,
+                                                    corrupt_rate=args.failure_rate / 2.).start()
+        print("[INFO] stand-in server listening on {}".format(base_url))
+
+    try:
+        fetcher = AsyncPlateFetcher(base_url, rate=args.rate, concurrency=args.concurrency, retries=args.retries)
+        return await fetcher.run(jobs, writer)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Fetch license plate images from the plate generator web service")
+    parser.add_argument("--count", help="Number of license numbers", type=int, default=1000)
+    parser.add_argument("--variants", help="F (front plate with inspection sticker), R (rear plate) or FR", type=str,
+                        default="FR")
+    parser.add_argument("--counties", help="County codes CSV", type=str,
+                        default="data/license_recognition/KFZ-Deutschland-2017-06-20.csv")
+    parser.add_argument("--states", help="German states JSON", type=str,
+                        default="data/license_recognition/german_states.json")
+    parser.add_argument("--base_url", type=str, default=AsyncPlateFetcher.BASE_URL)
+    parser.add_argument("--rate", help="Maximum requests per second over all connections, 0: unlimited", type=float,
+                        default=5.)
+    parser.add_argument("--concurrency", help="Plates fetched at the same time", type=int, default=8)
+    parser.add_argument("--retries", help="Retries of a failed plate", type=int, default=5)
+    parser.add_argument("--stand_in", help="Fetch from a local stand-in server", action="store_true")
+    parser.add_argument("--failure_rate", help="Failing requests of the stand-in server", type=float, default=0.1)
+    parser.add_argument("--seed", help="Seed of the license numbers, random for a new output, the seed stored in "
+                                       "the output when it is continued", type=int, default=None)
+    parser.add_argument("--output", help="HDF5 output file, continued if it exists", type=str,
+                        default="data/license_recognition/glp-web.h5")
+    args = parser.parse_args()
+
+    writer = HDF5DatasetWriter((args.count * len(args.variants), 32, 151), args.output, bufSize=100, append=True,
+                               metaKey="variants")
+    # the seed is stored with the plates, so that a continued run samples the same license numbers
+    seed = writer.db.attrs.get("seed")
+    if seed is None:
+        seed = np.random.randint(2 ** 31) if args.seed is None else args.seed
+        writer.db.attrs["seed"] = seed
+    elif args.seed is not None and args.seed != seed:
+        writer.close()
+        raise ValueError("{} was fetched with seed {}, not {}".format(args.output, seed, args.seed))
+    print("[INFO] sampling license numbers with seed {}".format(seed))
+
+    registry = CountyRegistry.load(args.counties, args.states)
+    numbers, states = LicenseNumberSampler(registry, int(seed)).sample_unique(args.count)
+    jobs = [(number, registry.state_codes[state], variant == "F")
+            for number, state in zip(numbers, states) for variant in args.variants]
+
+    start = time.perf_counter()
+    try:
+        stats = asyncio.run(fetch(args, jobs, writer))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print("[INFO] {fetched} plates fetched, {skipped} skipped, {failed} failed, {requests} requests, "
+          "{retries} retries".format(**stats))
+    print("[INFO] {:.1f} plates/sec, saved to {}".format(stats["fetched"] / elapsed, args.output))
+
+
+if __name__ == '__main__':
+    main()
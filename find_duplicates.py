@@ -0,0 +1,73 @@
+"""
+Usage:
+
+# Index the plates dataset and report its near-duplicates, a later run only indexes the rows appended since:
+python find_duplicates.py --dataset=data/license_recognition/glp.h5 --index=data/license_recognition/glp-dhash.npz
+
+# The same for the backgrounds, and write a copy without near-duplicates (the first image of every group):
+python find_duplicates.py --dataset=data/license_recognition/background.h5 --index=data/license_recognition/background-dhash.npz --output=data/license_recognition/background-unique.h5
+
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from utils.dedup import PerceptualHashIndex
+from utils.io import HDF5DatasetWriter
+
+
+def write_unique(db_path, groups, output_path, chunk_size=10000):
+    # h5py is only needed to read the datasets, so it is not imported with the package
+    import h5py
+
+    keep = np.flatnonzero(groups == np.arange(len(groups)))
+    with h5py.File(db_path, "r") as db:
+        images, labels = db["images"], db["labels"]
+        writer = HDF5DatasetWriter((len(keep),) + images.shape[1:], output_path, bufSize=chunk_size)
+        for start in range(0, len(keep), chunk_size):
+            rows = keep[start:start + chunk_size]
+            writer.add(images[rows], [l.decode("utf-8") if isinstance(l, bytes) else l for l in labels[rows]])
+        writer.close()
+    return len(keep)
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Find near-duplicate images of a HDF5 dataset")
+    parser.add_argument("--dataset", help="HDF5 dataset", type=str, default="data/license_recognition/glp.h5")
+    parser.add_argument("--index", help="PerceptualHashIndex file, updated if it exists", type=str,
+                        default="data/license_recognition/glp-dhash.npz")
+    parser.add_argument("--max_distance", help="Maximum Hamming distance of near-duplicate hashes", type=int,
+                        default=4)
+    parser.add_argument("--output", help="HDF5 output file without near-duplicates", type=str, default=None)
+    parser.add_argument("--show", help="Number of duplicate groups to print", type=int, default=10)
+    args = parser.parse_args()
+
+    if os.path.isfile(args.index):
+        index = PerceptualHashIndex.load(args.index)
+        print("[INFO] loaded index {} with {} images".format(args.index, len(index)))
+    else:
+        index = PerceptualHashIndex(args.max_distance)
+
+    start = time.perf_counter()
+    added = index.add_dataset(args.dataset)
+    print("[INFO] indexed {} new images in {:.1f}s".format(added, time.perf_counter() - start))
+    index.save(args.index)
+
+    duplicate_groups = index.duplicate_groups()
+    duplicates = sum(len(g) - 1 for g in duplicate_groups)
+    print("[INFO] {} near-duplicate groups, {} of {} images ({:.1%}) are near-duplicates".format(
+        len(duplicate_groups), duplicates, len(index), duplicates / max(len(index), 1)))
+    for group in sorted(duplicate_groups, key=len, reverse=True)[:args.show]:
+        print("[INFO] group of {}: {}".format(len(group), ", ".join(str(i) for i in group[:10])))
+
+    if args.output is not None:
+        count = write_unique(args.dataset, index.groups(), args.output)
+        print("[INFO] {} images saved to {}".format(count, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -24,3 +24,18 @@ class LabelCodec:
             if c < len(LabelCodec.ALPHABET):
                 outstr += LabelCodec.ALPHABET[c]
         return outstr
+
+    @staticmethod
+    def decode_predictions(predictions):
+        # vectorized best path decoding of a batch (N, T, C) of CTC outputs: collapse repeated classes, drop blanks.
+        # Returns the encoded numbers left-aligned in a (N, T) matrix padded with -1 and their lengths
+        best = np.argmax(predictions, axis=2)
+        keep = np.ones(best.shape, dtype=bool)
+        keep[:, 1:] = best[:, 1:] != best[:, :-1]
+        keep &= best < len(LabelCodec.ALPHABET)
+
+        positions = np.cumsum(keep, axis=1) - 1
+        rows, cols = np.nonzero(keep)
+        labels = np.full(best.shape, -1, dtype=np.int32)
+        labels[rows, positions[rows, cols]] = best[rows, cols]
+        return labels, keep.sum(axis=1)
@@ -0,0 +1,59 @@
+"""
+Usage:
+
+# Run a multi-worker training with 2 worker processes on this machine, talking over the loopback interface:
+python launch_local_workers.py --workers=2 -- --batch_size=32 --epochs=2 --scale_lr --output_path=output/license_recognition/multi_worker
+
+All arguments after -- are passed to train.py of every worker. Killing and restarting the launcher continues the
+training from the last checkpoint of the chief (worker 0).
+
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+
+
+def free_ports(count):
+    sockets = []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Launch multi-worker training processes on localhost")
+    parser.add_argument("--workers", help="Number of worker processes", type=int, default=2)
+    parser.add_argument("train_args", nargs=argparse.REMAINDER, help="Arguments for train.py after --")
+    args = parser.parse_args()
+
+    train_args = args.train_args[1:] if args.train_args[:1] == ["--"] else args.train_args
+    cluster = {"worker": ["127.0.0.1:%d" % port for port in free_ports(args.workers)]}
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py")
+
+    processes = []
+    for index in range(args.workers):
+        env = dict(os.environ)
+        env["TF_CONFIG"] = json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}})
+        # one replica per worker, the workers share the CPU cores of this machine
+        env["CUDA_VISIBLE_DEVICES"] = ""
+        processes.append(subprocess.Popen([sys.executable, script, "--multi_worker"] + train_args, env=env))
+        print("[INFO] started worker {} on {} (pid {})".format(index, cluster["worker"][index],
+                                                               processes[-1].pid))
+
+    exit_codes = [p.wait() for p in processes]
+    print("[INFO] workers finished with exit codes {}".format(exit_codes))
+    sys.exit(max(exit_codes))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,8 @@ from label_codec import LabelCodec
 
 
 class LicensePlateDatasetGenerator:
-    def __init__(self, images, labels, img_w, img_h, downsample_factor, max_text_len, batch_size, augmentor):
+    def __init__(self, images, labels, img_w, img_h, downsample_factor, max_text_len, batch_size, augmentor,
+                 seed=None, indexes=None):
 
         self.img_w = img_w
         self.img_h = img_h
@@ -14,12 +15,14 @@ class LicensePlateDatasetGenerator:
         self.batch_size = batch_size
         self.input_length = img_w // downsample_factor
 
+        # with indexes, the generator only reads the given rows of images and labels, e.g. of a memory-mapped dataset
         self.images = images
         self.labels = labels
-        self.numImages = self.labels.shape[0]
+        self.numImages = self.labels.shape[0] if indexes is None else len(indexes)
 
-        self.indexes = np.asarray(range(self.numImages))
-        random.shuffle(self.indexes)
+        self.random = random.Random(seed)
+        self.indexes = np.asarray(range(self.numImages)) if indexes is None else np.array(indexes)
+        self.random.shuffle(self.indexes)
         self.batch_index = 0
 
         self.augmentor = augmentor
@@ -28,10 +31,11 @@ class LicensePlateDatasetGenerator:
 
         if self.batch_index >= (self.numImages // self.batch_size):
             self.batch_index = 0
-            random.shuffle(self.indexes)
+            self.random.shuffle(self.indexes)
 
         current_index = self.batch_index * self.batch_size
-        batch_indexes = self.indexes[current_index:current_index + self.batch_size]
+        # in increasing order, a HDF5 dataset read by index (see Hdf5DatasetLoader.open) requires it
+        batch_indexes = np.sort(self.indexes[current_index:current_index + self.batch_size])
         self.batch_index += 1
         return self.images[batch_indexes], self.labels[batch_indexes]
 
@@ -43,7 +47,9 @@ class LicensePlateDatasetGenerator:
         # reach the desired number of epochs
         while epochs < passes:
 
-            data = np.ones([self.batch_size, self.img_w, self.img_h, 1])
+            # uint8 images if the augmentor does not normalize them, 4x less memory traffic than floats
+            data = np.ones([self.batch_size, self.img_w, self.img_h, 1],
+                           dtype=np.float64 if self.augmentor.normalize else np.uint8)
             labels = np.ones([self.batch_size, self.max_text_len])
             input_length = np.ones((self.batch_size, 1)) * self.input_length
             label_length = np.zeros((self.batch_size, 1))
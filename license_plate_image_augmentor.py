@@ -6,19 +6,46 @@ import numpy as np
 
 
 class LicensePlateImageAugmentor:
-    def __init__(self, img_w, img_h, background_images):
+    def __init__(self, img_w, img_h, background_images, seed=None, max_brightness=0.7, rotation_variation=0.8,
+                 scale=0.8, max_blur=3, normalize=True, tile_bank=None, tile_batch=256):
 
         self.OUTPUT_SHAPE = img_h, img_w
         self.background_images, _ = background_images
 
+        # augmentation parameters
+        self.max_brightness = max_brightness
+        self.rotation_variation = rotation_variation
+        self.scale = scale
+        self.max_blur = max_blur
+
+        # without normalization the images stay uint8, for models which rescale them themselves
+        self.normalize = normalize
+
+        # own random generators, so that every (distributed) training worker can use its own seed
+        self.random = random.Random(seed)
+        self.np_random = np.random.RandomState(seed)
+
+        # with a BackgroundTileBank, the backgrounds of tile_batch plates are gathered at once instead of cropped
+        self.tile_bank = tile_bank
+        self.tile_batch = tile_batch
+        self.tiles = []
+        self.tile_index = 0
+
     def __get_random_background_image__(self):
-        index = random.randint(0, len(self.background_images) - 1)
+        index = self.random.randint(0, len(self.background_images) - 1)
         return self.background_images[index]
 
     def __generate_background_image__(self):
+        if self.tile_bank is not None:
+            if self.tile_index >= len(self.tiles):
+                self.tiles = self.tile_bank.sample(self.tile_batch, self.np_random)
+                self.tile_index = 0
+            self.tile_index += 1
+            return self.tiles[self.tile_index - 1]
+
         background = self.__get_random_background_image__()
-        x = random.randint(0, background.shape[1] - self.OUTPUT_SHAPE[1])
-        y = random.randint(0, background.shape[0] - self.OUTPUT_SHAPE[0])
+        x = self.random.randint(0, background.shape[1] - self.OUTPUT_SHAPE[1])
+        y = self.random.randint(0, background.shape[0] - self.OUTPUT_SHAPE[0])
         background = background[y:y + self.OUTPUT_SHAPE[0], x:x + self.OUTPUT_SHAPE[1]]
         return background
 
@@ -49,11 +76,11 @@ class LicensePlateImageAugmentor:
         from_size = np.array([[from_shape[1], from_shape[0]]]).T
         to_size = np.array([[to_shape[1], to_shape[0]]]).T
 
-        roll = random.uniform(-0.3, 0.3) * rotation_variation
-        pitch = random.uniform(-0.2, 0.2) * rotation_variation
-        yaw = random.uniform(-1.2, 1.2) * rotation_variation
+        roll = self.random.uniform(-0.3, 0.3) * rotation_variation
+        pitch = self.random.uniform(-0.2, 0.2) * rotation_variation
+        yaw = self.random.uniform(-1.2, 1.2) * rotation_variation
 
-        scale = 0.8
+        scale = self.scale
 
         center_to = to_size / 2.
         center_from = from_size / 2.
@@ -64,29 +91,29 @@ class LicensePlateImageAugmentor:
 
         return M
 
-    @staticmethod
-    def __gaussian_noise__(image, sigma=1):
+    def __gaussian_noise__(self, image, sigma=1):
         mean = 0.0
-        gauss = np.random.normal(mean, sigma, image.shape)
+        gauss = self.np_random.normal(mean, sigma, image.shape)
         image = image + gauss
         return image
 
-    @staticmethod
-    def __brightness__(img, factor=0.5):
-        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-        hsv = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)  # convert to hsv
-        hsv = np.array(hsv, dtype=np.float64)
-        hsv[:, :, 2] = hsv[:, :, 2] * (factor + np.random.uniform())  # scale channel V uniformly
-        hsv[:, :, 2][hsv[:, :, 2] > 255] = 255  # reset out of range values
-        rgb = cv2.cvtColor(np.array(hsv, dtype=np.uint8), cv2.COLOR_HSV2RGB)
-        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    def __brightness__(self, img, factor=0.5):
+        # scaling the V channel of a gray image in HSV is scaling the gray value itself: the same result as the
+        # GRAY -> RGB -> HSV -> RGB -> GRAY round trip, without the four color conversions
+        img = img * (factor + self.np_random.uniform())  # scale channel V uniformly
+        return np.minimum(img, 255).astype(np.uint8)  # reset out of range values
 
-    @staticmethod
-    def __blur__(img):
-        blur_value = random.randint(0, 2) + 1
+    def __blur__(self, img):
+        blur_value = self.random.randint(1, self.max_blur)
         img = cv2.blur(img, (blur_value, blur_value))
         return img
 
+    def get_config(self):
+        # everything the augmented images depend on, apart from the random state and the background images
+        return {"img_w": self.OUTPUT_SHAPE[1], "img_h": self.OUTPUT_SHAPE[0], "max_brightness": self.max_brightness,
+                "rotation_variation": self.rotation_variation, "scale": self.scale, "max_blur": self.max_blur,
+                "normalize": self.normalize, "tile_bank": None if self.tile_bank is None else len(self.tile_bank)}
+
     @staticmethod
     def __normalize_image__(image):
         # normalize image data between 0 and 1
@@ -97,14 +124,14 @@ class LicensePlateImageAugmentor:
     def generate_plate_image(self, plate_img):
         bi = self.__generate_background_image__()
 
-        random_brightness = random.uniform(0.0, 0.7)
+        random_brightness = self.random.uniform(0.0, self.max_brightness)
         bi = self.__brightness__(bi, random_brightness)
         plate_img = self.__brightness__(plate_img, random_brightness)
 
         M = self.__make_affine_transform__(
             from_shape=plate_img.shape,
             to_shape=bi.shape,
-            rotation_variation=0.8)
+            rotation_variation=self.rotation_variation)
 
         plate_mask = np.ones(plate_img.shape)
         plate_img = cv2.warpAffine(plate_img, M, (bi.shape[1], bi.shape[0]))
@@ -113,5 +140,7 @@ class LicensePlateImageAugmentor:
         out = plate_img * plate_mask + bi * (1.0 - plate_mask)
         #out = self.__gaussian_noise__(out, random.randrange(1, 10))
         out = self.__blur__(out)
+        if not self.normalize:
+            return np.clip(np.round(out), 0, 255).astype(np.uint8)
         out = self.__normalize_image__(out)
         return out
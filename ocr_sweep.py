@@ -0,0 +1,128 @@
+"""
+Usage:
+
+# Enumerate OCR architectures with analytic params/MACs and measured TFLite latency:
+python ocr_sweep.py --conv_depths=2,3 --conv_widths=8,16,32 --rnn_types=gru,lstm --rnn_sizes=0,64,128,256,512 --measure_latency --output=output/license_recognition/sweep.csv
+
+# Add the accuracy of trained models (CSV with the columns name,accuracy) to get the accuracy/latency Pareto front:
+python ocr_sweep.py ... --accuracy_csv=output/license_recognition/accuracy.csv
+
+"""
+
+import argparse
+import csv
+import itertools
+import os
+
+from tensorflow.keras.models import Model
+
+from config.license_recognition import config
+from label_codec import LabelCodec
+from utils.nn.conv import OCRSpec
+from utils.nn.export import TFLiteExporter
+from utils.nn.profiling import ModelProfiler
+
+
+def create_specs(conv_depths, conv_widths, separable, time_dense_sizes, rnn_types, rnn_sizes, rnn_layers):
+    specs = {}
+    for depth, width, sep, dense, rnn_type, size, layers in itertools.product(
+            conv_depths, conv_widths, separable, time_dense_sizes, rnn_types, rnn_sizes, rnn_layers):
+        # two pooling layers on the time axis give the 32 CTC time steps, further blocks pool the height only.
+        # A single block has a single pooling layer: downsample factor 2, i.e. 64 time steps
+        pool_sizes = [2, 2] + [(1, 2)] * (depth - 2)
+        spec = OCRSpec(conv_filters=[width] * depth, pool_sizes=pool_sizes[:depth], separable=sep,
+                       time_dense_size=dense, rnn_type=rnn_type, rnn_size=size, rnn_layers=layers if size else 0)
+        specs[spec.name] = spec
+    return list(specs.values())
+
+
+def measure_latency(spec, input_shape, output_size, runs, threads):
+    inputs, outputs = spec.build(input_shape, output_size)
+    tflite_model = TFLiteExporter.convert(Model(inputs=inputs, outputs=outputs))
+    return ModelProfiler.tflite_latency(tflite_model, runs, num_threads=threads)[0]
+
+
+def pareto_front(rows, cost_key, quality_key):
+    # rows which are not dominated by a cheaper (or equally expensive) and more accurate row
+    front = []
+    best_quality = float("-inf")
+    for row in sorted(rows, key=lambda r: (r[cost_key], -r[quality_key])):
+        if row[quality_key] > best_quality:
+            front.append(row)
+            best_quality = row[quality_key]
+    return front
+
+
+def parse_list(value, cast=int):
+    return [cast(v) for v in value.split(",")]
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="OCR architecture sweep with cost model and latency report")
+    parser.add_argument("--conv_depths", help="Numbers of conv blocks", type=str, default="2")
+    parser.add_argument("--conv_widths", help="Filters per conv block", type=str, default="8,16,32")
+    parser.add_argument("--separable", help="Also sweep separable convolutions", action="store_true")
+    parser.add_argument("--time_dense_sizes", help="Units of the dense layer before the RNN", type=str, default="32")
+    parser.add_argument("--rnn_types", help="RNN cell types (gru, lstm)", type=str, default="gru")
+    parser.add_argument("--rnn_sizes", help="RNN units, 0 for no RNN", type=str, default="0,64,128,256,512")
+    parser.add_argument("--rnn_layers", help="Numbers of bidirectional RNN layers", type=str, default="1,2")
+    parser.add_argument("--measure_latency", help="Convert every model to TFLite and measure the latency",
+                        action="store_true")
+    parser.add_argument("--runs", help="Timed inference runs per model", type=int, default=50)
+    parser.add_argument("--threads", help="TFLite interpreter threads", type=int, default=1)
+    parser.add_argument("--accuracy_csv", help="CSV with the accuracy of trained specs (name,accuracy)", type=str,
+                        default=None)
+    parser.add_argument("--output", help="Result CSV file", type=str, default=None)
+    args = parser.parse_args()
+
+    input_shape = (config.IMAGE_WIDTH, config.IMAGE_HEIGHT, 1)
+    output_size = len(LabelCodec.ALPHABET) + 1
+
+    specs = create_specs(parse_list(args.conv_depths), parse_list(args.conv_widths),
+                         [False, True] if args.separable else [False], parse_list(args.time_dense_sizes),
+                         parse_list(args.rnn_types, str), parse_list(args.rnn_sizes), parse_list(args.rnn_layers))
+
+    accuracies = {}
+    if args.accuracy_csv is not None:
+        with open(args.accuracy_csv, newline="") as f:
+            accuracies = {row["name"]: float(row["accuracy"]) for row in csv.DictReader(f)}
+
+    rows = []
+    for spec in specs:
+        params, macs = spec.cost(input_shape, output_size)
+        row = {"name": spec.name, "params": params, "macs": macs, "downsample_factor": spec.downsample_factor}
+        if args.measure_latency:
+            row["latency_ms"] = measure_latency(spec, input_shape, output_size, args.runs, args.threads)
+        if spec.name in accuracies:
+            row["accuracy"] = accuracies[spec.name]
+        rows.append(row)
+        print("[INFO] {:<45} params: {:>10,}  MMACs: {:>8.2f}{}".format(
+            spec.name, params, macs / 1e6,
+            "  latency: {:.2f} ms".format(row["latency_ms"]) if "latency_ms" in row else ""))
+
+    cost_key = "latency_ms" if args.measure_latency else "macs"
+    front = pareto_front([r for r in rows if "accuracy" in r], cost_key, "accuracy")
+    front_names = set(r["name"] for r in front)
+    for row in rows:
+        row["pareto"] = row["name"] in front_names
+
+    if front:
+        print("[INFO] accuracy/{} Pareto front:".format(cost_key))
+        for row in front:
+            print("       {:<45} {}: {:>12.2f}  accuracy: {:.4f}".format(row["name"], cost_key, row[cost_key],
+                                                                          row["accuracy"]))
+
+    if args.output is not None:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        fieldnames = ["name", "params", "macs", "downsample_factor", "latency_ms", "accuracy", "pareto"]
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
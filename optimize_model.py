@@ -0,0 +1,63 @@
+"""
+Usage:
+
+# Fold the batch normalizations of a trained recognizer, verify it and export the optimized model to TFLite:
+python optimize_model.py --model=output/license_recognition/adagrad/glpr-model.h5 --output_path=output/license_recognition/adagrad/glpr-model-optimized
+
+The optimized Keras model contains FusedAffine layers if a batch normalization couldn't be folded, load it with
+load_model(path, custom_objects=InferenceOptimizer.CUSTOM_OBJECTS).
+
+"""
+
+import argparse
+
+import numpy as np
+from tensorflow.keras.models import load_model
+
+from utils.nn.compression import InferenceOptimizer
+from utils.nn.export import TFLiteExporter
+from utils.nn.profiling import ModelProfiler
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Inference graph optimization of the license recognition model")
+    parser.add_argument("--model", help="Trained recognition model (.h5)", type=str, required=True)
+    parser.add_argument("--output_path", help="Path of the optimized model without extension", type=str,
+                        required=True)
+    parser.add_argument("--batch_size", help="Samples of the equivalence check", type=int, default=64)
+    parser.add_argument("--atol", help="Maximum absolute difference of the outputs", type=float, default=1e-4)
+    parser.add_argument("--runs", help="Timed inference runs per model", type=int, default=100)
+    args = parser.parse_args()
+
+    model = InferenceOptimizer.strip_training_inputs(
+        load_model(args.model, compile=False, custom_objects=InferenceOptimizer.CUSTOM_OBJECTS))
+    optimized_model = InferenceOptimizer.optimize(model)
+
+    # raw pixels for a model with a uint8 input (rescale=True), uniform [0,1) would be cast to all zeros
+    random = np.random.RandomState(42)
+    shape = (args.batch_size,) + model.input_shape[1:]
+    if model.input.dtype == "uint8":
+        batch = random.randint(0, 256, size=shape).astype(np.uint8)
+    else:
+        batch = random.uniform(size=shape).astype(np.float32)
+    difference = InferenceOptimizer.verify(model, optimized_model, batch, args.atol)
+    print("[INFO] max. absolute output difference: {:.2e}".format(difference))
+
+    optimized_model.save(args.output_path + ".h5", save_format="h5")
+    optimized_tflite = TFLiteExporter.save(optimized_model, args.output_path + ".tflite")
+    original_tflite = TFLiteExporter.convert(model)
+
+    original_latency, _ = ModelProfiler.tflite_latency(original_tflite, args.runs)
+    optimized_latency, _ = ModelProfiler.tflite_latency(optimized_tflite, args.runs)
+
+    print("[INFO] {:<10} {:>8} {:>10} {:>12}".format("model", "layers", "tflite KB", "latency ms"))
+    print("[INFO] {:<10} {:>8} {:>10.0f} {:>12.2f}".format("original", len(model.layers), len(original_tflite) / 1024.,
+                                                           original_latency))
+    print("[INFO] {:<10} {:>8} {:>10.0f} {:>12.2f}".format("optimized", len(optimized_model.layers),
+                                                           len(optimized_tflite) / 1024., optimized_latency))
+    print("[INFO] latency gain: {:.1f}%".format((1. - optimized_latency / original_latency) * 100.))
+
+
+if __name__ == '__main__':
+    main()
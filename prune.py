@@ -0,0 +1,90 @@
+"""
+Usage:
+
+# Gradually prune a trained conv_bgru model to 25%, 50% and 75% sparsity with fine-tuning in between:
+python prune.py --model=output/license_recognition/adagrad/glpr-model.h5 --sparsity_levels=0.25,0.5,0.75 --steps_per_level=2 --epochs_per_step=2 --output_path=output/license_recognition/pruned
+
+"""
+
+import argparse
+import os
+from itertools import islice
+
+from tensorflow.keras.models import load_model
+
+from config.license_recognition import config
+from train_helper import TrainHelper
+from utils.nn.compression import StructuredPruner
+from utils.nn.export import TFLiteExporter
+from utils.nn.profiling import ModelProfiler
+
+
+def report(name, model, batches, tflite_model_path):
+    tflite_model = TFLiteExporter.save(model, tflite_model_path)
+    latency, _ = ModelProfiler.tflite_latency(tflite_model)
+    return {"name": name, "params": model.count_params(), "tflite_kb": len(tflite_model) / 1024.,
+            "latency_ms": latency, "accuracy": TrainHelper.evaluate_accuracy(model, batches)}
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Structured pruning of the license recognition model")
+    parser.add_argument("--model", help="Trained conv_bgru predict model (.h5)", type=str, required=True)
+    parser.add_argument("--plates", help="HDF5 license plate dataset", type=str,
+                        default="data/license_recognition/glp.h5")
+    parser.add_argument("--backgrounds", help="HDF5 background dataset", type=str,
+                        default="data/license_recognition/background.h5")
+    parser.add_argument("--sparsity_levels", help="Fractions of removed filters and units", type=str,
+                        default="0.25,0.5,0.75")
+    parser.add_argument("--steps_per_level", help="Pruning steps to reach each sparsity level", type=int, default=2)
+    parser.add_argument("--epochs_per_step", help="Fine-tuning epochs after each pruning step", type=int, default=2)
+    parser.add_argument("--optimizer", help="sdg, rmsprop, adam, adagrad or adadelta", type=str, default="adagrad")
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--eval_steps", help="Test batches for the accuracy report", type=int, default=20)
+    parser.add_argument("--output_path", type=str, default="output/license_recognition/pruned")
+    parser.add_argument("--model_name", type=str, default="glpr-model-pruned")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_path, exist_ok=True)
+
+    train_generator, val_generator, test_generator = TrainHelper.create_generators(
+        args.plates, args.backgrounds, config.IMAGE_WIDTH, config.IMAGE_HEIGHT, config.DOWNSAMPLE_FACTOR,
+        config.MAX_TEXT_LEN, args.batch_size)
+    batches = list(islice(test_generator.generator(), args.eval_steps))
+
+    model, base_spec = StructuredPruner.from_model(load_model(args.model, compile=False))
+    spec = base_spec
+
+    results = [report("baseline", model, batches, os.path.join(args.output_path, args.model_name) + "-0.00.tflite")]
+
+    sparsity = 0.
+    for level in [float(s) for s in args.sparsity_levels.split(",")]:
+        # approach each level in several small steps, fine-tuning after each one
+        for step in range(1, args.steps_per_level + 1):
+            target = sparsity + (level - sparsity) * step / args.steps_per_level
+            model, spec = StructuredPruner.prune_ratio(model, spec, target, base_spec)
+            print("[INFO] pruned to sparsity {:.2f}: {}".format(target, spec.name))
+
+            train_model, model = TrainHelper.create_train_model(model.inputs[0], model.outputs[0],
+                                                                config.MAX_TEXT_LEN, args.optimizer)
+            train_model.fit(
+                train_generator.generator(),
+                steps_per_epoch=train_generator.numImages // args.batch_size,
+                validation_data=val_generator.generator(),
+                validation_steps=val_generator.numImages // args.batch_size,
+                epochs=args.epochs_per_step, verbose=1)
+
+        sparsity = level
+        model_path = os.path.join(args.output_path, args.model_name) + "-{:.2f}".format(level)
+        model.save(model_path + ".h5", save_format="h5")
+        results.append(report("{:.2f}".format(level), model, batches, model_path + ".tflite"))
+
+    print("[INFO] {:<10} {:>10} {:>10} {:>12} {:>10}".format("sparsity", "params", "tflite KB", "latency ms",
+                                                             "accuracy"))
+    for r in results:
+        print("[INFO] {:<10} {:>10,} {:>10.0f} {:>12.2f} {:>10.4f}".format(r["name"], r["params"], r["tflite_kb"],
+                                                                           r["latency_ms"], r["accuracy"]))
+
+
+if __name__ == '__main__':
+    main()
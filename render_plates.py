@@ -0,0 +1,71 @@
+"""
+Usage:
+
+# Render 50000 license numbers as front and rear plates (100000 images) into a new HDF5 dataset, without network access:
+python render_plates.py --count=50000 --output=data/license_recognition/glp-rendered.h5
+
+# Only license numbers which are not in the existing datasets:
+python render_plates.py --count=50000 --existing=data/license_recognition/glp.h5 --output=data/license_recognition/glp-rendered.h5
+
+# Use an FE-Schrift TrueType font for the glyphs instead of the built-in Hershey font:
+python render_plates.py --count=50000 --font=fonts/EuroPlate.ttf --output=data/license_recognition/glp-rendered.h5
+
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils.io import HDF5DatasetWriter
+from utils.synthesis import CountyRegistry, GlyphAtlas, LicenseNumberIndex, LicenseNumberSampler, PlateRenderer
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Render German license plates offline into a HDF5 dataset")
+    parser.add_argument("--count", help="Number of license numbers", type=int, default=50000)
+    parser.add_argument("--variants", help="F (front plate with inspection sticker), R (rear plate) or FR", type=str,
+                        default="FR")
+    parser.add_argument("--counties", help="County codes CSV", type=str,
+                        default="data/license_recognition/KFZ-Deutschland-2017-06-20.csv")
+    parser.add_argument("--states", help="German states JSON", type=str,
+                        default="data/license_recognition/german_states.json")
+    parser.add_argument("--font", help="TrueType font of the glyphs, the Hershey font if omitted", type=str,
+                        default=None)
+    parser.add_argument("--existing", help="Comma separated HDF5 datasets whose license numbers are not used again",
+                        type=str, default=None)
+    parser.add_argument("--batch_size", help="Plates rendered at once", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="HDF5 output file", type=str,
+                        default="data/license_recognition/glp-rendered.h5")
+    args = parser.parse_args()
+
+    renderer = PlateRenderer(GlyphAtlas.from_font(args.font, 32) if args.font else None)
+    registry = CountyRegistry.load(args.counties, args.states)
+
+    start = time.perf_counter()
+    index = LicenseNumberIndex.from_datasets(args.existing.split(",")) if args.existing else None
+    numbers, states = LicenseNumberSampler(registry, args.seed).sample_unique(args.count, index)
+    print("[INFO] sampled {} license numbers in {:.1f}s".format(len(numbers), time.perf_counter() - start))
+
+    rng = np.random.RandomState(args.seed)
+    writer = HDF5DatasetWriter((len(numbers) * len(args.variants), renderer.height, renderer.width), args.output,
+                               bufSize=args.batch_size)
+
+    start = time.perf_counter()
+    for i in range(0, len(numbers), args.batch_size):
+        batch = numbers[i:i + args.batch_size]
+        for variant in args.variants:
+            months = rng.randint(1, 13, len(batch)) if variant == "F" else None
+            writer.add(renderer.render(batch, months, states[i:i + args.batch_size]), batch)
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    total = len(numbers) * len(args.variants)
+    print("[INFO] {} plates saved to {} in {:.1f}s ({:.0f} plates/sec)".format(total, args.output, elapsed,
+                                                                              total / elapsed))
+
+
+if __name__ == '__main__':
+    main()
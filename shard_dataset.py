@@ -0,0 +1,63 @@
+"""
+Usage:
+
+# Convert the plates dataset to train, val and test sharded datasets of 10000 plates each, with the splits of a split manifest:
+python shard_dataset.py --dataset=data/license_recognition/glp.h5 --output=data/license_recognition/glp-sharded --split_name=default
+
+# Convert the whole dataset to one sharded dataset, without splits:
+python shard_dataset.py --dataset=data/license_recognition/glp.h5 --output=data/license_recognition/glp-sharded
+
+# Verify the checksums of a sharded dataset and convert it back to HDF5:
+python shard_dataset.py --dataset=data/license_recognition/glp-sharded/train --output=data/license_recognition/glp-train.h5 --to_hdf5
+
+"""
+
+import argparse
+import os
+import time
+
+from utils.io import Hdf5DatasetLoader, ShardedDataset, SplitManifest
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Convert between HDF5 and sharded datasets")
+    parser.add_argument("--dataset", help="HDF5 dataset, or sharded dataset with --to_hdf5", type=str,
+                        default="data/license_recognition/glp.h5")
+    parser.add_argument("--output", help="Sharded dataset directory, or HDF5 file with --to_hdf5", type=str,
+                        default="data/license_recognition/glp-sharded")
+    parser.add_argument("--shard_size", help="Images per shard", type=int, default=10000)
+    parser.add_argument("--max_text_len", help="Maximum length of the license numbers", type=int, default=10)
+    parser.add_argument("--split_name", help="Split manifest of the dataset, created if it does not exist, "
+                                             "the splits are written to <output>/train, val and test",
+                        type=str, default=None)
+    parser.add_argument("--split_seed", type=int, default=42)
+    parser.add_argument("--to_hdf5", help="Convert a sharded dataset to HDF5", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.to_hdf5:
+        dataset = ShardedDataset(args.dataset)
+        corrupted = dataset.verify()
+        if corrupted:
+            raise ValueError("Checksum mismatch of the shards {}".format(", ".join(corrupted)))
+        dataset.to_hdf5(args.output)
+        print("[INFO] {} images saved to {} in {:.1f}s".format(dataset.numImages, args.output,
+                                                                time.perf_counter() - start))
+        return
+
+    if args.split_name is None:
+        outputs = [(args.output, None)]
+    else:
+        labels = Hdf5DatasetLoader().load_labels(args.dataset)
+        splits = SplitManifest.load_or_create(args.dataset, labels, args.split_name, args.split_seed)
+        outputs = [(os.path.join(args.output, s), indexes) for s, indexes in zip(SplitManifest.SPLITS, splits)]
+
+    for output_dir, indexes in outputs:
+        dataset = ShardedDataset.from_hdf5(args.dataset, output_dir, args.shard_size, args.max_text_len, indexes)
+        print("[INFO] {} images saved to {} in {} shards".format(dataset.numImages, output_dir, len(dataset.shards)))
+    print("[INFO] converted in {:.1f}s".format(time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class ShardedDatasetGenerator:
+    """Batches of augmented plates from a ShardedDataset, the same batches as LicensePlateDatasetGenerator.
+
+    Every worker reads only the shards assigned to it, interleaved through a shuffle buffer. The labels are read
+    encoded from the shards. Without shuffle (validation and test data) the shards are read in order without a
+    buffer, and every pass of numImages // batch_size batches yields the same images exactly once.
+    """
+
+    def __init__(self, dataset, img_w, img_h, downsample_factor, max_text_len, batch_size, augmentor, seed=None,
+                 num_workers=1, worker_index=0, shuffle_buffer=10000, cycle_length=4, shuffle=True):
+
+        self.img_w = img_w
+        self.img_h = img_h
+        self.max_text_len = max_text_len
+        self.batch_size = batch_size
+        self.input_length = img_w // downsample_factor
+
+        self.dataset = dataset
+        # the epoch of the worker with the fewest images, all workers of a distributed training run the same steps
+        self.numImages = min(sum(s["count"] for s in dataset.worker_shards(num_workers, w)) for w in range(num_workers))
+        self.shuffle = shuffle
+        # the arguments of the sample stream, which is started again for every pass without shuffle
+        self.sample_args = (num_workers, worker_index, shuffle_buffer, cycle_length, seed)
+        self.samples = dataset.samples(*self.sample_args, shuffle=shuffle)
+        self.batch_index = 0
+
+        self.augmentor = augmentor
+
+    def generator(self, passes=np.inf):
+        epochs = 0
+
+        while epochs < passes:
+
+            if not self.shuffle and self.batch_index >= max(self.numImages // self.batch_size, 1):
+                # a new pass from the first shard, the remainder of the last one is dropped
+                self.samples = self.dataset.samples(*self.sample_args, shuffle=False)
+                self.batch_index = 0
+
+            # uint8 images if the augmentor does not normalize them, 4x less memory traffic than floats
+            data = np.ones([self.batch_size, self.img_w, self.img_h, 1],
+                           dtype=np.float64 if self.augmentor.normalize else np.uint8)
+            labels = np.ones([self.batch_size, self.max_text_len])
+            input_length = np.ones((self.batch_size, 1)) * self.input_length
+            label_length = np.zeros((self.batch_size, 1))
+
+            for i in range(self.batch_size):
+                image, codes, length, _ = next(self.samples)
+                image = self.augmentor.generate_plate_image(image)
+                data[i] = np.expand_dims(image.T, -1)
+                labels[i, 0:length] = codes[:length]
+                label_length[i] = length
+
+            self.batch_index += 1
+            yield {'input': data, 'labels': labels, 'input_length': input_length, 'label_length': label_length}
+
+            epochs += 1
@@ -0,0 +1,194 @@
+"""
+Usage:
+
+# Sweep optimizers, learning rates, batch sizes and OCR builders, 2 CPU cores per trial, stopping the worst trials early:
+python sweep.py --optimizers=adam,adagrad,rmsprop --learning_rates=0.01,0.001 --batch_sizes=32,64 --builders=conv_bgru,ds_cnn_bgru --cores_per_trial=2 --min_epochs=2 --max_epochs=18 --eta=3 --output_path=output/license_recognition/sweep
+
+The trials are train.py processes. All of them read the same read-only memory-mapped copy of the datasets, which is
+exported once to <output_path>/data. Successive halving trains all trials for min_epochs, keeps the best 1/eta of
+them by validation accuracy, continues those from their checkpoints for eta times as many epochs, and so on until
+max_epochs. The leaderboard lists the validation accuracy and the TFLite latency of every trial.
+
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import math
+import os
+import queue
+import subprocess
+import sys
+
+from ocr_sweep import pareto_front, parse_list
+from utils.io import MemmapDataset
+from utils.nn.profiling import ModelProfiler
+
+
+def create_trials(builders, optimizers, learning_rates, batch_sizes):
+    trials = []
+    for builder, optimizer, learning_rate, batch_size in itertools.product(
+            builders, optimizers, learning_rates, batch_sizes):
+        trials.append({"name": "{}-{}-lr{:g}-bs{}".format(builder, optimizer, learning_rate, batch_size),
+                       "builder": builder, "optimizer": optimizer, "learning_rate": learning_rate,
+                       "batch_size": batch_size})
+    return trials
+
+
+def core_slots(cores_per_trial):
+    # disjoint sets of CPU cores, one per concurrently running trial
+    cores = sorted(os.sched_getaffinity(0))
+    slots = [cores[i:i + cores_per_trial] for i in range(0, len(cores) - cores_per_trial + 1, cores_per_trial)]
+    return slots or [cores]
+
+
+def trial_dir(output_path, trial):
+    return os.path.join(output_path, "trials", trial["name"])
+
+
+def run_trial(trial, epochs, cores, args, plates_path, backgrounds_path):
+    output_path = trial_dir(args.output_path, trial)
+    os.makedirs(output_path, exist_ok=True)
+
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py"),
+               "--builder=%s" % trial["builder"], "--optimizer=%s" % trial["optimizer"],
+               "--learning_rate=%g" % trial["learning_rate"], "--batch_size=%d" % trial["batch_size"],
+               "--epochs=%d" % epochs, "--plates=%s" % plates_path, "--backgrounds=%s" % backgrounds_path,
+               "--seed=%d" % args.seed, "--monitor_accuracy", "--output_path=%s" % output_path]
+
+    # TensorFlow sizes its thread pools by the number of cores, not by the affinity mask
+    env = dict(os.environ)
+    env["CUDA_VISIBLE_DEVICES"] = ""
+    env["OMP_NUM_THREADS"] = env["TF_NUM_INTRAOP_THREADS"] = str(len(cores))
+    env["TF_NUM_INTEROP_THREADS"] = "1"
+
+    with open(os.path.join(output_path, "train.log"), "a") as log:
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # pinned after the start, preexec_fn is not safe in the threads that run the trials. The threads of
+        # the trial are started later by TensorFlow and inherit the affinity
+        os.sched_setaffinity(process.pid, cores)
+        return process.wait()
+
+
+def read_result(output_path, trial):
+    # best epoch by validation accuracy, over all rungs the trial has been trained in
+    history_path = os.path.join(trial_dir(output_path, trial), trial["optimizer"], "logs", "history.csv")
+    if not os.path.exists(history_path):
+        return None
+
+    with open(history_path) as f:
+        rows = [row for row in csv.DictReader(f) if row.get("val_accuracy")]
+    if not rows:
+        return None
+
+    best = max(rows, key=lambda row: float(row["val_accuracy"]))
+    return {"epochs": len(rows), "val_accuracy": float(best["val_accuracy"]), "val_cer": float(best["val_cer"]),
+            "val_loss": float(best["val_loss"])}
+
+
+def run_rung(trials, epochs, slots, args, plates_path, backgrounds_path):
+    free_slots = queue.Queue()
+    for slot in slots:
+        free_slots.put(slot)
+
+    def run(trial):
+        cores = free_slots.get()
+        try:
+            print("[INFO] {} for {} epochs on cores {}".format(trial["name"], epochs, cores))
+            return run_trial(trial, epochs, cores, args, plates_path, backgrounds_path)
+        finally:
+            free_slots.put(cores)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(slots)) as executor:
+        exit_codes = list(executor.map(run, trials))
+
+    for trial, exit_code in zip(trials, exit_codes):
+        result = read_result(args.output_path, trial) if exit_code == 0 else None
+        trial.update(result or {"epochs": 0, "val_accuracy": float("nan"), "val_cer": float("nan"),
+                                "val_loss": float("nan")})
+        trial["failed"] = result is None
+        if trial["failed"]:
+            print("[WARNING] {} failed, see {}".format(trial["name"], os.path.join(
+                trial_dir(args.output_path, trial), "train.log")))
+
+
+def successive_halving(trials, slots, args, plates_path, backgrounds_path):
+    survivors = trials
+    epochs = args.min_epochs
+    while True:
+        run_rung(survivors, epochs, slots, args, plates_path, backgrounds_path)
+        survivors = sorted([t for t in survivors if not t["failed"]], key=lambda t: -t["val_accuracy"])
+
+        if epochs >= args.max_epochs or len(survivors) <= 1:
+            break
+
+        survivors = survivors[:max(1, int(math.ceil(len(survivors) / float(args.eta))))]
+        epochs = min(epochs * args.eta, args.max_epochs)
+        print("[INFO] continuing with {} trial(s) for {} epochs: {}".format(
+            len(survivors), epochs, ", ".join(t["name"] for t in survivors)))
+
+
+def measure_latency(output_path, trial, runs):
+    tflite_path = os.path.join(trial_dir(output_path, trial), trial["optimizer"], "glpr-model.tflite")
+    if not os.path.exists(tflite_path):
+        return float("nan")
+    with open(tflite_path, "rb") as f:
+        return ModelProfiler.tflite_latency(f.read(), runs, num_threads=1)[0]
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep with successive halving")
+    parser.add_argument("--builders", help="Comma separated OCR builders", type=str, default="conv_bgru")
+    parser.add_argument("--optimizers", help="Comma separated optimizers", type=str, default="adam,adagrad")
+    parser.add_argument("--learning_rates", help="Comma separated learning rates", type=str, default="0.01")
+    parser.add_argument("--batch_sizes", help="Comma separated batch sizes", type=str, default="64")
+    parser.add_argument("--plates", help="HDF5 license plate dataset", type=str,
+                        default="data/license_recognition/glp.h5")
+    parser.add_argument("--backgrounds", help="HDF5 background dataset", type=str,
+                        default="data/license_recognition/background.h5")
+    parser.add_argument("--cores_per_trial", help="CPU cores pinned to every trial", type=int, default=2)
+    parser.add_argument("--min_epochs", help="Epochs of the first rung", type=int, default=2)
+    parser.add_argument("--max_epochs", help="Epochs of the last rung", type=int, default=18)
+    parser.add_argument("--eta", help="Keep the best 1/eta trials and multiply the epochs by eta per rung", type=int,
+                        default=3)
+    parser.add_argument("--seed", help="Augmentation seed of all trials", type=int, default=0)
+    parser.add_argument("--latency_runs", help="Timed TFLite inferences per trial", type=int, default=100)
+    parser.add_argument("--output_path", type=str, default="output/license_recognition/sweep")
+    args = parser.parse_args()
+
+    # one shared read-only copy of the datasets, mapped by all trials
+    plates_path = MemmapDataset.export(args.plates, os.path.join(args.output_path, "data", "plates"))
+    backgrounds_path = MemmapDataset.export(args.backgrounds, os.path.join(args.output_path, "data", "backgrounds"))
+
+    trials = create_trials(parse_list(args.builders, str), parse_list(args.optimizers, str),
+                           parse_list(args.learning_rates, float), parse_list(args.batch_sizes))
+    slots = core_slots(args.cores_per_trial)
+    print("[INFO] {} trials, {} running in parallel".format(len(trials), len(slots)))
+
+    successive_halving(trials, slots, args, plates_path, backgrounds_path)
+
+    # the latency is measured one model at a time on a single thread, so that the trials are comparable
+    for trial in trials:
+        trial["latency_ms"] = measure_latency(args.output_path, trial, args.latency_runs)
+
+    leaderboard = sorted([t for t in trials if not t["failed"]], key=lambda t: (-t["epochs"], -t["val_accuracy"]))
+    fields = ["name", "builder", "optimizer", "learning_rate", "batch_size", "epochs", "val_accuracy", "val_cer",
+              "val_loss", "latency_ms"]
+    leaderboard_path = os.path.join(args.output_path, "leaderboard.csv")
+    with open(leaderboard_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(leaderboard)
+
+    front = pareto_front([t for t in leaderboard if not math.isnan(t["latency_ms"])], "latency_ms", "val_accuracy")
+    print("[INFO] {:<40} {:>7} {:>10} {:>8} {:>12}".format("trial", "epochs", "accuracy", "CER", "latency ms"))
+    for t in leaderboard:
+        print("[INFO] {:<40} {:>7} {:>10.4f} {:>8.4f} {:>12.2f}{}".format(
+            t["name"], t["epochs"], t["val_accuracy"], t["val_cer"], t["latency_ms"], " *" if t in front else ""))
+    print("[INFO] leaderboard saved to {}, * marks the accuracy/latency Pareto front".format(leaderboard_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Usage:
+
+# Train the license recognition model (runs on CPU or GPU), an interrupted run continues from its last checkpoint:
+python train.py --builder=conv_bgru --optimizer=adagrad --batch_size=64 --epochs=1000 --output_path=output/license_recognition
+
+# Train a custom OCRSpec, e.g. from the results of ocr_sweep.py, with XLA auto-clustering:
+python train.py --spec='{"conv_filters": [16, 16], "rnn_size": 128}' --model_name=glpr-model-small --xla
+
+# Data-parallel training on several workers, every worker is started with its TF_CONFIG (see launch_local_workers.py):
+python train.py --multi_worker --batch_size=64 --scale_lr
+
+# Model with uint8 input, the generators pass uint8 images and the model rescales them itself:
+python train.py --builder=ds_cnn_bgru --rescale
+
+# Render 5 augmented epochs once and stream them from disk, a quarter of every batch is still augmented on the fly:
+python train.py --epoch_bank=output/license_recognition/epoch_bank --bank_epochs=5 --fresh_ratio=0.25
+
+# Gather the backgrounds from 50000 pre-cropped tiles instead of cropping them per plate, new tiles every 10 minutes:
+python train.py --background_tiles=50000 --tiles_refresh=600
+
+# Split the plates by near-duplicate group and train on the first plate of every group (see find_duplicates.py):
+python train.py --duplicate_index=data/license_recognition/glp-dhash.npz
+
+# Reproducible splits, stratified by county and plate length, stored in the plates dataset on the first run:
+python train.py --split_name=default
+
+# Sharded plates dataset (see shard_dataset.py), every worker reads its own shards of the training split:
+python train.py --multi_worker --plates=data/license_recognition/glp-sharded
+
+# Stop early and keep the best weights by plate accuracy instead of validation loss:
+python train.py --monitor_accuracy
+
+"""
+
+import argparse
+import contextlib
+import json
+import os
+
+import tensorflow as tf
+from tensorflow.keras.models import Model, save_model
+
+from augmented_epoch_bank import AugmentedEpochBank, AugmentedEpochBankGenerator
+from config.license_recognition import config
+from label_codec import LabelCodec
+from sharded_dataset_generator import ShardedDatasetGenerator
+from train_helper import GeneratorOptions, TrainHelper
+from utils.nn.callbacks import PlateAccuracyEvaluator
+from utils.nn.conv import OCR, OCRSpec
+from utils.nn.export import TFLiteExporter
+from utils.nn.training import CTCTrainer
+
+
+def build_model(builder, spec, input_shape, output_size, rescale=False):
+    # returns the predict model and its downsample factor
+    if spec is not None:
+        spec = OCRSpec(rescale=rescale, **json.loads(spec))
+        inputs, outputs = spec.build(input_shape, output_size)
+        return Model(inputs=inputs, outputs=outputs), spec.downsample_factor
+
+    inputs, outputs = getattr(OCR, builder)(input_shape, output_size, rescale)
+    return Model(inputs=inputs, outputs=outputs), config.DOWNSAMPLE_FACTOR
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Train the license recognition model")
+    parser.add_argument("--builder", help="OCR builder", type=str, default="conv_bgru")
+    parser.add_argument("--spec", help="OCRSpec arguments as JSON, replaces --builder", type=str, default=None)
+    parser.add_argument("--plates", help="HDF5 license plate dataset, MemmapDataset or sharded dataset directory",
+                        type=str, default="data/license_recognition/glp.h5")
+    parser.add_argument("--backgrounds", help="HDF5 background dataset or MemmapDataset directory", type=str,
+                        default="data/license_recognition/background.h5")
+    parser.add_argument("--optimizer", help="sdg, rmsprop, adam, adagrad or adadelta", type=str, default="adagrad")
+    parser.add_argument("--learning_rate", help="Learning rate, the optimizer default if omitted", type=float,
+                        default=None)
+    parser.add_argument("--batch_size", help="Batch size per worker", type=int, default=64)
+    parser.add_argument("--epochs", help="Maximum number of epochs", type=int, default=1000)
+    parser.add_argument("--rescale", help="uint8 model input, the images are rescaled inside the model",
+                        action="store_true")
+    parser.add_argument("--xla", help="Enable XLA auto-clustering", action="store_true")
+    parser.add_argument("--restart", help="Ignore existing checkpoints", action="store_true")
+    parser.add_argument("--multi_worker", help="Data-parallel training with the workers of TF_CONFIG",
+                        action="store_true")
+    parser.add_argument("--scale_lr", help="Scale the learning rate linearly with the number of workers",
+                        action="store_true")
+    parser.add_argument("--split_seed", help="Seed of the train/val/test split, shared by all workers", type=int,
+                        default=42)
+    parser.add_argument("--seed", help="Augmentation seed, the worker index is added to it", type=int, default=None)
+    parser.add_argument("--profile_steps", help="Trace the training steps START,STOP with the TF profiler", type=str,
+                        default=None)
+    parser.add_argument("--monitor_accuracy", help="Early stopping and checkpoints on the plate accuracy of the "
+                                                   "validation split instead of the validation loss",
+                        action="store_true")
+    parser.add_argument("--epoch_bank", help="Directory of the pre-augmented epoch bank of the training split",
+                        type=str, default=None)
+    parser.add_argument("--bank_epochs", help="Augmented epochs rendered into the bank", type=int, default=5)
+    parser.add_argument("--prune_banks", help="Remove the epoch banks of other versions before rendering a new one, "
+                                              "not while other runs use the bank directory", action="store_true")
+    parser.add_argument("--fresh_ratio", help="Fraction of every bank batch augmented on the fly", type=float,
+                        default=0.)
+    parser.add_argument("--background_tiles", help="Size of the background tile bank, 0 to crop every background",
+                        type=int, default=0)
+    parser.add_argument("--tiles_refresh", help="Seconds between refreshes of the background tile bank", type=float,
+                        default=None)
+    parser.add_argument("--duplicate_index", help="PerceptualHashIndex of the plates for duplicate-free splits",
+                        type=str, default=None)
+    parser.add_argument("--split_name", help="Split manifest of the plates dataset, created if it does not exist",
+                        type=str, default=None)
+    parser.add_argument("--output_path", type=str, default="output/license_recognition")
+    parser.add_argument("--model_name", type=str, default="glpr-model")
+    args = parser.parse_args()
+
+    # the strategy has to be created before any other TensorFlow operation,
+    # every worker is expected to hold a single replica (CPU or one GPU)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy() if args.multi_worker else None
+    num_workers = strategy.num_replicas_in_sync if strategy is not None else 1
+    worker_index = strategy.cluster_resolver.task_id if strategy is not None else 0
+    worker_index = worker_index or 0
+
+    output_dir = os.path.join(args.output_path, args.optimizer)
+    model_weights_path = os.path.join(output_dir, args.model_name) + "-weights.h5"
+    model_path = os.path.join(output_dir, args.model_name) + ".h5"
+    tflite_model_path = os.path.join(output_dir, args.model_name) + ".tflite"
+    checkpoint_dir = os.path.join(output_dir, "checkpoints", args.model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if args.xla:
+        tf.config.optimizer.set_jit(True)
+    print("[INFO] devices: {}".format(", ".join(d.name for d in tf.config.list_logical_devices())))
+
+    learning_rate = args.learning_rate or TrainHelper.LEARNING_RATES[args.optimizer]
+    if args.scale_lr:
+        learning_rate *= num_workers
+    print("[INFO] {} worker(s), global batch size {}, learning rate {}".format(
+        num_workers, args.batch_size * num_workers, learning_rate))
+
+    with strategy.scope() if strategy is not None else contextlib.nullcontext():
+        model, downsample_factor = build_model(args.builder, args.spec,
+                                               (config.IMAGE_WIDTH, config.IMAGE_HEIGHT, 1),
+                                               len(LabelCodec.ALPHABET) + 1, args.rescale)
+        optimizer = TrainHelper.get_optimizer(args.optimizer, learning_rate)
+    model.summary()
+
+    # every worker trains on its own shard of the training split with its own augmentation seed
+    seed = None if args.seed is None else args.seed + worker_index
+    train_generator, val_generator, _ = TrainHelper.create_generators(
+        args.plates, args.backgrounds, config.IMAGE_WIDTH, config.IMAGE_HEIGHT, downsample_factor,
+        config.MAX_TEXT_LEN, args.batch_size,
+        GeneratorOptions(split_seed=args.split_seed, num_shards=num_workers, shard_index=worker_index, seed=seed,
+                         rescale=args.rescale, background_tiles=args.background_tiles,
+                         tiles_refresh=args.tiles_refresh, duplicate_index=args.duplicate_index,
+                         split_name=args.split_name))
+
+    if args.epoch_bank is not None:
+        if isinstance(train_generator, ShardedDatasetGenerator):
+            raise ValueError("--epoch_bank needs a HDF5 or MemmapDataset plates dataset")
+        # every worker renders and streams the augmented epochs of its own shard
+        bank_dir = args.epoch_bank if num_workers == 1 else os.path.join(args.epoch_bank, "worker-%d" % worker_index)
+        bank_path = AugmentedEpochBank.render(bank_dir, train_generator, [args.plates, args.backgrounds],
+                                              args.bank_epochs, seed, prune=args.prune_banks)
+        train_generator = AugmentedEpochBankGenerator(bank_path, train_generator, args.fresh_ratio, seed)
+
+    profile_steps = [int(s) for s in args.profile_steps.split(",")] if args.profile_steps else None
+    accuracy_evaluator = PlateAccuracyEvaluator.from_generator(model, val_generator) if args.monitor_accuracy else None
+
+    trainer = CTCTrainer(model, optimizer, config.MAX_TEXT_LEN, strategy=strategy,
+                         global_batch_size=args.batch_size * num_workers)
+
+    if not trainer.is_chief:
+        # the other workers keep their logs and best weights apart from the ones of the chief
+        args.output_path = os.path.join(args.output_path, "worker-%d" % worker_index)
+        model_weights_path = os.path.join(args.output_path, args.model_name) + "-weights.h5"
+        os.makedirs(args.output_path, exist_ok=True)
+
+    if args.restart and trainer.is_chief and os.path.exists(checkpoint_dir):
+        tf.io.gfile.rmtree(checkpoint_dir)
+    checkpoint_manager = trainer.checkpoint_manager(checkpoint_dir)
+    initial_epoch = int(checkpoint_manager.checkpoint.epoch.numpy())
+    if initial_epoch > 0:
+        print("[INFO] resuming from {} at epoch {}".format(checkpoint_manager.latest_checkpoint, initial_epoch + 1))
+
+    trainer.fit(
+        train_generator.generator(),
+        steps_per_epoch=train_generator.numImages // args.batch_size,
+        epochs=args.epochs,
+        validation_batches=val_generator.generator(),
+        validation_steps=val_generator.numImages // args.batch_size,
+        callbacks=TrainHelper.get_callbacks(args.output_path, args.model_name, args.optimizer, model_weights_path,
+                                            args.batch_size, profile_steps, accuracy_evaluator),
+        checkpoint_manager=checkpoint_manager,
+        initial_epoch=initial_epoch)
+
+    if not trainer.is_chief:
+        return
+
+    # the best weights are stored by the checkpoint callback
+    model.load_weights(model_weights_path)
+    save_model(model, filepath=model_path, save_format="h5")
+    TFLiteExporter.save(model, tflite_model_path)
+    print("[INFO] model saved to {} and {}".format(model_path, tflite_model_path))
+
+
+if __name__ == '__main__':
+    main()
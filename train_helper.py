@@ -1,38 +1,263 @@
 import os
 
+import numpy as np
+from sklearn.model_selection import train_test_split
+from tensorflow.keras import backend as K
+from tensorflow.keras.layers import Input, Lambda
+from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import SGD, Adam, Adagrad, Adadelta, RMSprop
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.callbacks import CSVLogger, EarlyStopping, ReduceLROnPlateau
 from tensorflow.python.keras.callbacks import TensorBoard, ModelCheckpoint
 
+from background_tile_bank import BackgroundTileBank
+from label_codec import LabelCodec
+from licence_plate_dataset_generator import LicensePlateDatasetGenerator
+from license_plate_image_augmentor import LicensePlateImageAugmentor
+from sharded_dataset_generator import ShardedDatasetGenerator
+from utils.dedup import PerceptualHashIndex
+from utils.io import Hdf5DatasetLoader, MemmapDataset, ShardedDataset, SplitManifest
+from utils.metrics import PlateMetrics
+from utils.nn.callbacks import ThroughputMonitor
+
+
+class GeneratorOptions:
+    """Options of TrainHelper.create_generators, the defaults give the datasets and splits of the training notebook:
+    64% train, 16% validation, 20% test.
+
+    Distributed workers pass the same split_seed, so that they agree on the splits, and get equally sized shards
+    (num_shards, shard_index) of the training split and their own augmentation seed. With rescale, the generators
+    yield uint8 images for models with a rescaling layer. With background_tiles, the backgrounds come from a
+    BackgroundTileBank refreshed every tiles_refresh seconds. With the PerceptualHashIndex of the plates
+    (duplicate_index), the splits are made by near-duplicate group and only the first plate of every group is used.
+    With split_name, the splits are the SplitManifest of that name stored with the plates dataset (created on the
+    first run) and the images are read through its indexes instead of being loaded and copied.
+    """
+
+    def __init__(self, max_backgrounds=10000, split_seed=None, num_shards=1, shard_index=0, seed=None, rescale=False,
+                 background_tiles=0, tiles_refresh=None, duplicate_index=None, split_name=None):
+        self.max_backgrounds = max_backgrounds
+        self.split_seed = split_seed
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.seed = seed
+        self.rescale = rescale
+        self.background_tiles = background_tiles
+        self.tiles_refresh = tiles_refresh
+        self.duplicate_index = duplicate_index
+        self.split_name = split_name
+
 
 class TrainHelper:
+    LEARNING_RATES = {"sdg": 0.01, "rmsprop": 0.01, "adam": 0.01, "adagrad": 0.01, "adadelta": 1.0}
+
     @staticmethod
-    def get_optimizer(optimizer):
+    def get_optimizer(optimizer, learning_rate=None):
+        if learning_rate is None:
+            learning_rate = TrainHelper.LEARNING_RATES.get(optimizer)
+
         if optimizer == "sdg":
-            return SGD(learning_rate=0.01, decay=1e-6, momentum=0.9, nesterov=True, clipnorm=5)
+            return SGD(learning_rate=learning_rate, decay=1e-6, momentum=0.9, nesterov=True, clipnorm=5)
         if optimizer == "rmsprop":
-            return RMSprop(learning_rate=0.01)
+            return RMSprop(learning_rate=learning_rate)
         if optimizer == "adam":
-            return Adam(learning_rate=0.01)
+            return Adam(learning_rate=learning_rate)
         if optimizer == "adagrad":
-            return Adagrad(learning_rate=0.01)
+            return Adagrad(learning_rate=learning_rate)
         if optimizer == "adadelta":
-            return Adadelta(learning_rate=1.0)
+            return Adadelta(learning_rate=learning_rate)
+
+    @staticmethod
+    def create_train_model(inputs, outputs, max_text_len, optimizer):
+        # the training model takes the labels as additional inputs and adds the CTC loss,
+        # the predict model shares its layers and only maps images to character activations
+        labels = Input(name='labels', shape=(max_text_len,), dtype='float32')
+        input_length = Input(name='input_length', shape=(1,), dtype='int64')
+        label_length = Input(name='label_length', shape=(1,), dtype='int64')
+
+        ctc_loss = Lambda(lambda args: K.ctc_batch_cost(*args), name='ctc')(
+            [labels, outputs, input_length, label_length])
+
+        train_model = Model(inputs=[inputs, labels, input_length, label_length], outputs=outputs)
+        train_model.add_loss(K.mean(ctc_loss))
+        train_model.compile(loss=None, optimizer=TrainHelper.get_optimizer(optimizer))
+
+        predict_model = Model(inputs=inputs, outputs=outputs)
+        return train_model, predict_model
 
     @staticmethod
-    def get_callbacks(output_dir, model_name, optimizer, model_weigths_path):
+    def get_callbacks(output_dir, model_name, optimizer, model_weigths_path, batch_size=None, profile_steps=None,
+                      accuracy_evaluator=None):
         logdir = os.path.join(output_dir, optimizer, 'logs')
+        os.makedirs(logdir, exist_ok=True)
         chkpt_filepath = model_name + '--{epoch:02d}--{loss:.3f}--{val_loss:.3f}.h5'
 
+        # with an accuracy evaluator, early stopping and checkpoints follow the plate accuracy instead of the loss
+        monitor = 'val_loss' if accuracy_evaluator is None else 'val_accuracy'
+
         callbacks = [
-            EarlyStopping(monitor='val_loss', min_delta=0.0001, patience=4, verbose=1),
-            ModelCheckpoint(filepath=model_weigths_path, monitor='val_loss', save_best_only=True,
+            EarlyStopping(monitor=monitor, min_delta=0.0001, patience=4, verbose=1),
+            ModelCheckpoint(filepath=model_weigths_path, monitor=monitor, save_best_only=True,
                             save_weights_only=True, verbose=1),
-            TensorBoard(log_dir=logdir)]
+            TensorBoard(log_dir=logdir),
+            CSVLogger(os.path.join(logdir, 'history.csv'), append=True)]
+
+        # the evaluator has to run first, it adds val_accuracy to the logs the other callbacks see
+        if accuracy_evaluator is not None:
+            callbacks.insert(0, accuracy_evaluator)
 
         if optimizer in ["sdg", "rmsprop"]:
             callbacks.append(
                 ReduceLROnPlateau(monitor='val_loss', factor=0.1, patience=2, verbose=1, mode='min', min_delta=0.01,
                                   cooldown=0, min_lr=0))
 
+        # step time, input wait time, samples/sec and memory, to tell input-bound from compute-bound training
+        if batch_size is not None:
+            callbacks.append(ThroughputMonitor(logdir, batch_size, profile_steps=profile_steps))
+
         return callbacks
+
+    @staticmethod
+    def create_generators(plates_path, backgrounds_path, img_w, img_h, downsample_factor, max_text_len, batch_size,
+                          options=None):
+        # train, validation and test generators of the plates dataset, by its format: a directory with train, val
+        # and test ShardedDatasets (see shard_dataset.py), a MemmapDataset directory or a HDF5 file
+        options = GeneratorOptions() if options is None else options
+        if ShardedDataset.exists(os.path.join(plates_path, "train")):
+            factory = TrainHelper.create_sharded_generators
+        elif MemmapDataset.exists(plates_path):
+            factory = TrainHelper.create_memmap_generators
+        else:
+            factory = TrainHelper.create_hdf5_generators
+        return factory(plates_path, backgrounds_path, img_w, img_h, downsample_factor, max_text_len, batch_size,
+                       options)
+
+    @staticmethod
+    def create_hdf5_generators(plates_path, backgrounds_path, img_w, img_h, downsample_factor, max_text_len,
+                               batch_size, options):
+        loader = Hdf5DatasetLoader()
+        background_images = loader.load(backgrounds_path, shuffle=True, max_items=options.max_backgrounds,
+                                        random_state=np.random.RandomState(options.split_seed))
+        labels = loader.load_labels(plates_path)
+        splits = TrainHelper.__shard_splits__(TrainHelper.__split_indexes__(labels, options, plates_path), options)
+        if options.split_name is not None:
+            images = loader.open(plates_path)
+        else:
+            # every worker only loads the rows of its training shard and of the validation and test splits
+            rows = np.unique(np.concatenate(splits))
+            images, labels = loader.load_rows(plates_path, rows), labels[rows]
+            splits = [np.searchsorted(rows, split) for split in splits]
+
+        augmentor = TrainHelper.__create_augmentor__(background_images, img_w, img_h, options)
+        return TrainHelper.__create_index_generators__(images, labels, splits, img_w, img_h, downsample_factor,
+                                                       max_text_len, batch_size, augmentor, options.seed)
+
+    @staticmethod
+    def create_memmap_generators(plates_path, backgrounds_path, img_w, img_h, downsample_factor, max_text_len,
+                                 batch_size, options):
+        # memory-mapped datasets (see MemmapDataset) are split by index, the generators gather their batches from
+        # the shared read-only arrays and no process holds a private copy of the images
+        background_images = TrainHelper.__select_backgrounds__(MemmapDataset.load(backgrounds_path), options)
+        images, labels = MemmapDataset.load(plates_path)
+
+        augmentor = TrainHelper.__create_augmentor__(background_images, img_w, img_h, options)
+        splits = TrainHelper.__shard_splits__(TrainHelper.__split_indexes__(labels, options, plates_path), options)
+        return TrainHelper.__create_index_generators__(images, labels, splits, img_w, img_h, downsample_factor,
+                                                       max_text_len, batch_size, augmentor, options.seed)
+
+    @staticmethod
+    def create_sharded_generators(plates_path, backgrounds_path, img_w, img_h, downsample_factor, max_text_len,
+                                  batch_size, options):
+        if MemmapDataset.exists(backgrounds_path):
+            background_images = TrainHelper.__select_backgrounds__(MemmapDataset.load(backgrounds_path), options)
+        else:
+            background_images = Hdf5DatasetLoader().load(backgrounds_path, shuffle=True,
+                                                         max_items=options.max_backgrounds,
+                                                         random_state=np.random.RandomState(options.split_seed))
+
+        augmentor = TrainHelper.__create_augmentor__(background_images, img_w, img_h, options)
+
+        # the training shards are divided among the workers, every worker evaluates on all validation and test shards,
+        # read in order exactly once per evaluation
+        return [ShardedDatasetGenerator(ShardedDataset(os.path.join(plates_path, split)), img_w, img_h,
+                                        downsample_factor, max_text_len, batch_size, augmentor, options.seed,
+                                        num_workers=options.num_shards if split == "train" else 1,
+                                        worker_index=options.shard_index if split == "train" else 0,
+                                        shuffle=split == "train")
+                for split in SplitManifest.SPLITS]
+
+    @staticmethod
+    def __create_augmentor__(background_images, img_w, img_h, options):
+        tile_bank = TrainHelper.__create_tile_bank__(background_images, img_w, img_h, options.background_tiles,
+                                                     options.tiles_refresh, options.seed)
+        return LicensePlateImageAugmentor(img_w, img_h, background_images, options.seed,
+                                          normalize=not options.rescale, tile_bank=tile_bank)
+
+    @staticmethod
+    def __select_backgrounds__(background_images, options):
+        # a random selection like the shuffled HDF5 backgrounds instead of the first ones in file order, the rows
+        # are read in increasing order from the memory-mapped arrays
+        count = len(background_images[0])
+        if count <= options.max_backgrounds:
+            return background_images
+        rows = np.sort(np.random.RandomState(options.split_seed).permutation(count)[:options.max_backgrounds])
+        return tuple(a[rows] for a in background_images)
+
+    @staticmethod
+    def __split_indexes__(labels, options, dataset_path):
+        split_seed = options.split_seed
+        groups = None
+        if options.duplicate_index is not None:
+            # near-duplicates of a plate never end up in another split, see find_duplicates.py
+            groups = PerceptualHashIndex.load(options.duplicate_index).groups()
+            if len(groups) != len(labels):
+                raise ValueError("The duplicate index has {} images, the dataset {}, update it with "
+                                 "find_duplicates.py".format(len(groups), len(labels)))
+
+        if options.split_name is not None:
+            # a manifest made with a duplicate index keeps the near-duplicates, in the split of their group
+            return SplitManifest.load_or_create(dataset_path, labels, options.split_name, split_seed, groups)
+        if groups is not None:
+            return PerceptualHashIndex.split(groups, seed=split_seed)
+
+        indexes = np.random.RandomState(split_seed).permutation(len(labels))
+        train, test = train_test_split(indexes, test_size=0.2, random_state=split_seed)
+        train, val = train_test_split(train, test_size=0.2, random_state=split_seed)
+        return train, val, test
+
+    @staticmethod
+    def __shard_splits__(splits, options):
+        # equally sized shards of the training split, every worker validates and tests on the whole splits
+        train, val, test = splits
+        if options.num_shards > 1:
+            shard_size = len(train) // options.num_shards
+            train = train[options.shard_index * shard_size:(options.shard_index + 1) * shard_size]
+        return train, val, test
+
+    @staticmethod
+    def __create_index_generators__(images, labels, splits, img_w, img_h, downsample_factor, max_text_len, batch_size,
+                                    augmentor, seed):
+        train, val, test = splits
+        return [LicensePlateDatasetGenerator(images, labels, img_w, img_h, downsample_factor, max_text_len, batch_size,
+                                             augmentor, seed, indexes=split)
+                for split in [train, val, test]]
+
+    @staticmethod
+    def __create_tile_bank__(background_images, img_w, img_h, num_tiles, refresh_interval, seed):
+        if not num_tiles:
+            return None
+        tile_bank = BackgroundTileBank.create(background_images[0], (img_h, img_w), num_tiles, seed)
+        if refresh_interval:
+            tile_bank.start_refresh(refresh_interval)
+        return tile_bank
+
+    @staticmethod
+    def evaluate_accuracy(predict_model, batches):
+        # plate level accuracy, a prediction only counts if the whole license number is correct
+        correct = total = 0
+        for batch in batches:
+            predicted, predicted_lengths = LabelCodec.decode_predictions(predict_model.predict(batch["input"]))
+            correct += PlateMetrics.exact_match(predicted, predicted_lengths, batch["labels"].astype(np.int32),
+                                                batch["label_length"].astype(np.int64)).sum()
+            total += len(predicted)
+
+        return correct / max(total, 1)
@@ -0,0 +1,2 @@
+# import the necessary packages
+from .perceptualhashindex import PerceptualHashIndex
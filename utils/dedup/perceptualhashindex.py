@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+
+
+class PerceptualHashIndex:
+    """Groups near-duplicate images by the Hamming distance of their 64 bit difference hashes (dHash).
+
+    The index uses multi-index hashing: the hash is cut into max_distance + 1 chunks and every chunk has its own
+    table. Two hashes within max_distance bits agree in at least one chunk (pigeonhole principle), so only the
+    images sharing a chunk value are compared instead of all pairs. Near-duplicates are merged into groups with a
+    union-find forest, and images can be added at any time, e.g. as new plates are appended to a dataset.
+    """
+
+    POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def __init__(self, max_distance=4):
+        self.max_distance = max_distance
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.parent = []
+
+        # bit ranges of the chunks, one table per chunk maps a chunk value to the images with that value
+        self.bounds = np.linspace(0, 64, max_distance + 2).astype(int).tolist()
+        self.tables = [{} for _ in range(max_distance + 1)]
+        # images with exactly the same hash join the group of the first one and are not put into the tables,
+        # so that uniform images (e.g. black backgrounds) do not pile up in single buckets
+        self.exact = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def hash(images):
+        """Returns the 64 bit dHash of every grayscale image: the sign of the horizontal gradients of the image
+        shrunk to 9x8 pixels."""
+        small = np.stack([cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA) for image in images])
+        bits = (small[:, :, 1:] > small[:, :, :-1]).reshape(len(small), 64)
+        return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+    @staticmethod
+    def distance(hashes, other):
+        # Hamming distances, popcount of the xor byte by byte
+        xor = np.bitwise_xor(np.asarray(hashes, dtype=np.uint64), np.uint64(other))
+        return PerceptualHashIndex.POPCOUNT[xor.view(np.uint8)].reshape(len(xor), 8).sum(axis=1)
+
+    def __chunks__(self, hashes):
+        chunks = [(hashes >> np.uint64(low)) & np.uint64((1 << (high - low)) - 1)
+                  for low, high in zip(self.bounds[:-1], self.bounds[1:])]
+        return np.stack(chunks, axis=1).tolist()
+
+    def __find__(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # path halving
+            item = parent[item]
+        return item
+
+    def __union__(self, a, b):
+        a, b = self.__find__(a), self.__find__(b)
+        if a != b:
+            # the older image is the root, so a group is represented by its first image
+            self.parent[max(a, b)] = min(a, b)
+
+    def __insert__(self, items, hashes, link=True):
+        for item, value, chunks in zip(items, hashes.tolist(), self.__chunks__(hashes)):
+            if value in self.exact:
+                if link:
+                    self.__union__(item, self.exact[value])
+                continue
+            self.exact[value] = item
+
+            candidates = []
+            for table, chunk in zip(self.tables, chunks):
+                bucket = table.setdefault(chunk, [])
+                candidates.extend(bucket)
+                bucket.append(item)
+
+            if link and candidates:
+                candidates = np.unique(candidates)
+                for candidate in candidates[self.distance(self.hashes[candidates], value) <= self.max_distance]:
+                    self.__union__(item, int(candidate))
+
+    def add(self, images=None, hashes=None):
+        """Adds images (or their hashes) and returns the group of every new image."""
+        hashes = self.hash(images) if hashes is None else np.asarray(hashes, dtype=np.uint64)
+        start = len(self.hashes)
+        self.hashes = np.concatenate([self.hashes, hashes])
+        self.parent.extend(range(start, len(self.hashes)))
+
+        self.__insert__(range(start, len(self.hashes)), hashes)
+        return self.groups()[start:]
+
+    def groups(self):
+        """Returns the group of every image, the index of the first image of its group."""
+        parent = np.array(self.parent, dtype=np.int64)
+        # pointer jumping until every image points to its root
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                return parent
+            parent = grandparent
+
+    def duplicate_groups(self):
+        """Returns the images of every group with more than one image, as a list of index arrays."""
+        groups = self.groups()
+        order = np.argsort(groups, kind="stable")
+        roots, starts, counts = np.unique(groups[order], return_index=True, return_counts=True)
+        return [order[s:s + c] for s, c in zip(starts, counts) if c > 1]
+
+    @staticmethod
+    def split(groups, test_size=0.2, val_size=0.2, seed=None, keep_duplicates=False):
+        """Splits the images into train, validation and test indexes like the two train_test_split calls of the
+        training, but by group: near-duplicates never end up in different splits. Without keep_duplicates only the
+        first image of every group is kept, so the splits are free of duplicates."""
+        groups = np.asarray(groups)
+        roots, first, inverse = np.unique(groups, return_index=True, return_inverse=True)
+        order = np.random.RandomState(seed).permutation(len(roots))
+
+        num_test = int(round(len(roots) * test_size))
+        num_val = int(round((len(roots) - num_test) * val_size))
+        assignment = np.zeros(len(roots), dtype=np.int8)
+        assignment[order[num_test:num_test + num_val]] = 1
+        assignment[order[:num_test]] = 2
+
+        if keep_duplicates:
+            return [np.flatnonzero(assignment[inverse] == s) for s in range(3)]
+        return [np.sort(first[assignment == s]) for s in range(3)]
+
+    def save(self, path):
+        np.savez(path, hashes=self.hashes, parent=self.groups(), max_distance=self.max_distance)
+        return path
+
+    @staticmethod
+    def load(path):
+        data = np.load(path)
+        index = PerceptualHashIndex(int(data["max_distance"]))
+        index.hashes = data["hashes"]
+        index.parent = data["parent"].tolist()
+        # the tables are rebuilt, the groups are already known
+        index.__insert__(range(len(index.hashes)), index.hashes, link=False)
+        return index
+
+    def add_dataset(self, db_path, key="images", chunk_size=10000):
+        """Adds the images of a HDF5 dataset which are not indexed yet, e.g. the rows appended since the last run,
+        and returns the number of added images."""
+        # h5py is only needed to read the datasets, so it is not imported with the package
+        import h5py
+
+        with h5py.File(db_path, "r") as db:
+            images = db[key]
+            start = len(self)
+            for i in range(start, len(images), chunk_size):
+                self.add(images[i:i + chunk_size])
+            return len(images) - start
@@ -4,6 +4,10 @@ Usage:
 # Create train an test data:
 python generate_tfrecord.py --train_size=0.7 --csv_input=<PATH_TO_ANNOTATIONS_FOLDER>/train_labels.csv --img_path=<PATH_TO_IMAGES> --output_path=<PATH_TO_OUTPUT_FOLDER>
 
+# Create 16 train and eval shards (train-00000-of-00016, ...) with 8 processes, the input_path of the pipeline config
+# then is a pattern like "data/plate_detection/train-?????-of-00016":
+python generate_tfrecord.py --train_size=0.7 --num_shards=16 --num_workers=8 --seed=42 --csv_input=<PATH_TO_ANNOTATIONS_FOLDER>/train_labels.csv --img_path=<PATH_TO_IMAGES> --output_path=<PATH_TO_OUTPUT_FOLDER>
+
 """
 
 from __future__ import division
@@ -12,6 +16,9 @@ from __future__ import absolute_import
 
 import os
 import io
+import struct
+import time
+import numpy as np
 import pandas as pd
 import tensorflow as tf
 import absl
@@ -20,12 +27,16 @@ from PIL import Image
 from numpy.random.mtrand import RandomState
 from object_detection.utils import dataset_util
 from collections import namedtuple, OrderedDict
+from multiprocessing import Pool
 
 flags = absl.flags
 flags.DEFINE_float('train_size', 0.7, 'Percentage of the data set used for the training data')
 flags.DEFINE_string('csv_input', '', 'Path to the CSV input')
 flags.DEFINE_string('output_path', '', 'Path to output TFRecord')
 flags.DEFINE_string('img_path', '', 'Path to images')
+flags.DEFINE_integer('num_shards', 1, 'Number of TFRecord files per split, 1 writes train.tfrecord and eval.tfrecord')
+flags.DEFINE_integer('num_workers', os.cpu_count(), 'Number of processes writing the shards')
+flags.DEFINE_integer('seed', 42, 'Seed of the train / eval split')
 FLAGS = flags.FLAGS
 
 
@@ -43,36 +54,64 @@ def class_text_to_int(row_label):
         None
 
 
+# explicit column types of the labelImg CSV (see xml_to_csv.py), pandas does not have to infer them
+CSV_DTYPES = {'filename': str, 'width': np.int64, 'height': np.int64, 'class': str,
+              'xmin': np.float64, 'ymin': np.float64, 'xmax': np.float64, 'ymax': np.float64}
+
+
 def split(df, group):
+    # sort once, then the rows of every file are a contiguous slice of the column arrays,
+    # the object of a group is a dict of its column slices
     data = namedtuple('data', ['filename', 'object'])
-    gb = df.groupby(group)
-    return [data(filename, gb.get_group(x)) for filename, x in zip(gb.groups.keys(), gb.groups)]
+    df = df.sort_values(group, kind='mergesort')
+    keys = df[group].values
+    columns = {c: df[c].values for c in df.columns}
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(keys)]
+    return [data(keys[s], {c: v[s:e] for c, v in columns.items()}) for s, e in zip(starts, ends)]
+
+
+def jpeg_size(encoded_jpg):
+    # width and height from the SOF segment of a JPEG, the image is not decoded
+    if encoded_jpg[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 < len(encoded_jpg) and encoded_jpg[i] == 0xFF:
+            marker, length = encoded_jpg[i + 1], struct.unpack('>H', encoded_jpg[i + 2:i + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+                height, width = struct.unpack('>HH', encoded_jpg[i + 5:i + 9])
+                return width, height
+            i += 2 + length
+
+    # other formats: PIL only reads the header on open
+    return Image.open(io.BytesIO(encoded_jpg)).size
 
 
 def create_tf_example(group, path):
     with tf.io.gfile.GFile(os.path.join(path, '{}'.format(group.filename)), 'rb') as fid:
         encoded_jpg = fid.read()
-    encoded_jpg_io = io.BytesIO(encoded_jpg)
-    image = Image.open(encoded_jpg_io)
-    width, height = image.size
+
+    # the encoded bytes are passed through, the size comes from the annotations of labelImg or the image header
+    if 'width' in group.object and 'height' in group.object:
+        width, height = int(group.object['width'][0]), int(group.object['height'][0])
+    else:
+        width, height = jpeg_size(encoded_jpg)
 
     filename = group.filename.encode('utf8')
     image_format = b'jpg'
     # check if the image format is matching with your images.
-    xmins = []
-    xmaxs = []
-    ymins = []
-    ymaxs = []
-    classes_text = []
-    classes = []
-
-    for index, row in group.object.iterrows():
-        xmins.append(row['xmin'] / width)
-        xmaxs.append(row['xmax'] / width)
-        ymins.append(row['ymin'] / height)
-        ymaxs.append(row['ymax'] / height)
-        classes_text.append(row['class'].encode('utf8'))
-        classes.append(class_text_to_int(row['class']))
+    # normalized box coordinates of all boxes at once
+    xmins = (group.object['xmin'] / width).tolist()
+    xmaxs = (group.object['xmax'] / width).tolist()
+    ymins = (group.object['ymin'] / height).tolist()
+    ymaxs = (group.object['ymax'] / height).tolist()
+
+    # every distinct class is mapped once
+    names, inverse = np.unique(group.object['class'], return_inverse=True)
+    texts = [n.encode('utf8') for n in names]
+    labels = [class_text_to_int(n) for n in names]
+    classes_text = [texts[i] for i in inverse]
+    classes = [labels[i] for i in inverse]
 
     tf_example = tf.train.Example(features=tf.train.Features(feature={
         'image/height': dataset_util.int64_feature(height),
@@ -91,30 +130,56 @@ def create_tf_example(group, path):
     return tf_example
 
 
-def create_tf_record(name, examples, img_path):
-    writer = tf.io.TFRecordWriter(os.path.join(FLAGS.output_path, name))
+def write_shard(job):
+    # writes the examples of one shard, runs in a worker process
+    output_file, examples, img_path = job
+    writer = tf.io.TFRecordWriter(output_file)
+    count = 0
+    for group in split(examples, 'filename'):
+        writer.write(create_tf_example(group, img_path).SerializeToString())
+        count += 1
+    writer.close()
+    return count, os.path.getsize(output_file)
 
-    grouped = split(examples, 'filename')
-    for group in grouped:
-        tf_example = create_tf_example(group, img_path)
-        writer.write(tf_example.SerializeToString())
 
-    writer.close()
-    print('{} images stored in TFRecords: {}'.format(len(examples), os.path.join(FLAGS.output_path, name)))
+def create_tf_record(name, examples, filenames, img_path, num_shards, pool):
+    # the images are distributed over the shards in the given (shuffled) order, all boxes of an image in one shard
+    if num_shards == 1:
+        output_files = [os.path.join(FLAGS.output_path, '{}.tfrecord'.format(name))]
+    else:
+        output_files = [os.path.join(FLAGS.output_path, '{}-{:05d}-of-{:05d}'.format(name, i, num_shards))
+                        for i in range(num_shards)]
+    jobs = [(output_file, examples[examples['filename'].isin(shard)], img_path)
+            for output_file, shard in zip(output_files, np.array_split(filenames, num_shards))]
+
+    start = time.perf_counter()
+    results = pool.map(write_shard, jobs)
+    elapsed = time.perf_counter() - start
+
+    images, size = sum(r[0] for r in results), sum(r[1] for r in results)
+    print('{} images ({} boxes) stored in {} TFRecords: {}'.format(images, len(examples), num_shards,
+                                                                   output_files[0] if num_shards == 1 else
+                                                                   os.path.join(FLAGS.output_path, name + '-*')))
+    print('{:.1f}s, {:.0f} images/s, {:.1f} MB/s'.format(elapsed, images / max(elapsed, 1e-9),
+                                                         size / 1e6 / max(elapsed, 1e-9)))
 
 
 def main(_):
     img_path = os.path.join(os.getcwd(), FLAGS.img_path)
-    examples = pd.read_csv(FLAGS.csv_input)
+    examples = pd.read_csv(FLAGS.csv_input, dtype=CSV_DTYPES)
     print('{} images found'.format(len(examples)))
 
-    #  train / test split
-    rng = RandomState()
-    train = examples.sample(frac=FLAGS.train_size, random_state=rng)
-    test = examples.loc[~examples.index.isin(train.index)]
-
-    create_tf_record('train.tfrecord', train, img_path)
-    create_tf_record('eval.tfrecord', test, img_path)
+    #  train / test split by image, so that all boxes of an image are in the same split, reproducible by the seed
+    filenames = np.unique(examples['filename'].values)
+    filenames = filenames[RandomState(FLAGS.seed).permutation(len(filenames))]
+    num_train = int(round(FLAGS.train_size * len(filenames)))
+    train_files, test_files = filenames[:num_train], filenames[num_train:]
+    train = examples[examples['filename'].isin(train_files)]
+    test = examples[examples['filename'].isin(test_files)]
+
+    with Pool(min(FLAGS.num_workers, FLAGS.num_shards)) as pool:
+        create_tf_record('train', train, train_files, img_path, FLAGS.num_shards, pool)
+        create_tf_record('eval', test, test_files, img_path, FLAGS.num_shards, pool)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,5 @@
+# import the necessary packages
+from .interpreter import load_interpreter
+from .platedetector import PlateDetector
+from .licenserecognizer import LicenseRecognizer
+from .licenseplatepipeline import LicensePlatePipeline
@@ -0,0 +1,25 @@
+# the interpreter class is resolved on first use, so importing this module never pulls in TensorFlow
+_interpreter_class = None
+
+
+def get_interpreter_class():
+    global _interpreter_class
+
+    if _interpreter_class is None:
+        try:
+            # the standalone runtime only ships the interpreter and imports in a fraction of a second
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # fall back to the interpreter bundled with the full TensorFlow package
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        _interpreter_class = Interpreter
+
+    return _interpreter_class
+
+
+def load_interpreter(model_path, num_threads=None):
+    interpreter = get_interpreter_class()(model_path=model_path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    return interpreter
@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+
+from .licenserecognizer import LicenseRecognizer
+from .platedetector import PlateDetector
+
+
+class LicensePlatePipeline:
+    def __init__(self, detection_model_path, recognition_model_path, img_w, img_h, score_threshold=0.5,
+                 num_threads=None):
+        self.detector = PlateDetector(detection_model_path, score_threshold, num_threads)
+        self.recognizer = LicenseRecognizer(recognition_model_path, img_w, img_h, num_threads)
+
+    @staticmethod
+    def decode_image(buffer):
+        # decode from memory, cv2.imread() fails on utf-8 encoded file paths.
+        # Empty (e.g. still being written) and corrupt files are not decodable, cv2 raises on empty buffers
+        if not buffer:
+            return None
+        try:
+            image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error:
+            return None
+        if image is None:
+            return None
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    @staticmethod
+    def load_image(path):
+        with open(path, "rb") as f:
+            return LicensePlatePipeline.decode_image(f.read())
+
+    def process(self, image):
+        # returns the license number, the normalized plate box and the detection score,
+        # the license number and box are None if no plate was detected
+        detection = self.detector.detect(image)
+        if detection is None:
+            return None, None, 0.
+
+        box, score = detection
+        plate_img = PlateDetector.crop(image, box)
+        if plate_img.size == 0:
+            return None, box, score
+
+        return self.recognizer.recognize(plate_img), box, score
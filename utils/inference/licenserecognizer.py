@@ -0,0 +1,31 @@
+import numpy as np
+from PIL import Image
+
+from label_codec import LabelCodec
+from utils.preprocessing import AspectAwarePreprocessor
+from .interpreter import load_interpreter
+
+
+class LicenseRecognizer:
+    def __init__(self, model_path, img_w, img_h, num_threads=None):
+        self.preprocessor = AspectAwarePreprocessor(img_w, img_h)
+
+        self.interpreter = load_interpreter(model_path, num_threads)
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+
+        # models trained with rescale take the uint8 pixels as they are
+        self.rescale = self.input_details[0]['dtype'] == np.uint8
+
+    def preprocess(self, plate_img):
+        image = self.preprocessor.preprocess(Image.fromarray(plate_img))
+        image = np.round(image).astype(np.uint8) if self.rescale else image.astype(np.float32) / 255.
+        return np.expand_dims(image.T, axis=-1)
+
+    def predict(self, plate_img):
+        self.interpreter.set_tensor(self.input_details[0]['index'], np.asarray([self.preprocess(plate_img)]))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_details[0]['index'])[0]
+
+    def recognize(self, plate_img):
+        return LabelCodec.decode_prediction(self.predict(plate_img))
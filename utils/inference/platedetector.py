@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+from .interpreter import load_interpreter
+
+
+class PlateDetector:
+    def __init__(self, model_path, score_threshold=0.5, num_threads=None):
+        self.score_threshold = score_threshold
+
+        self.interpreter = load_interpreter(model_path, num_threads)
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+
+        # network input size, e.g. (1, 300, 300, 3)
+        _, self.input_height, self.input_width, _ = self.input_details[0]['shape']
+
+        # float models expect the image normalized between -1 and 1
+        self.input_mean = 127.5
+        self.input_std = 127.5
+
+    def __preprocess__(self, image):
+        image = cv2.resize(image, (self.input_width, self.input_height), interpolation=cv2.INTER_AREA)
+        input_data = np.expand_dims(image, axis=0)
+
+        if self.input_details[0]['dtype'] == np.float32:
+            input_data = (np.float32(input_data) - self.input_mean) / self.input_std
+
+        return input_data.astype(self.input_details[0]['dtype'])
+
+    def detect(self, image):
+        # returns the normalized box (ymin, xmin, ymax, xmax) and score of the best detection,
+        # or None if no plate was found with a sufficient score
+        self.interpreter.set_tensor(self.input_details[0]['index'], self.__preprocess__(image))
+        self.interpreter.invoke()
+
+        boxes = self.interpreter.get_tensor(self.output_details[0]['index'])[0]
+        scores = self.interpreter.get_tensor(self.output_details[2]['index'])[0]
+        num_detections = int(np.squeeze(self.interpreter.get_tensor(self.output_details[3]['index'])))
+
+        if num_detections == 0:
+            return None
+
+        best = int(np.argmax(scores[:num_detections]))
+        if scores[best] < self.score_threshold:
+            return None
+
+        return boxes[best], float(scores[best])
+
+    @staticmethod
+    def crop(image, box):
+        ymin, xmin, ymax, xmax = np.clip(box, 0., 1.)
+
+        x1 = int(xmin * image.shape[1])
+        x2 = int(xmax * image.shape[1])
+        y1 = int(ymin * image.shape[0])
+        y2 = int(ymax * image.shape[0])
+
+        return image[y1:y2, x1:x2]
@@ -1,3 +1,6 @@
 # import the necessary packages
 from .hdf5datasetwriter import HDF5DatasetWriter
 from .hdf5datasetloader import Hdf5DatasetLoader
+from .memmapdataset import MemmapDataset
+from .splitmanifest import SplitManifest
+from .shardeddataset import ShardedDataset, ShardedDatasetWriter
@@ -1,4 +1,3 @@
-import h5py
 import numpy as np
 
 
@@ -10,7 +9,9 @@ class Hdf5DatasetLoader:
         if self.preprocessors is None:
             self.preprocessors = []
 
-    def load(self, db_path, shuffle=False, max_items=np.inf):
+    def load(self, db_path, shuffle=False, max_items=np.inf, random_state=None):
+        # h5py is only needed for training, so it is not imported with the package
+        import h5py
 
         db = h5py.File(db_path, 'r')
         images = np.array(db["images"])
@@ -19,7 +20,7 @@ class Hdf5DatasetLoader:
 
         if shuffle:
             randomized_indexes = np.arange(len(images))
-            np.random.shuffle(randomized_indexes)
+            (np.random if random_state is None else random_state).shuffle(randomized_indexes)
             images = images[randomized_indexes]
             labels = labels[randomized_indexes]
 
@@ -37,3 +38,38 @@ class Hdf5DatasetLoader:
                 images[i] = image
 
         return images, labels
+
+    def load_rows(self, db_path, indexes, chunk_size=10000):
+        # only the rows given by the (increasing) indexes are kept, the file is read sequentially chunk by chunk,
+        # e.g. for the shard of a training worker instead of the whole dataset
+        import h5py
+
+        indexes = np.asarray(indexes)
+        with h5py.File(db_path, 'r') as db:
+            dataset = db["images"]
+            images = np.empty((len(indexes),) + dataset.shape[1:], dtype=dataset.dtype)
+            for start in range(0, len(dataset), chunk_size):
+                first, last = np.searchsorted(indexes, [start, start + chunk_size])
+                if first < last:
+                    images[first:last] = dataset[start:start + chunk_size][indexes[first:last] - start]
+
+        # preprocess images
+        for i, image in enumerate(images):
+            for p in self.preprocessors:
+                image = p.preprocess(image)
+                images[i] = image
+
+        return images
+
+    def load_labels(self, db_path):
+        import h5py
+
+        with h5py.File(db_path, 'r') as db:
+            return np.array([l.decode('utf-8') if isinstance(l, bytes) else l for l in db["labels"]])
+
+    def open(self, db_path):
+        # the images stay in the file and are read by index, e.g. through the indexes of a SplitManifest,
+        # instead of being loaded into memory
+        import h5py
+
+        return h5py.File(db_path, 'r')["images"]
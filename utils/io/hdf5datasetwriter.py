@@ -1,10 +1,23 @@
 # import the necessary packages
 import os
-import h5py
 
 
 class HDF5DatasetWriter:
-    def __init__(self, dims, outputPath, dataKey="images", bufSize=1000):
+    def __init__(self, dims, outputPath, dataKey="images", bufSize=1000, append=False, metaKey=None):
+        # h5py is only needed for training, so it is not imported with the package
+        import h5py
+
+        # with a metaKey, a string per row (e.g. the variant of a plate) is
+        # stored in a third dataset of that name, see add(..., meta)
+        self.metaKey = metaKey
+        self.meta = None
+
+        # in append mode the datasets grow with every flush, an existing
+        # file is continued after its last row
+        if append:
+            self.__open_append__(h5py, dims, outputPath, dataKey, bufSize, metaKey)
+            return
+
         # check to see if the output path exists, and if so, raise
         # an exception
         if os.path.exists(outputPath):
@@ -22,17 +35,46 @@ class HDF5DatasetWriter:
         self.db = h5py.File(outputPath, "w")
         self.data = self.db.create_dataset(dataKey, dims, dtype="uint8")
         self.labels = self.db.create_dataset("labels", (dims[0],), dtype=h5py.special_dtype(vlen=str))
+        if metaKey is not None:
+            self.meta = self.db.create_dataset(metaKey, (dims[0],), dtype=h5py.special_dtype(vlen=str))
 
         # store the buffer size, then initialize the buffer itself
         # along with the index into the floyd
         self.bufSize = bufSize
-        self.buffer = {"data": [], "labels": []}
+        self.buffer = {"data": [], "labels": [], "meta": []}
         self.idx = 0
 
-    def add(self, rows, labels):
+    def __open_append__(self, h5py, dims, outputPath, dataKey, bufSize, metaKey):
+        outputDir = os.path.dirname(outputPath)
+        if outputDir and not os.path.exists(outputDir):
+            os.makedirs(outputDir)
+
+        self.db = h5py.File(outputPath, "a")
+        if dataKey in self.db:
+            self.data = self.db[dataKey]
+            self.labels = self.db["labels"]
+        else:
+            self.data = self.db.create_dataset(dataKey, (0,) + tuple(dims[1:]), maxshape=(None,) + tuple(dims[1:]),
+                                               chunks=(max(1, min(bufSize, 1000)),) + tuple(dims[1:]), dtype="uint8")
+            self.labels = self.db.create_dataset("labels", (0,), maxshape=(None,),
+                                                 dtype=h5py.special_dtype(vlen=str))
+        if metaKey is not None:
+            # rows of a file written without meta data get empty strings
+            if metaKey not in self.db:
+                self.db.create_dataset(metaKey, (self.data.shape[0],), maxshape=(None,),
+                                       dtype=h5py.special_dtype(vlen=str))
+            self.meta = self.db[metaKey]
+
+        self.bufSize = bufSize
+        self.buffer = {"data": [], "labels": [], "meta": []}
+        self.idx = self.data.shape[0]
+
+    def add(self, rows, labels, meta=None):
         # add the rows and labels to the buffer
         self.buffer["data"].extend(rows)
         self.buffer["labels"].extend(labels)
+        if self.meta is not None:
+            self.buffer["meta"].extend([""] * len(labels) if meta is None else meta)
 
         # check to see if the buffer needs to be flushed to disk
         if len(self.buffer["data"]) >= self.bufSize:
@@ -41,10 +83,17 @@ class HDF5DatasetWriter:
     def flush(self):
         # write the buffers to disk then reset the buffer
         i = self.idx + len(self.buffer["data"])
+        if i > self.data.shape[0] and self.data.maxshape[0] is None:
+            self.data.resize(i, axis=0)
+            self.labels.resize(i, axis=0)
+            if self.meta is not None:
+                self.meta.resize(i, axis=0)
         self.data[self.idx:i] = self.buffer["data"]
         self.labels[self.idx:i] = self.buffer["labels"]
+        if self.meta is not None:
+            self.meta[self.idx:i] = self.buffer["meta"]
         self.idx = i
-        self.buffer = {"data": [], "labels": []}
+        self.buffer = {"data": [], "labels": [], "meta": []}
 
     def close(self):
         # check to see if there are any other entries in the buffer
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+
+class MemmapDataset:
+    """An HDF5 dataset exported to a directory with images.npy and labels.npy.
+
+    Loading maps the arrays read-only into memory, so any number of training processes on the same machine share a
+    single copy of the dataset in the page cache instead of each holding its own.
+    """
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, "images.npy")) and os.path.isfile(os.path.join(path, "labels.npy"))
+
+    @staticmethod
+    def export(db_path, output_dir, chunk_size=10000):
+        # h5py is only needed for training, so it is not imported with the package
+        import h5py
+
+        if MemmapDataset.exists(output_dir):
+            return output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        with h5py.File(db_path, "r") as db:
+            images = db["images"]
+            labels = np.array([l.decode() if isinstance(l, bytes) else l for l in db["labels"]])
+
+            # copy chunk-wise, the dataset never has to fit into memory, and publish the file only when complete
+            tmp_path = os.path.join(output_dir, "images.tmp.npy")
+            output = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=images.shape)
+            for start in range(0, len(images), chunk_size):
+                output[start:start + chunk_size] = images[start:start + chunk_size]
+            output.flush()
+            del output
+
+        np.save(os.path.join(output_dir, "labels.npy"), labels.astype(str))
+        os.replace(tmp_path, os.path.join(output_dir, "images.npy"))
+        return output_dir
+
+    @staticmethod
+    def load(path):
+        images = np.load(os.path.join(path, "images.npy"), mmap_mode="r")
+        labels = np.load(os.path.join(path, "labels.npy"))
+        return images, labels
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import random
+
+import numpy as np
+
+from label_codec import LabelCodec
+from .hdf5datasetwriter import HDF5DatasetWriter
+
+
+class ShardedDatasetWriter:
+    """Writes a dataset as fixed-size shards: shard-00000.npz, shard-00001.npz, ... with the images, the encoded
+    license numbers and their lengths, and a manifest.json with the number of images and the SHA-1 checksum of every
+    shard. A shard is written as soon as it is full, the manifest when the writer is closed.
+
+    The same add/close interface as HDF5DatasetWriter, so the writers are interchangeable.
+    """
+
+    def __init__(self, output_dir, image_shape, shard_size=10000, max_text_len=10):
+        if os.path.exists(os.path.join(output_dir, "manifest.json")):
+            raise ValueError("The supplied `output_dir` already contains a dataset and cannot be overwritten. "
+                             "Manually delete it before continuing.", output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.output_dir = output_dir
+        self.image_shape = tuple(image_shape)
+        self.shard_size = shard_size
+        self.max_text_len = max_text_len
+
+        self.buffer = {"data": [], "labels": []}
+        self.shards = []
+
+    def add(self, rows, labels):
+        self.buffer["data"].extend(rows)
+        self.buffer["labels"].extend(labels)
+        while len(self.buffer["data"]) >= self.shard_size:
+            self.__write_shard__(self.buffer["data"][:self.shard_size], self.buffer["labels"][:self.shard_size])
+            self.buffer = {"data": self.buffer["data"][self.shard_size:],
+                           "labels": self.buffer["labels"][self.shard_size:]}
+
+    def __write_shard__(self, rows, numbers):
+        # the license numbers are encoded once here instead of in every epoch of every worker
+        lengths = np.array([len(n) for n in numbers], dtype=np.uint8)
+        codes = np.zeros((len(numbers), self.max_text_len), dtype=np.uint8)
+        for i, number in enumerate(numbers):
+            codes[i, :len(number)] = LabelCodec.encode_number(number)
+
+        name = "shard-{:05d}.npz".format(len(self.shards))
+        path = os.path.join(self.output_dir, name)
+        # written aside and renamed, so that a shard file is always complete
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, images=np.asarray(rows, dtype=np.uint8).reshape((-1,) + self.image_shape), codes=codes,
+                     lengths=lengths, numbers=np.asarray(numbers, dtype=str))
+        os.replace(path + ".tmp", path)
+        self.shards.append({"file": name, "count": len(numbers), "sha1": ShardedDataset.checksum(path)})
+
+    def close(self):
+        if len(self.buffer["data"]) > 0:
+            self.__write_shard__(self.buffer["data"], self.buffer["labels"])
+            self.buffer = {"data": [], "labels": []}
+
+        manifest = {"num_images": sum(s["count"] for s in self.shards), "shard_size": self.shard_size,
+                    "image_shape": list(self.image_shape), "max_text_len": self.max_text_len,
+                    "alphabet": LabelCodec.ALPHABET, "shards": self.shards}
+        path = os.path.join(self.output_dir, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+class ShardedDataset:
+    """Reads a dataset written by ShardedDatasetWriter.
+
+    Every training worker reads its own shards (round robin by worker index), a few shards at a time interleaved
+    sample by sample through a shuffle buffer. Each shard is read with one sequential file read, which suits network
+    file systems far better than random access into a single large HDF5 file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["alphabet"] != LabelCodec.ALPHABET:
+            raise ValueError("The labels of {} are encoded with another alphabet".format(path))
+
+        self.shards = self.manifest["shards"]
+        self.numImages = self.manifest["num_images"]
+        self.image_shape = tuple(self.manifest["image_shape"])
+        self.max_text_len = self.manifest["max_text_len"]
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, "manifest.json"))
+
+    @staticmethod
+    def checksum(path, block_size=1 << 20):
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                sha1.update(block)
+        return sha1.hexdigest()
+
+    def verify(self):
+        """Returns the files of the shards whose checksum does not match the manifest."""
+        return [s["file"] for s in self.shards
+                if ShardedDataset.checksum(os.path.join(self.path, s["file"])) != s["sha1"]]
+
+    def worker_shards(self, num_workers=1, worker_index=0):
+        if len(self.shards) < num_workers:
+            raise ValueError("{} shards cannot be assigned to {} workers".format(len(self.shards), num_workers))
+        return self.shards[worker_index::num_workers]
+
+    def read_shard(self, shard):
+        with np.load(os.path.join(self.path, shard["file"])) as data:
+            return data["images"], data["codes"], data["lengths"], data["numbers"]
+
+    def samples(self, num_workers=1, worker_index=0, shuffle_buffer=10000, cycle_length=4, seed=None,
+                passes=np.inf, shuffle=True):
+        """Yields (image, codes, length, number) of the shards of the worker: cycle_length shards are open at a
+        time and read alternately, the samples pass a shuffle buffer of shuffle_buffer samples (none with 0). Every
+        pass visits the shards in another order. Without shuffle, e.g. for validation and test data, the shards are
+        read one after the other in their order and every pass yields the same samples in the same order."""
+        rng = random.Random(seed)
+        shards = self.worker_shards(num_workers, worker_index)
+        if not shuffle:
+            shuffle_buffer, cycle_length = 0, 1
+        buffer = []
+
+        epoch = 0
+        while epoch < passes:
+            # the shards are taken from the end of the list
+            order = list(reversed(shards))
+            if shuffle:
+                rng.shuffle(order)
+            open_shards = []
+            while order or open_shards:
+                # keep cycle_length shards open, read one sample of each in turn
+                while order and len(open_shards) < cycle_length:
+                    shard = self.read_shard(order.pop())
+                    open_shards.append(iter(zip(*shard)))
+                for it in list(open_shards):
+                    sample = next(it, None)
+                    if sample is None:
+                        open_shards.remove(it)
+                        continue
+                    if len(buffer) < shuffle_buffer:
+                        buffer.append(sample)
+                        continue
+                    if not buffer:
+                        yield sample
+                        continue
+                    # a random sample of the buffer is yielded and replaced by the new one
+                    i = rng.randrange(len(buffer))
+                    yield buffer[i]
+                    buffer[i] = sample
+            epoch += 1
+
+        rng.shuffle(buffer)
+        for sample in buffer:
+            yield sample
+
+    @staticmethod
+    def from_hdf5(db_path, output_dir, shard_size=10000, max_text_len=10, indexes=None, chunk_size=10000):
+        """Writes the HDF5 dataset (or the rows of it given by indexes, e.g. of a SplitManifest) as a sharded
+        dataset."""
+        # h5py is only needed for the conversion, so it is not imported with the package
+        import h5py
+
+        with h5py.File(db_path, "r") as db:
+            images, labels = db["images"], db["labels"]
+            indexes = np.arange(len(images)) if indexes is None else np.asarray(indexes)
+            writer = ShardedDatasetWriter(output_dir, images.shape[1:], shard_size, max_text_len)
+            for start in range(0, len(indexes), chunk_size):
+                # h5py reads by index in increasing order, the rows are put back into the order of the indexes
+                rows = indexes[start:start + chunk_size]
+                order = np.argsort(rows)
+                restore = np.argsort(order)
+                writer.add(images[rows[order]][restore],
+                           [l.decode("utf-8") if isinstance(l, bytes) else l for l in labels[rows[order]][restore]])
+            writer.close()
+        return ShardedDataset(output_dir)
+
+    def to_hdf5(self, output_path):
+        """Writes the sharded dataset in shard order to a new HDF5 dataset."""
+        writer = HDF5DatasetWriter((self.numImages,) + self.image_shape, output_path,
+                                   bufSize=self.manifest["shard_size"])
+        for shard in self.shards:
+            images, _, _, numbers = self.read_shard(shard)
+            writer.add(images, list(numbers))
+        writer.close()
+        return output_path
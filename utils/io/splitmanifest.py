@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+import numpy as np
+
+
+class SplitManifest:
+    """Persistent train/validation/test splits of a dataset as index arrays.
+
+    The splits are stratified by county prefix and plate length, so that every split has the same mix of counties
+    and number lengths, and are stored next to the HDF5 dataset as <dataset>.splits-<name>.npz or, for a
+    MemmapDataset directory, in it as splits-<name>.npz. Runs with the same manifest train and evaluate on exactly
+    the same plates, and the generators read the images through the indexes instead of copying the splits.
+    """
+
+    SPLITS = ["train", "val", "test"]
+
+    @staticmethod
+    def strata(labels):
+        # county prefix and number of characters, e.g. "B-AB123" -> "B:6"
+        labels = np.asarray([l.decode("utf-8") if isinstance(l, bytes) else l for l in labels], dtype=str)
+        counties = np.char.partition(labels, "-")[:, 0]
+        lengths = np.char.str_len(np.char.replace(labels, "-", ""))
+        return np.char.add(np.char.add(counties, ":"), lengths.astype(str))
+
+    @staticmethod
+    def create(labels, test_size=0.2, val_size=0.2, seed=None, groups=None):
+        """Returns the train, validation and test indexes, the same proportions as the two train_test_split calls
+        of the training notebook. With groups (e.g. of a PerceptualHashIndex) all images of a group share a split."""
+        random = np.random.RandomState(seed)
+        strata = SplitManifest.strata(labels)
+        if groups is not None:
+            # the groups are split, stratified by the plate of their first image
+            roots, first, inverse = np.unique(groups, return_index=True, return_inverse=True)
+            strata = strata[first]
+
+        # random order within every stratum, then a random offset per stratum, so that small strata are
+        # assigned to the test and validation splits with the right probability instead of always to train
+        names, stratum = np.unique(strata, return_inverse=True)
+        order = np.lexsort((random.random_sample(len(stratum)), stratum))
+        counts = np.bincount(stratum)
+        starts = np.cumsum(counts) - counts
+        ranks = np.empty(len(stratum), dtype=np.int64)
+        ranks[order] = np.arange(len(stratum)) - starts[stratum[order]]
+        position = (ranks + random.random_sample(len(names))[stratum]) / counts[stratum]
+
+        assignment = np.zeros(len(stratum), dtype=np.int8)
+        assignment[position < test_size + (1. - test_size) * val_size] = 1
+        assignment[position < test_size] = 2
+        if groups is not None:
+            assignment = assignment[inverse]
+
+        splits = [np.flatnonzero(assignment == s) for s in range(3)]
+        # the training split in random order, e.g. for the shards of distributed workers
+        splits[0] = random.permutation(splits[0])
+        return splits
+
+    @staticmethod
+    def path(path, name="default"):
+        # glp.h5 -> glp.splits-<name>.npz next to the file, <dir>/splits-<name>.npz for a MemmapDataset directory
+        if os.path.isdir(path):
+            return os.path.join(path, "splits-{}.npz".format(name))
+        return "{}.splits-{}.npz".format(os.path.splitext(path)[0], name)
+
+    @staticmethod
+    def fingerprint(groups):
+        # identifies the duplicate groups a manifest was made with, "" without groups
+        return "" if groups is None else hashlib.sha1(np.ascontiguousarray(groups, dtype=np.int64)).hexdigest()
+
+    @staticmethod
+    def save(path, splits, name="default", **attrs):
+        """Stores the splits next to the HDF5 dataset or in the MemmapDataset directory at path. The file is
+        written aside and renamed, the dataset itself is never opened for writing, so that concurrent runs can
+        create the same manifest."""
+        manifest_path = SplitManifest.path(path, name)
+        with open("{}.{}.tmp".format(manifest_path, os.getpid()), "wb") as f:
+            np.savez(f, **dict(zip(SplitManifest.SPLITS, splits)), **attrs)
+        os.replace(f.name, manifest_path)
+
+    @staticmethod
+    def load(path, name="default"):
+        """Returns the stored train, validation and test indexes and the attributes, or None if there are none."""
+        manifest_path = SplitManifest.path(path, name)
+        if not os.path.isfile(manifest_path):
+            return None
+        with np.load(manifest_path) as data:
+            attrs = {k: data[k].item() for k in data.files if k not in SplitManifest.SPLITS}
+            return [data[s] for s in SplitManifest.SPLITS], attrs
+
+    @staticmethod
+    def load_or_create(path, labels, name="default", seed=None, groups=None):
+        """Returns the stored splits of the dataset, creates and stores them first if there are none or if they
+        were made for another number of images. A manifest made with another seed or other duplicate groups is an
+        error, it would silently split differently than requested."""
+        manifest = SplitManifest.load(path, name)
+        if manifest is not None and manifest[1].get("num_images") == len(labels):
+            splits, attrs = manifest
+            if seed is not None and attrs.get("seed") != seed:
+                raise ValueError("The split manifest {} of {} was made with seed {}, not {}, use another split "
+                                 "name".format(name, path, attrs.get("seed"), seed))
+            if attrs.get("groups") != SplitManifest.fingerprint(groups):
+                raise ValueError("The split manifest {} of {} was made with other duplicate groups, use another "
+                                 "split name".format(name, path))
+            print("[INFO] using split manifest {} of {}".format(name, path))
+            return splits
+
+        splits = SplitManifest.create(labels, seed=seed, groups=groups)
+        try:
+            SplitManifest.save(path, splits, name, num_images=len(labels), seed=-1 if seed is None else seed,
+                               groups=SplitManifest.fingerprint(groups))
+        except OSError as e:
+            # e.g. a read-only dataset, the splits are still used for this run
+            print("[WARNING] split manifest {} of {} not saved: {}".format(name, path, e))
+        print("[INFO] created split manifest {} of {}: {} train, {} validation, {} test".format(
+            name, path, *[len(s) for s in splits]))
+        return splits
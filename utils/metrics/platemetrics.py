@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class PlateMetrics:
+    """Vectorized metrics over batches of encoded license numbers, given as padded (N, L) matrices plus lengths."""
+
+    @staticmethod
+    def __pad__(labels, width):
+        labels = np.asarray(labels)
+        if labels.shape[1] >= width:
+            return labels[:, :width]
+        return np.pad(labels, ((0, 0), (0, width - labels.shape[1])), constant_values=-1)
+
+    @staticmethod
+    def exact_match(predicted, predicted_length, truth, truth_length):
+        # a number matches if it has the same length and the same classes within that length
+        predicted_length = np.asarray(predicted_length).reshape(-1)
+        truth_length = np.asarray(truth_length).reshape(-1)
+        width = max(np.asarray(predicted).shape[1], np.asarray(truth).shape[1])
+        predicted = PlateMetrics.__pad__(predicted, width)
+        truth = PlateMetrics.__pad__(truth, width)
+
+        within = np.arange(width)[np.newaxis, :] < truth_length[:, np.newaxis]
+        same = (predicted == truth) | ~within
+        return (predicted_length == truth_length) & same.all(axis=1)
+
+    @staticmethod
+    def edit_distance(predicted, predicted_length, truth, truth_length):
+        # Levenshtein distance of every pair, the dynamic programming table is computed
+        # for the whole batch at once, row by row over the predicted sequences
+        predicted = np.asarray(predicted)
+        truth = np.asarray(truth)
+        predicted_length = np.asarray(predicted_length, dtype=np.int64).reshape(-1)
+        truth_length = np.asarray(truth_length, dtype=np.int64).reshape(-1)
+
+        n, truth_width = truth.shape
+        index = np.arange(n)
+
+        previous = np.tile(np.arange(truth_width + 1), (n, 1))
+        distances = truth_length.copy()  # empty predictions
+        for i in range(1, predicted.shape[1] + 1):
+            substitution = previous[:, :-1] + (predicted[:, i - 1:i] != truth)
+            deletion = previous[:, 1:] + 1
+            best = np.minimum(substitution, deletion)
+
+            current = np.empty_like(previous)
+            current[:, 0] = i
+            for j in range(1, truth_width + 1):
+                current[:, j] = np.minimum(best[:, j - 1], current[:, j - 1] + 1)  # insertion
+
+            done = predicted_length == i
+            distances[done] = current[index[done], truth_length[done]]
+            previous = current
+
+        return distances
+
+    @staticmethod
+    def character_error_rate(predicted, predicted_length, truth, truth_length):
+        distances = PlateMetrics.edit_distance(predicted, predicted_length, truth, truth_length)
+        return float(distances.sum()) / max(float(np.sum(truth_length)), 1.)
@@ -0,0 +1,3 @@
+# import the necessary packages
+from .throughputmonitor import ThroughputMonitor
+from .plateaccuracyevaluator import PlateAccuracyEvaluator
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+from tensorflow.keras.callbacks import Callback
+
+from label_codec import LabelCodec
+from utils.metrics import PlateMetrics
+
+
+class PlateAccuracyEvaluator(Callback):
+    """Computes the plate accuracy (exact match) and the character error rate on the validation split after every
+    epoch and adds them to the epoch logs as val_accuracy and val_cer.
+
+    The validation images are augmented once when the callback is created, every epoch only runs the predict model
+    in large batches and the vectorized decoding and metrics. Callbacks later in the list, like EarlyStopping or
+    ModelCheckpoint, can monitor val_accuracy.
+    """
+
+    def __init__(self, predict_model, images, labels, label_lengths, batch_size=1024, verbose=1):
+        super().__init__()
+        self.predict_model = predict_model
+        self.images = images
+        self.labels = labels.astype(np.int32)
+        self.label_lengths = label_lengths.astype(np.int64).reshape(-1)
+        self.batch_size = batch_size
+        self.verbose = verbose
+
+    @staticmethod
+    def from_generator(predict_model, generator, steps=None, batch_size=1024, verbose=1):
+        # renders the (augmented) validation split once, by default one pass over the generator
+        steps = steps or max(generator.numImages // generator.batch_size, 1)
+        batches = [batch for _, batch in zip(range(steps), generator.generator())]
+        images = np.concatenate([b["input"] for b in batches])
+        return PlateAccuracyEvaluator(
+            predict_model,
+            images if images.dtype == np.uint8 else images.astype(np.float32),
+            np.concatenate([b["labels"] for b in batches]),
+            np.concatenate([b["label_length"] for b in batches]),
+            batch_size, verbose)
+
+    def evaluate(self):
+        predictions = self.predict_model.predict(self.images, batch_size=self.batch_size)
+        predicted, predicted_lengths = LabelCodec.decode_predictions(predictions)
+
+        accuracy = PlateMetrics.exact_match(predicted, predicted_lengths, self.labels, self.label_lengths).mean()
+        cer = PlateMetrics.character_error_rate(predicted, predicted_lengths, self.labels, self.label_lengths)
+        return float(accuracy), cer
+
+    def on_epoch_end(self, epoch, logs=None):
+        start = time.perf_counter()
+        accuracy, cer = self.evaluate()
+
+        if logs is not None:
+            logs["val_accuracy"] = accuracy
+            logs["val_cer"] = cer
+
+        if self.verbose:
+            print("[INFO] epoch {}: val_accuracy: {:.4f} - val_cer: {:.4f} ({} images in {:.1f}s)".format(
+                epoch + 1, accuracy, cer, len(self.images), time.perf_counter() - start))
@@ -0,0 +1,99 @@
+import csv
+import os
+import time
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+
+def process_rss():
+    # resident set size of this process in bytes
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class ThroughputMonitor(Callback):
+    """Records per training step the compute time, the time spent waiting for the input generator, the samples/sec
+    and the RSS of the process, as TensorBoard scalars and in a CSV file.
+
+    The wait time is the time between the end of a step and the begin of the next one. It is only meaningful with
+    CTCTrainer, which fetches the next batch there, a high wait time means the training is input-bound. Keras fit
+    fetches the batch inside the train function, so there the wait time is close to zero and the input time is part
+    of the compute time. Optionally the TF profiler traces the steps [profile_steps[0], profile_steps[1]).
+    """
+
+    def __init__(self, log_dir, batch_size, log_every=10, profile_steps=None):
+        super().__init__()
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.log_every = log_every
+        self.profile_steps = profile_steps
+
+        self.writer = None
+        self.csv_file = None
+        self.csv_writer = None
+        self.global_step = 0
+        self.epoch = 0
+        self.step_start = None
+        self.step_end = None
+        self.profiling = False
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.writer = tf.summary.create_file_writer(os.path.join(self.log_dir, "throughput"))
+
+        csv_path = os.path.join(self.log_dir, "throughput.csv")
+        exists = os.path.exists(csv_path)
+        self.csv_file = open(csv_path, "a", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        if not exists:
+            self.csv_writer.writerow(["epoch", "step", "step_time", "wait_time", "samples_per_sec", "rss_mb"])
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+        # the first fetch of an epoch also includes the validation of the previous one, so it isn't counted
+        self.step_end = None
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.profile_steps is not None and self.global_step == self.profile_steps[0]:
+            tf.profiler.experimental.start(self.log_dir)
+            self.profiling = True
+        self.step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        step_time = now - self.step_start
+        wait_time = self.step_start - self.step_end if self.step_end is not None else 0.
+        self.step_end = now
+
+        if self.profiling and self.global_step + 1 >= self.profile_steps[1]:
+            tf.profiler.experimental.stop()
+            self.profiling = False
+
+        if self.global_step % self.log_every == 0:
+            samples_per_sec = self.batch_size / (step_time + wait_time)
+            rss_mb = process_rss() / 2 ** 20
+
+            self.csv_writer.writerow([self.epoch, self.global_step, step_time, wait_time, samples_per_sec, rss_mb])
+            with self.writer.as_default():
+                tf.summary.scalar("throughput/step_time", step_time, step=self.global_step)
+                tf.summary.scalar("throughput/wait_time", wait_time, step=self.global_step)
+                tf.summary.scalar("throughput/samples_per_sec", samples_per_sec, step=self.global_step)
+                tf.summary.scalar("throughput/rss_mb", rss_mb, step=self.global_step)
+
+        self.global_step += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.csv_file.flush()
+        self.writer.flush()
+
+    def on_train_end(self, logs=None):
+        if self.profiling:
+            tf.profiler.experimental.stop()
+            self.profiling = False
+        self.csv_file.close()
+        self.writer.close()
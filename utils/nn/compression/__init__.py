@@ -0,0 +1,4 @@
+# import the necessary packages
+from .distiller import Distiller
+from .structuredpruner import StructuredPruner
+from .inferenceoptimizer import InferenceOptimizer, FusedAffine
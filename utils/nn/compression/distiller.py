@@ -0,0 +1,58 @@
+import tensorflow as tf
+
+
+class Distiller(tf.keras.Model):
+    """Trains a student recognizer on CTC and on the per time step output distribution of a frozen teacher.
+
+    Both models map the same input to softmax outputs with the same number of time steps, the loss is
+    (1 - alpha) * CTC + alpha * temperature^2 * KL(teacher || student) averaged over the time steps.
+    """
+
+    def __init__(self, student, teacher, alpha=0.5, temperature=2.0):
+        super().__init__()
+        if student.output_shape[1:] != teacher.output_shape[1:]:
+            raise ValueError("Student and teacher need the same output shape", student.output_shape,
+                             teacher.output_shape)
+
+        self.student = student
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.alpha = alpha
+        self.temperature = temperature
+
+    def call(self, inputs, training=False):
+        return self.student(inputs, training=training)
+
+    def __soften__(self, predictions):
+        # the models end with a softmax, so the logits are recovered (up to a constant) as log probabilities
+        logits = tf.math.log(tf.clip_by_value(predictions, 1e-8, 1.0))
+        return tf.nn.softmax(logits / self.temperature, axis=-1)
+
+    def __losses__(self, data, training):
+        images = data["input"]
+        teacher_predictions = self.teacher(images, training=False)
+        student_predictions = self.student(images, training=training)
+
+        ctc_loss = tf.reduce_mean(tf.keras.backend.ctc_batch_cost(
+            data["labels"], student_predictions, data["input_length"], data["label_length"]))
+
+        teacher_soft = self.__soften__(teacher_predictions)
+        student_soft = self.__soften__(student_predictions)
+        kl = tf.reduce_sum(teacher_soft * (tf.math.log(tf.clip_by_value(teacher_soft, 1e-8, 1.0)) -
+                                           tf.math.log(tf.clip_by_value(student_soft, 1e-8, 1.0))), axis=-1)
+        kl_loss = tf.reduce_mean(kl) * self.temperature ** 2
+
+        loss = (1. - self.alpha) * ctc_loss + self.alpha * kl_loss
+        return loss, ctc_loss, kl_loss
+
+    def train_step(self, data):
+        with tf.GradientTape() as tape:
+            loss, ctc_loss, kl_loss = self.__losses__(data, training=True)
+
+        gradients = tape.gradient(loss, self.student.trainable_variables)
+        self.optimizer.apply_gradients(zip(gradients, self.student.trainable_variables))
+        return {"loss": loss, "ctc_loss": ctc_loss, "kl_loss": kl_loss}
+
+    def test_step(self, data):
+        loss, ctc_loss, kl_loss = self.__losses__(data, training=False)
+        return {"loss": loss, "ctc_loss": ctc_loss, "kl_loss": kl_loss}
@@ -0,0 +1,192 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import (
+    Conv1D, Conv2D, SeparableConv1D, SeparableConv2D, Dense, GRU, LSTM, Bidirectional,
+    BatchNormalization, Input, InputLayer
+)
+from tensorflow.keras.models import Model
+
+
+class FusedAffine(tf.keras.layers.Layer):
+    """Per channel scale and offset, an inference batch normalization reduced to a single multiply-add."""
+
+    def __init__(self, channels=None, **kwargs):
+        super().__init__(**kwargs)
+        self.channels = channels
+
+    def build(self, input_shape):
+        channels = self.channels or int(input_shape[-1])
+        self.scale = self.add_weight(name="scale", shape=(channels,), initializer="ones", trainable=False)
+        self.offset = self.add_weight(name="offset", shape=(channels,), initializer="zeros", trainable=False)
+        super().build(input_shape)
+
+    def call(self, inputs):
+        return inputs * self.scale + self.offset
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({"channels": self.channels})
+        return config
+
+
+class InferenceOptimizer:
+    """Rewrites a trained recognizer into an inference-only graph.
+
+    Batch normalizations are folded into the preceding convolution or dense layer if it has no activation, otherwise
+    into the input projection of the following dense or RNN layer, and replaced by a FusedAffine layer if neither is
+    possible. The training-only inputs (labels, input_length, label_length) are dropped.
+    """
+
+    CUSTOM_OBJECTS = {"FusedAffine": FusedAffine}
+
+    @staticmethod
+    def strip_training_inputs(model, input_name="input", output_name="output"):
+        if len(model.inputs) == 1:
+            return model
+        return Model(inputs=model.get_layer(input_name).input, outputs=model.get_layer(output_name).output)
+
+    @staticmethod
+    def __chain__(model):
+        # the recognizers are plain chains of layers, anything else is not supported by the rewrite
+        layers = [layer for layer in model.layers if not isinstance(layer, InputLayer)]
+        previous = model.input
+        for layer in layers:
+            if layer.input is not previous:
+                raise ValueError("Only sequential chains of layers can be optimized", layer.name)
+            previous = layer.output
+        return layers
+
+    @staticmethod
+    def __batch_norm_affine__(layer):
+        # inference batch normalization: gamma * (x - mean) / sqrt(var + eps) + beta = scale * x + offset
+        if layer.axis not in ([len(layer.input_shape) - 1], [-1]):
+            raise ValueError("Only batch normalizations over the last axis can be fused", layer.name)
+
+        mean = tf.keras.backend.get_value(layer.moving_mean)
+        variance = tf.keras.backend.get_value(layer.moving_variance)
+        gamma = tf.keras.backend.get_value(layer.gamma) if layer.scale else np.ones_like(mean)
+        beta = tf.keras.backend.get_value(layer.beta) if layer.center else np.zeros_like(mean)
+
+        scale = gamma / np.sqrt(variance + layer.epsilon)
+        return scale, beta - mean * scale
+
+    @staticmethod
+    def __clone__(layer, **overrides):
+        config = layer.get_config()
+        config.update(overrides)
+        return layer.__class__.from_config(config)
+
+    @staticmethod
+    def __fold_into_previous__(layer, scale, offset):
+        # y = scale * (W x + b) + offset, the output channels are on the last axis of every kernel
+        weights = layer.get_weights()
+        kernel = weights[-2] if layer.use_bias else weights[-1]
+        bias = weights[-1] if layer.use_bias else np.zeros(kernel.shape[-1], dtype=kernel.dtype)
+
+        folded = weights[:-2] if layer.use_bias else weights[:-1]
+        folded += [kernel * scale, bias * scale + offset]
+        return InferenceOptimizer.__clone__(layer, use_bias=True), folded
+
+    @staticmethod
+    def __fold_rnn_input__(weights, scale, offset, gru_reset_after):
+        # x' = scale * x + offset only enters the input projection: x' K = x (diag(scale) K) + offset K
+        kernel, recurrent_kernel, bias = weights
+        shift = offset.dot(kernel)
+        bias = bias.copy()
+        if gru_reset_after:
+            bias[0] += shift  # input bias, the recurrent bias is bias[1]
+        else:
+            bias += shift
+        return [kernel * scale[:, np.newaxis], recurrent_kernel, bias]
+
+    @staticmethod
+    def __fold_into_next__(layer, scale, offset):
+        weights = layer.get_weights()
+
+        if isinstance(layer, Dense):
+            kernel, bias = weights if layer.use_bias else (weights[0], np.zeros(layer.units, dtype=weights[0].dtype))
+            return InferenceOptimizer.__clone__(layer, use_bias=True), [kernel * scale[:, np.newaxis],
+                                                                        bias + offset.dot(kernel)]
+
+        rnn = layer.forward_layer if isinstance(layer, Bidirectional) else layer
+        reset_after = isinstance(rnn, GRU) and rnn.reset_after
+        if isinstance(layer, Bidirectional):
+            folded = InferenceOptimizer.__fold_rnn_input__(weights[:3], scale, offset, reset_after) + \
+                     InferenceOptimizer.__fold_rnn_input__(weights[3:], scale, offset, reset_after)
+        else:
+            folded = InferenceOptimizer.__fold_rnn_input__(weights, scale, offset, reset_after)
+        return layer, folded
+
+    @staticmethod
+    def __can_fold_into_previous__(layer):
+        return isinstance(layer, (Conv1D, Conv2D, SeparableConv1D, SeparableConv2D, Dense)) and \
+               layer.get_config()["activation"] == "linear"
+
+    @staticmethod
+    def __can_fold_into_next__(layer):
+        if isinstance(layer, Dense):
+            return True
+        rnn = layer.forward_layer if isinstance(layer, Bidirectional) else layer
+        return isinstance(rnn, (GRU, LSTM)) and rnn.use_bias
+
+    @staticmethod
+    def optimize(model):
+        model = InferenceOptimizer.strip_training_inputs(model)
+        layers = InferenceOptimizer.__chain__(model)
+
+        # first pass: decide for every layer which (possibly folded) layer and weights replace it
+        replacements = []
+        pending = None  # affine of a batch normalization, waiting to be folded into the next layer
+        i = 0
+        while i < len(layers):
+            layer = layers[i]
+            following = layers[i + 1] if i + 1 < len(layers) else None
+
+            if isinstance(following, BatchNormalization) and InferenceOptimizer.__can_fold_into_previous__(layer) \
+                    and pending is None:
+                scale, offset = InferenceOptimizer.__batch_norm_affine__(following)
+                replacements.append(InferenceOptimizer.__fold_into_previous__(layer, scale, offset))
+                i += 2
+                continue
+
+            if isinstance(layer, BatchNormalization):
+                scale, offset = InferenceOptimizer.__batch_norm_affine__(layer)
+                if pending is None and following is not None and InferenceOptimizer.__can_fold_into_next__(following):
+                    pending = (scale, offset)
+                else:
+                    affine = FusedAffine(channels=len(scale), name=layer.name)
+                    replacements.append((affine, [scale, offset]))
+                i += 1
+                continue
+
+            if pending is not None:
+                replacements.append(InferenceOptimizer.__fold_into_next__(layer, *pending))
+                pending = None
+            else:
+                replacements.append((InferenceOptimizer.__clone__(layer), layer.get_weights()))
+            i += 1
+
+        # second pass: wire the new graph and load the weights
+        input_layer = model.layers[0]
+        input_data = Input(name=input_layer.name, shape=model.input_shape[1:], dtype=model.input.dtype)
+        x = input_data
+        for layer, weights in replacements:
+            if layer in layers:
+                # folding into a RNN keeps its configuration, a fresh instance is needed for the new graph
+                layer = InferenceOptimizer.__clone__(layer)
+            x = layer(x)
+            layer.set_weights(weights)
+
+        return Model(inputs=input_data, outputs=x, name=model.name + "_optimized")
+
+    @staticmethod
+    def max_difference(model, optimized_model, batch):
+        return float(np.max(np.abs(model.predict(batch) - optimized_model.predict(batch))))
+
+    @staticmethod
+    def verify(model, optimized_model, batch, atol=1e-4):
+        model = InferenceOptimizer.strip_training_inputs(model)
+        difference = InferenceOptimizer.max_difference(model, optimized_model, batch)
+        if difference > atol:
+            raise ValueError("The optimized model is not equivalent to the original model", difference)
+        return difference
@@ -0,0 +1,123 @@
+import numpy as np
+from tensorflow.keras.layers import SeparableConv2D
+from tensorflow.keras.models import Model
+
+from utils.nn.conv import OCRSpec
+
+
+class StructuredPruner:
+    """Removes conv filters and RNN units from models built by an OCRSpec.
+
+    The importance of a filter or unit is the magnitude of the scale (gamma) of the batch normalization following it.
+    Pruning rebuilds a physically smaller model from a smaller spec and copies the weights of the kept filters and
+    units, so the exported model is actually smaller and faster, not only sparse.
+    """
+
+    @staticmethod
+    def from_model(model, spec=None):
+        # loads the weights of a model with the topology of the spec, e.g. OCR.conv_bgru for the default spec,
+        # into a model with the named layers the pruner relies on
+        spec = OCRSpec(rescale=model.input.dtype.name == "uint8") if spec is None else spec
+        inputs, outputs = spec.build(model.input_shape[1:], model.output_shape[-1])
+        spec_model = Model(inputs=inputs, outputs=outputs)
+        spec_model.set_weights(model.get_weights())
+        return spec_model, spec
+
+    @staticmethod
+    def __gamma__(model, name):
+        return np.abs(model.get_layer(name).get_weights()[0])
+
+    @staticmethod
+    def __keep__(scores, size):
+        # indices of the most important entries, in their original order
+        return np.sort(np.argsort(scores)[::-1][:size])
+
+    @staticmethod
+    def __slice_batch_norm__(weights, keep):
+        return [w[keep] for w in weights]
+
+    @staticmethod
+    def __slice_rnn__(weights, keep_in, keep, gates):
+        # keras stores the gates side by side: kernel (in, gates * units), recurrent kernel (units, gates * units)
+        # and bias (gates * units) or (2, gates * units) for GRUs with reset_after
+        units = weights[1].shape[0]
+        columns = np.concatenate([g * units + keep for g in range(gates)])
+
+        kernel, recurrent_kernel, bias = weights
+        kernel = kernel[keep_in][:, columns]
+        recurrent_kernel = recurrent_kernel[keep][:, columns]
+        bias = bias[..., columns]
+        return [kernel, recurrent_kernel, bias]
+
+    @staticmethod
+    def prune(model, spec, conv_filters, rnn_sizes):
+        """Returns the pruned model and spec with the given number of filters per conv block and units per RNN."""
+        input_shape = model.input_shape[1:]
+        output_size = model.output_shape[-1]
+
+        pruned_spec = OCRSpec(conv_filters=conv_filters, pool_sizes=spec.pool_sizes, kernel_size=spec.kernel_size,
+                              separable=spec.separable, time_dense_size=spec.time_dense_size,
+                              rnn_type=spec.rnn_type, rnn_size=list(rnn_sizes), rescale=spec.rescale)
+        inputs, outputs = pruned_spec.build(input_shape, output_size)
+        pruned = Model(inputs=inputs, outputs=outputs)
+
+        # conv blocks
+        keep_in = np.arange(input_shape[-1])
+        for i, filters in enumerate(conv_filters):
+            keep = StructuredPruner.__keep__(StructuredPruner.__gamma__(model, "conv_bn_%d" % i), filters)
+
+            conv = model.get_layer("conv_%d" % i)
+            if isinstance(conv, SeparableConv2D):
+                depthwise, pointwise, bias = conv.get_weights()
+                depthwise = depthwise[:, :, keep_in]
+                pointwise = pointwise[:, :, keep_in][..., keep]
+                weights = [depthwise, pointwise, bias[keep]]
+            else:
+                kernel, bias = conv.get_weights()
+                weights = [kernel[:, :, keep_in][..., keep], bias[keep]]
+
+            pruned.get_layer("conv_%d" % i).set_weights(weights)
+            pruned.get_layer("conv_bn_%d" % i).set_weights(
+                StructuredPruner.__slice_batch_norm__(model.get_layer("conv_bn_%d" % i).get_weights(), keep))
+            keep_in = keep
+
+        # the reshape flattens (height, channels), so every kept channel is kept at every height
+        height = model.get_layer("reshape").input_shape[2]
+        channels = model.get_layer("reshape").input_shape[3]
+        features = np.concatenate([h * channels + keep_in for h in range(height)])
+        kernel, bias = model.get_layer("time_dense").get_weights()
+        pruned.get_layer("time_dense").set_weights([kernel[features], bias])
+
+        # RNN layers, both directions keep the same units
+        gates = 3 if spec.rnn_type == "gru" else 4
+        keep_in = np.arange(spec.time_dense_size)
+        for i, units in enumerate(rnn_sizes):
+            last = i == len(rnn_sizes) - 1
+            gamma = StructuredPruner.__gamma__(model, "rnn_bn_%d" % i)
+            original_units = spec.rnn_sizes[i]
+            scores = gamma[:original_units] + gamma[original_units:] if last else gamma
+            keep = StructuredPruner.__keep__(scores, units)
+
+            weights = model.get_layer("rnn_%d" % i).get_weights()
+            forward = StructuredPruner.__slice_rnn__(weights[:3], keep_in, keep, gates)
+            backward = StructuredPruner.__slice_rnn__(weights[3:], keep_in, keep, gates)
+            pruned.get_layer("rnn_%d" % i).set_weights(forward + backward)
+
+            # the last layer concatenates both directions
+            keep_out = np.concatenate([keep, original_units + keep]) if last else keep
+            pruned.get_layer("rnn_bn_%d" % i).set_weights(
+                StructuredPruner.__slice_batch_norm__(model.get_layer("rnn_bn_%d" % i).get_weights(), keep_out))
+            keep_in = keep_out
+
+        kernel, bias = model.get_layer("char_dense").get_weights()
+        pruned.get_layer("char_dense").set_weights([kernel[keep_in], bias])
+
+        return pruned, pruned_spec
+
+    @staticmethod
+    def prune_ratio(model, spec, sparsity, base_spec=None):
+        # removes the given fraction of the filters and units of the base (unpruned) spec
+        base_spec = spec if base_spec is None else base_spec
+        conv_filters = [max(1, int(round(f * (1. - sparsity)))) for f in base_spec.conv_filters]
+        rnn_sizes = [max(1, int(round(u * (1. - sparsity)))) for u in base_spec.rnn_sizes]
+        return StructuredPruner.prune(model, spec, conv_filters, rnn_sizes)
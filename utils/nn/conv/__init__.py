@@ -1,2 +1,3 @@
 # import the necessary packages
 from .ocr import OCR
+from .ocrspec import OCRSpec
@@ -1,21 +1,23 @@
 from tensorflow.keras.layers import (
     Conv2D, MaxPooling2D, LSTM, GRU, Bidirectional,
-    Input, Dense, Activation, Reshape, BatchNormalization, add, concatenate
+    Input, Dense, Activation, Reshape, BatchNormalization, add, concatenate,
+    SeparableConv2D, SeparableConv1D
 )
+from tensorflow.keras.layers.experimental.preprocessing import Rescaling
 
 
 class OCR:
     @staticmethod
-    def conv_bgru(input_shape, output_size):
+    def conv_bgru(input_shape, output_size, rescale=False):
         conv_filters = 16
         kernel_size = (3, 3)
         pool_size = 2
         time_dense_size = 32
         rnn_size = 512
 
-        input_data = Input(name="input", shape=input_shape)
+        input_data, x = OCR.__input__(input_shape, rescale)
 
-        cnn = Conv2D(conv_filters, kernel_size, padding='same', kernel_initializer='he_normal')(input_data)
+        cnn = Conv2D(conv_filters, kernel_size, padding='same', kernel_initializer='he_normal')(x)
         cnn = BatchNormalization()(cnn)
         cnn = Activation('relu')(cnn)
         cnn = MaxPooling2D(pool_size=(pool_size, pool_size))(cnn)
@@ -43,16 +45,16 @@ class OCR:
         return input_data, output_data
 
     @staticmethod
-    def conv_blstm(input_shape, output_size):
+    def conv_blstm(input_shape, output_size, rescale=False):
         conv_filters = 16
         kernel_size = (3, 3)
         pool_size = 2
         time_dense_size = 32
         rnn_size = 512
 
-        input_data = Input(name="input", shape=input_shape)
+        input_data, x = OCR.__input__(input_shape, rescale)
 
-        cnn = Conv2D(conv_filters, kernel_size, padding='same', kernel_initializer='he_normal')(input_data)
+        cnn = Conv2D(conv_filters, kernel_size, padding='same', kernel_initializer='he_normal')(x)
         cnn = BatchNormalization()(cnn)
         cnn = Activation('relu')(cnn)
         cnn = MaxPooling2D(pool_size=(pool_size, pool_size))(cnn)
@@ -80,10 +82,10 @@ class OCR:
         return input_data, output_data
 
     @staticmethod
-    def vgg_bgru(input_shape, output_size):
+    def vgg_bgru(input_shape, output_size, rescale=False):
 
-        input_data = Input(name='input', shape=input_shape, dtype='float32')  # (None, 128, 64, 1)
-        cnn = OCR.__mini_vgg__(input_data)
+        input_data, x = OCR.__input__(input_shape, rescale)  # (None, 128, 64, 1)
+        cnn = OCR.__mini_vgg__(x)
 
         # CNN to RNN
         shape = cnn.get_shape()
@@ -102,6 +104,91 @@ class OCR:
 
         return input_data, output_data
 
+    @staticmethod
+    def ds_cnn_bgru(input_shape, output_size, rescale=False):
+        # CPU-optimized variant of conv_bgru: depthwise-separable convolutions and a single small BiGRU
+        rnn_size = 64
+        time_dense_size = 64
+
+        input_data, x = OCR.__input__(input_shape, rescale)  # (None, 128, 64, 1)
+        cnn = OCR.__ds_cnn__(x)  # (None, 32, 8, 64)
+
+        # CNN to RNN
+        shape = cnn.get_shape()
+        cnn = Reshape((shape[1], shape[2] * shape[3]))(cnn)
+        dense = Dense(time_dense_size, activation='relu', kernel_initializer='he_normal')(cnn)  # (None, 32, 64)
+
+        # RNN layer
+        bgru = Bidirectional(GRU(units=rnn_size, return_sequences=True), merge_mode="concat")(dense)
+        bgru = BatchNormalization()(bgru)
+
+        # transforms RNN output to character activations:
+        dense = Dense(output_size, kernel_initializer='he_normal')(bgru)  # (None, 32, 42)
+        output_data = Activation("softmax", name="output")(dense)
+
+        return input_data, output_data
+
+    @staticmethod
+    def ds_cnn_ctc(input_shape, output_size, rescale=False):
+        # fully convolutional CTC head without recurrence, the sequence context comes from 1D convolutions
+        context_filters = 128
+        context_kernel_size = 5
+
+        input_data, x = OCR.__input__(input_shape, rescale)  # (None, 128, 64, 1)
+        cnn = OCR.__ds_cnn__(x)  # (None, 32, 8, 64)
+
+        # collapse the height dimension
+        shape = cnn.get_shape()
+        cnn = Conv2D(context_filters, (1, shape[2]), padding='valid', kernel_initializer='he_normal')(cnn)
+        cnn = BatchNormalization()(cnn)
+        cnn = Activation('relu')(cnn)
+        cnn = Reshape((shape[1], context_filters))(cnn)  # (None, 32, 128)
+
+        # sequence context over neighboring time steps
+        for _ in range(2):
+            cnn = SeparableConv1D(context_filters, context_kernel_size, padding='same',
+                                  kernel_initializer='he_normal')(cnn)
+            cnn = BatchNormalization()(cnn)
+            cnn = Activation('relu')(cnn)
+
+        # transforms the features to character activations:
+        dense = Dense(output_size, kernel_initializer='he_normal')(cnn)  # (None, 32, 42)
+        output_data = Activation("softmax", name="output")(dense)
+
+        return input_data, output_data
+
+    @staticmethod
+    def __input__(input_shape, rescale):
+        # with rescale, the model takes uint8 pixels and scales them to [0, 1] itself, otherwise the caller does
+        if not rescale:
+            input_data = Input(name="input", shape=input_shape)
+            return input_data, input_data
+
+        input_data = Input(name="input", shape=input_shape, dtype="uint8")
+        return input_data, Rescaling(1. / 255, name="rescale")(input_data)
+
+    @staticmethod
+    def __ds_cnn__(input_data):
+
+        # a regular convolution for the single channel input, separable convolutions afterwards
+        cnn = Conv2D(16, (3, 3), padding='same', kernel_initializer='he_normal')(input_data)
+        cnn = BatchNormalization()(cnn)
+        cnn = Activation('relu')(cnn)
+        cnn = MaxPooling2D(pool_size=(2, 2))(cnn)
+
+        cnn = SeparableConv2D(32, (3, 3), padding='same', kernel_initializer='he_normal')(cnn)
+        cnn = BatchNormalization()(cnn)
+        cnn = Activation('relu')(cnn)
+        cnn = MaxPooling2D(pool_size=(2, 2))(cnn)
+
+        # pool the height only, the time axis keeps the downsample factor of 4
+        cnn = SeparableConv2D(64, (3, 3), padding='same', kernel_initializer='he_normal')(cnn)
+        cnn = BatchNormalization()(cnn)
+        cnn = Activation('relu')(cnn)
+        cnn = MaxPooling2D(pool_size=(1, 2))(cnn)
+
+        return cnn
+
     @staticmethod
     def __mini_vgg__(input_data):
 
@@ -0,0 +1,130 @@
+import numpy as np
+from tensorflow.keras.layers import (
+    Conv2D, SeparableConv2D, MaxPooling2D, LSTM, GRU, Bidirectional,
+    Input, Dense, Activation, Reshape, BatchNormalization
+)
+from tensorflow.keras.layers.experimental.preprocessing import Rescaling
+
+
+class OCRSpec:
+    """Configurable variant of the OCR builders.
+
+    conv_filters and pool_sizes define one conv block each, a pool size is either an int or a (time, height)
+    tuple, 1 disables the pooling of a block. rnn_size is either an int or one size per RNN layer, all RNN layers
+    but the last sum their directions like conv_bgru, the last one concatenates them. The default spec builds the
+    same network as OCR.conv_bgru, so their weights are interchangeable.
+    """
+
+    def __init__(self, conv_filters=(16, 16), pool_sizes=(2, 2), kernel_size=3, separable=False, time_dense_size=32,
+                 rnn_type="gru", rnn_size=512, rnn_layers=2, rescale=False):
+        if len(conv_filters) != len(pool_sizes):
+            raise ValueError("conv_filters and pool_sizes need one entry per conv block", conv_filters, pool_sizes)
+        if rnn_type not in ["gru", "lstm"]:
+            raise ValueError("Unsupported rnn_type, use 'gru' or 'lstm'", rnn_type)
+
+        self.conv_filters = tuple(conv_filters)
+        self.pool_sizes = tuple(p if isinstance(p, tuple) else (p, p) for p in pool_sizes)
+        self.kernel_size = kernel_size
+        self.separable = separable
+        self.time_dense_size = time_dense_size
+        self.rnn_type = rnn_type
+        self.rnn_sizes = tuple(rnn_size) if isinstance(rnn_size, (list, tuple)) else (rnn_size,) * rnn_layers
+        self.rescale = rescale
+
+    @property
+    def downsample_factor(self):
+        # input width / number of CTC time steps
+        return int(np.prod([p[0] for p in self.pool_sizes]))
+
+    @property
+    def name(self):
+        return "c{}-p{}-k{}{}-d{}-{}{}".format(
+            "x".join(str(f) for f in self.conv_filters),
+            "x".join("{}{}".format(*p) for p in self.pool_sizes),
+            self.kernel_size, "s" if self.separable else "",
+            self.time_dense_size, self.rnn_type,
+            "x".join(str(u) for u in self.rnn_sizes) or "0")
+
+    def output_steps(self, input_shape):
+        return input_shape[0] // self.downsample_factor
+
+    def build(self, input_shape, output_size):
+        kernel_size = (self.kernel_size, self.kernel_size)
+
+        # with rescale, the model takes uint8 pixels and scales them to [0, 1] itself
+        if self.rescale:
+            input_data = Input(name="input", shape=input_shape, dtype="uint8")
+            cnn = Rescaling(1. / 255, name="rescale")(input_data)
+        else:
+            input_data = Input(name="input", shape=input_shape)
+            cnn = input_data
+        for i, (filters, pool_size) in enumerate(zip(self.conv_filters, self.pool_sizes)):
+            # the single channel input always gets a regular convolution
+            conv = SeparableConv2D if self.separable and i > 0 else Conv2D
+            cnn = conv(filters, kernel_size, padding='same', kernel_initializer='he_normal', name="conv_%d" % i)(cnn)
+            cnn = BatchNormalization(name="conv_bn_%d" % i)(cnn)
+            cnn = Activation('relu', name="conv_relu_%d" % i)(cnn)
+            if pool_size != (1, 1):
+                cnn = MaxPooling2D(pool_size=pool_size, name="pool_%d" % i)(cnn)
+
+        # CNN to RNN
+        shape = cnn.get_shape()
+        cnn = Reshape((shape[1], shape[2] * shape[3]), name="reshape")(cnn)
+        x = Dense(self.time_dense_size, activation='relu', kernel_initializer='he_normal', name="time_dense")(cnn)
+
+        # RNN layers
+        rnn = GRU if self.rnn_type == "gru" else LSTM
+        for i, units in enumerate(self.rnn_sizes):
+            merge_mode = "concat" if i == len(self.rnn_sizes) - 1 else "sum"
+            x = Bidirectional(rnn(units=units, return_sequences=True), merge_mode=merge_mode, name="rnn_%d" % i)(x)
+            x = BatchNormalization(name="rnn_bn_%d" % i)(x)
+
+        # transforms RNN output to character activations:
+        dense = Dense(output_size, kernel_initializer='he_normal', name="char_dense")(x)
+        output_data = Activation("softmax", name="output")(dense)
+
+        return input_data, output_data
+
+    def cost(self, input_shape, output_size):
+        # analytic number of parameters and multiply-accumulate operations of a single sample,
+        # counted the same way as ModelProfiler counts them on the built model
+        k = self.kernel_size * self.kernel_size
+        width, height, channels = input_shape
+        params = macs = 0
+
+        for i, (filters, pool_size) in enumerate(zip(self.conv_filters, self.pool_sizes)):
+            positions = width * height
+            if self.separable and i > 0:
+                params += k * channels + channels * filters + filters
+                macs += positions * channels * (k + filters)
+            else:
+                params += k * channels * filters + filters
+                macs += positions * k * channels * filters
+
+            # batch normalization
+            params += 4 * filters
+            macs += positions * filters
+
+            width, height, channels = width // pool_size[0], height // pool_size[1], filters
+
+        steps = width
+        features = height * channels
+        params += features * self.time_dense_size + self.time_dense_size
+        macs += steps * features * self.time_dense_size
+        features = self.time_dense_size
+
+        gates = 3 if self.rnn_type == "gru" else 4
+        bias = 2 if self.rnn_type == "gru" else 1  # keras GRU uses separate input and recurrent biases
+        for i, units in enumerate(self.rnn_sizes):
+            params += 2 * gates * (features * units + units * units + bias * units)
+            macs += 2 * steps * gates * (features * units + units * units)
+            features = 2 * units if i == len(self.rnn_sizes) - 1 else units
+
+            # batch normalization
+            params += 4 * features
+            macs += steps * features
+
+        params += features * output_size + output_size
+        macs += steps * features * output_size
+
+        return params, macs
@@ -0,0 +1,2 @@
+# import the necessary packages
+from .tfliteexporter import TFLiteExporter
@@ -0,0 +1,27 @@
+import os
+
+import tensorflow as tf
+
+
+class TFLiteExporter:
+    @staticmethod
+    def convert(keras_model, float16=True):
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+        converter.experimental_new_converter = True
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if float16:
+            converter.target_spec.supported_types = [tf.float16]
+        return converter.convert()
+
+    @staticmethod
+    def save(keras_model, tflite_model_path, float16=True):
+        tflite_model = TFLiteExporter.convert(keras_model, float16)
+
+        output_dir = os.path.dirname(tflite_model_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        with open(tflite_model_path, "wb") as f:
+            f.write(tflite_model)
+
+        return tflite_model
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+from tensorflow.keras.layers import (
+    Conv1D, Conv2D, SeparableConv1D, SeparableConv2D, DepthwiseConv2D,
+    Dense, GRU, LSTM, Bidirectional, BatchNormalization
+)
+
+from utils.inference.interpreter import get_interpreter_class
+
+
+class ModelProfiler:
+    @staticmethod
+    def count_params(model):
+        return model.count_params()
+
+    @staticmethod
+    def __layer_macs__(layer, input_shape, output_shape):
+        # multiply-accumulate operations of a single sample, element-wise operations are ignored
+        if isinstance(layer, Bidirectional):
+            return ModelProfiler.__layer_macs__(layer.forward_layer, input_shape, None) + \
+                   ModelProfiler.__layer_macs__(layer.backward_layer, input_shape, None)
+
+        if isinstance(layer, (GRU, LSTM)):
+            gates = 3 if isinstance(layer, GRU) else 4
+            timesteps, input_dim = input_shape[1], input_shape[2]
+            return timesteps * gates * (input_dim * layer.units + layer.units * layer.units)
+
+        if isinstance(layer, (SeparableConv1D, SeparableConv2D)):
+            in_channels = input_shape[-1]
+            positions = int(np.prod(output_shape[1:-1]))
+            depthwise = positions * in_channels * layer.depth_multiplier * int(np.prod(layer.kernel_size))
+            pointwise = positions * in_channels * layer.depth_multiplier * layer.filters
+            return depthwise + pointwise
+
+        if isinstance(layer, DepthwiseConv2D):
+            positions = int(np.prod(output_shape[1:-1]))
+            return positions * input_shape[-1] * layer.depth_multiplier * int(np.prod(layer.kernel_size))
+
+        if isinstance(layer, (Conv1D, Conv2D)):
+            positions = int(np.prod(output_shape[1:-1]))
+            return positions * layer.filters * input_shape[-1] * int(np.prod(layer.kernel_size))
+
+        if isinstance(layer, Dense):
+            positions = int(np.prod(input_shape[1:-1]))
+            return positions * input_shape[-1] * layer.units
+
+        if isinstance(layer, BatchNormalization):
+            # a single scale and shift per element at inference
+            return int(np.prod(output_shape[1:]))
+
+        return 0
+
+    @staticmethod
+    def count_macs(model):
+        return sum(ModelProfiler.__layer_macs__(layer, layer.input_shape, layer.output_shape)
+                   for layer in model.layers if not isinstance(layer.input_shape, list))
+
+    @staticmethod
+    def tflite_latency(tflite_model, runs=100, warmup=10, num_threads=1):
+        # returns the median and 90th percentile latency of a single sample in milliseconds
+        interpreter = get_interpreter_class()(model_content=tflite_model, num_threads=num_threads)
+        interpreter.allocate_tensors()
+
+        input_details = interpreter.get_input_details()[0]
+        # raw pixels for integer inputs (rescale=True), uniform [0,1) would be cast to all zeros
+        if np.issubdtype(input_details['dtype'], np.integer):
+            input_data = np.random.randint(0, 256, size=input_details['shape']).astype(input_details['dtype'])
+        else:
+            input_data = np.random.uniform(size=input_details['shape']).astype(input_details['dtype'])
+
+        times = []
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            interpreter.set_tensor(input_details['index'], input_data)
+            interpreter.invoke()
+            if i >= warmup:
+                times.append((time.perf_counter() - start) * 1000.)
+
+        return float(np.median(times)), float(np.percentile(times, 90))
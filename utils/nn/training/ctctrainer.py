@@ -0,0 +1,193 @@
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+
+class CTCTrainer:
+    """Custom training loop of a recognizer with the CTC loss computed in the compiled training step.
+
+    The batches are the dictionaries of LicensePlateDatasetGenerator. Keras callbacks (EarlyStopping,
+    ModelCheckpoint, TensorBoard, ...) are driven like in model.fit(), the epoch logs additionally contain the
+    training throughput (steps_per_sec) and the time spent waiting for the input pipeline (input_wait_sec).
+
+    With a distribution strategy, the model and optimizer have to be created in strategy.scope(). Every worker
+    feeds its own batches, the losses are scaled by the global batch size and the gradients are all-reduced.
+    """
+
+    # state of EarlyStopping, ModelCheckpoint and ReduceLROnPlateau which is stored with the checkpoints, so that a
+    # resumed training compares with the best epoch so far instead of starting over
+    CALLBACK_STATE = ("best", "wait", "cooldown_counter")
+
+    def __init__(self, model, optimizer, max_text_len, blank_index=-1, strategy=None, global_batch_size=None):
+        self.model = model
+        self.optimizer = optimizer
+        # the model is not compiled, callbacks like ReduceLROnPlateau find the optimizer here
+        self.model.optimizer = optimizer
+        self.blank_index = blank_index
+        self.strategy = strategy
+        self.global_batch_size = global_batch_size
+
+        # models with a rescaling layer take the uint8 images as they are
+        self.input_dtype = model.input.dtype
+        input_signature = [{
+            "input": tf.TensorSpec((None,) + tuple(model.input_shape[1:]), self.input_dtype),
+            "labels": tf.TensorSpec((None, max_text_len), tf.float32),
+            "input_length": tf.TensorSpec((None, 1), tf.float32),
+            "label_length": tf.TensorSpec((None, 1), tf.float32),
+        }]
+        self.train_step = tf.function(self.__distribute__(self.__train_step__), input_signature=input_signature)
+        self.test_step = tf.function(self.__distribute__(self.__test_step__), input_signature=input_signature)
+
+    @property
+    def is_chief(self):
+        # only the chief writes checkpoints and logs to the final location
+        if self.strategy is None or self.strategy.cluster_resolver is None:
+            return True
+        task_type, task_id = self.strategy.cluster_resolver.task_type, self.strategy.cluster_resolver.task_id
+        return task_type is None or task_type == "chief" or (task_type == "worker" and task_id == 0)
+
+    def __distribute__(self, step):
+        if self.strategy is None:
+            return step
+
+        def distributed_step(batch):
+            per_replica_loss = self.strategy.run(step, args=(batch,))
+            return self.strategy.reduce(tf.distribute.ReduceOp.SUM, per_replica_loss, axis=None)
+
+        return distributed_step
+
+    def __loss__(self, batch, training):
+        predictions = self.model(batch["input"], training=training)
+
+        # the models end with a softmax, the log probabilities serve as logits
+        logits = tf.math.log(tf.clip_by_value(predictions, 1e-8, 1.0))
+        loss = tf.nn.ctc_loss(
+            labels=tf.cast(batch["labels"], tf.int32),
+            logits=logits,
+            label_length=tf.cast(tf.squeeze(batch["label_length"], axis=-1), tf.int32),
+            logit_length=tf.cast(tf.squeeze(batch["input_length"], axis=-1), tf.int32),
+            logits_time_major=False,
+            blank_index=self.blank_index)
+
+        if self.strategy is not None:
+            # summed over the replicas this is the mean over the global batch
+            return tf.nn.compute_average_loss(loss, global_batch_size=self.global_batch_size)
+        return tf.reduce_mean(loss)
+
+    def __train_step__(self, batch):
+        with tf.GradientTape() as tape:
+            loss = self.__loss__(batch, training=True)
+        gradients = tape.gradient(loss, self.model.trainable_variables)
+        self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
+        return loss
+
+    def __test_step__(self, batch):
+        return self.__loss__(batch, training=False)
+
+    def to_tensors(self, batch):
+        return {key: tf.convert_to_tensor(value, dtype=self.input_dtype if key == "input" else tf.float32)
+                for key, value in batch.items()}
+
+    def fit(self, train_batches, steps_per_epoch, epochs, validation_batches=None, validation_steps=0,
+            callbacks=None, checkpoint_manager=None, initial_epoch=0, verbose=1):
+        callbacks = tf.keras.callbacks.CallbackList(callbacks, model=self.model)
+        self.model.stop_training = False
+        history = []
+
+        callbacks.on_train_begin()
+        # on_train_begin resets the callbacks, the state of the interrupted run is restored afterwards
+        if checkpoint_manager is not None and initial_epoch > 0:
+            self.__restore_callback_state__(callbacks, checkpoint_manager.directory)
+        for epoch in range(initial_epoch, epochs):
+            callbacks.on_epoch_begin(epoch)
+
+            losses = []
+            input_wait = 0.
+            start = time.perf_counter()
+            for step in range(steps_per_epoch):
+                wait_start = time.perf_counter()
+                batch = self.to_tensors(next(train_batches))
+                input_wait += time.perf_counter() - wait_start
+
+                callbacks.on_train_batch_begin(step)
+                loss = self.train_step(batch)
+                losses.append(loss)
+                callbacks.on_train_batch_end(step, {"loss": loss})
+            elapsed = time.perf_counter() - start
+
+            logs = {"loss": float(np.mean([loss.numpy() for loss in losses])),
+                    "steps_per_sec": steps_per_epoch / elapsed,
+                    "input_wait_sec": input_wait}
+
+            if validation_batches is not None and validation_steps > 0:
+                callbacks.on_test_begin()
+                val_losses = [self.test_step(self.to_tensors(next(validation_batches))).numpy()
+                              for _ in range(validation_steps)]
+                logs["val_loss"] = float(np.mean(val_losses))
+                callbacks.on_test_end({"loss": logs["val_loss"]})
+
+            if verbose:
+                print("Epoch {}/{} - loss: {:.4f}{} - {:.2f} steps/sec - input wait: {:.1f}s ({:.0%})".format(
+                    epoch + 1, epochs, logs["loss"],
+                    " - val_loss: {:.4f}".format(logs["val_loss"]) if "val_loss" in logs else "",
+                    logs["steps_per_sec"], input_wait, input_wait / elapsed))
+
+            callbacks.on_epoch_end(epoch, logs)
+            history.append(logs)
+
+            # saved after the callbacks, the checkpoint includes their decisions of this epoch
+            if checkpoint_manager is not None:
+                checkpoint_manager.checkpoint.epoch.assign(epoch + 1)
+                checkpoint_manager.save()
+                self.__save_callback_state__(callbacks, checkpoint_manager.directory)
+            if self.model.stop_training:
+                break
+
+        callbacks.on_train_end()
+        return history
+
+    @staticmethod
+    def __save_callback_state__(callbacks, checkpoint_dir):
+        state = []
+        for callback in callbacks.callbacks:
+            values = {k: getattr(callback, k) for k in CTCTrainer.CALLBACK_STATE if hasattr(callback, k)}
+            values = {k: v.item() if isinstance(v, np.generic) else v for k, v in values.items()
+                      if isinstance(v, (int, float, np.generic))}
+            state.append({"class": type(callback).__name__, "state": values})
+
+        path = os.path.join(checkpoint_dir, "callbacks.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def __restore_callback_state__(callbacks, checkpoint_dir):
+        path = os.path.join(checkpoint_dir, "callbacks.json")
+        if not os.path.isfile(path):
+            return
+        with open(path) as f:
+            state = json.load(f)
+
+        # the callbacks are matched by position and class, the ones of another configuration are left alone
+        for callback, saved in zip(callbacks.callbacks, state):
+            if type(callback).__name__ == saved["class"]:
+                for k, v in saved["state"].items():
+                    setattr(callback, k, v)
+
+    def checkpoint_manager(self, checkpoint_dir, max_to_keep=3):
+        # restores the latest checkpoint if there is one, the epoch to continue with is manager.checkpoint.epoch
+        checkpoint = tf.train.Checkpoint(model=self.model, optimizer=self.optimizer,
+                                         epoch=tf.Variable(0, dtype=tf.int64))
+
+        latest_checkpoint = tf.train.latest_checkpoint(checkpoint_dir)
+        if latest_checkpoint:
+            checkpoint.restore(latest_checkpoint)
+
+        # all workers take part in saving, the other workers write to a scratch directory of their own
+        if not self.is_chief:
+            checkpoint_dir = os.path.join(checkpoint_dir, "worker-%d" % self.strategy.cluster_resolver.task_id)
+            max_to_keep = 1
+        return tf.train.CheckpointManager(checkpoint, checkpoint_dir, max_to_keep=max_to_keep)
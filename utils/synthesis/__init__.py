@@ -0,0 +1,7 @@
+# import the necessary packages
+from .glyphatlas import GlyphAtlas
+from .platerenderer import PlateRenderer
+from .countyregistry import CountyRegistry
+from .platefetcher import AsyncPlateFetcher, RateLimiter
+from .standinplateserver import StandInPlateServer
+from .licensenumbersampler import LicenseNumberIndex, LicenseNumberSampler
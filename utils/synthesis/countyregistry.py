@@ -0,0 +1,42 @@
+import csv
+import json
+
+import numpy as np
+
+
+class CountyRegistry:
+    """The distinguishing marks (county codes) of the German counties with the index of their state, read from the
+    files of the license recognition dataset (KFZ-Deutschland-*.csv and german_states.json)."""
+
+    def __init__(self, counties, states, state_codes):
+        self.counties = counties
+        self.states = states
+        self.state_codes = state_codes
+
+    def __len__(self):
+        return len(self.counties)
+
+    @staticmethod
+    def __read_states__(states_path):
+        # {DESCR: CM}, the file is either a list of records or a dictionary of columns
+        with open(states_path, encoding="utf-8") as f:
+            states = json.load(f)
+        if isinstance(states, dict):
+            return {states["DESCR"][k]: states["CM"][k] for k in states["DESCR"]}
+        return {s["DESCR"]: s["CM"] for s in states}
+
+    @staticmethod
+    def load(counties_path, states_path):
+        state_codes_by_name = CountyRegistry.__read_states__(states_path)
+        state_codes = sorted(set(state_codes_by_name.values()))
+
+        counties, states = [], []
+        with open(counties_path, encoding="utf-8") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                # same cleanup as notebook 3
+                state = row["Bundesland"].split(" ")[0]
+                state = state_codes_by_name.get(state, state)
+                counties.append(row["Autokennzeichen"].replace("*", ""))
+                states.append(state_codes.index(state) if state in state_codes else 0)
+
+        return CountyRegistry(np.array(counties), np.array(states, dtype=np.int64), state_codes)
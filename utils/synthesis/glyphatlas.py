@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+
+class GlyphAtlas:
+    """Pre-rasterized glyphs of the license plate characters.
+
+    Every glyph is an uint8 ink coverage map (0: no ink, 255: full ink) of the same height and its own width, so
+    that plates can be composed by copying glyph columns. The glyphs are rendered from a TrueType font, e.g. one of
+    the FE-Schrift fonts, or with the built-in OpenCV Hershey font if no font is available.
+    """
+
+    CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜ0123456789"
+    UMLAUTS = {"Ä": "A", "Ö": "O", "Ü": "U"}
+
+    def __init__(self, glyphs):
+        self.glyphs = glyphs
+        self.height = next(iter(glyphs.values())).shape[0]
+
+    def __getitem__(self, character):
+        return self.glyphs[character]
+
+    def width(self, character):
+        return self.glyphs[character].shape[1]
+
+    def scaled(self, height):
+        # the same glyphs with another height, e.g. for the country code of the EU band
+        return GlyphAtlas({c: GlyphAtlas.__resize__(g, height) for c, g in self.glyphs.items()})
+
+    @staticmethod
+    def __resize__(glyph, height):
+        width = max(1, int(round(glyph.shape[1] * height / float(glyph.shape[0]))))
+        return cv2.resize(glyph, (width, height), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def __crop__(canvases, height):
+        # common vertical band of all glyphs, so that they share the baseline, and the ink columns of every glyph
+        rows = np.flatnonzero(np.any(np.stack(list(canvases.values())) > 0, axis=(0, 2)))
+        glyphs = {}
+        for character, canvas in canvases.items():
+            columns = np.flatnonzero(np.any(canvas > 0, axis=0))
+            glyph = canvas[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+            glyphs[character] = GlyphAtlas.__resize__(glyph, height)
+        return glyphs
+
+    @staticmethod
+    def from_font(font_path, height, characters=CHARACTERS, size=128):
+        # Pillow is only needed to rasterize the glyphs once
+        from PIL import Image, ImageDraw, ImageFont
+
+        font = ImageFont.truetype(font_path, size)
+        canvases = {}
+        for character in characters:
+            canvas = Image.new("L", (2 * size, 2 * size), 0)
+            ImageDraw.Draw(canvas).text((size // 2, size // 4), character, fill=255, font=font)
+            canvases[character] = np.array(canvas)
+        return GlyphAtlas(GlyphAtlas.__crop__(canvases, height))
+
+    @staticmethod
+    def from_hershey(height, characters=CHARACTERS, size=128, thickness=14):
+        # the Hershey fonts have no umlauts, they are drawn as the lowered base letter with two dots
+        font_scale = cv2.getFontScaleFromHeight(cv2.FONT_HERSHEY_SIMPLEX, size, thickness)
+        top, baseline, lowered = size // 2, 3 * size // 2, 7 * size // 10
+        canvases = {}
+        for character in characters:
+            canvas = np.zeros((2 * size, 2 * size), dtype=np.uint8)
+            base = GlyphAtlas.UMLAUTS.get(character, character)
+            cv2.putText(canvas, base, (size // 4, baseline), cv2.FONT_HERSHEY_SIMPLEX, font_scale, 255,
+                        thickness, cv2.LINE_AA)
+
+            if character in GlyphAtlas.UMLAUTS:
+                # shrink the letter to 80% from the baseline and put the dots above it
+                letter = cv2.resize(canvas[top:baseline], (2 * size, baseline - lowered),
+                                    interpolation=cv2.INTER_AREA)
+                canvas[top:baseline] = 0
+                canvas[lowered:baseline] = letter
+
+                columns = np.flatnonzero(np.any(canvas > 0, axis=0))
+                center, offset = (columns[0] + columns[-1]) // 2, (columns[-1] - columns[0]) // 4
+                for x in [center - offset, center + offset]:
+                    cv2.circle(canvas, (int(x), int(0.56 * size)), thickness // 2 + 1, 255, -1, cv2.LINE_AA)
+
+            canvases[character] = canvas
+        return GlyphAtlas(GlyphAtlas.__crop__(canvases, height))
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class LicenseNumberIndex:
+    """Set of license numbers as sorted 64 bit hashes, to check millions of new numbers against existing datasets
+    at once. Hash collisions are possible, but with 64 bits negligible for datasets of this size."""
+
+    FNV_OFFSET = np.uint64(14695981039346656037)
+    FNV_PRIME = np.uint64(1099511628211)
+
+    def __init__(self):
+        self.hashes = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def hash(numbers):
+        """FNV-1a over the unicode code points, vectorized over the numbers. The zero padding of the fixed-width
+        array is skipped, so that the hash does not depend on the width of the array:
+
+        >>> bool(LicenseNumberIndex.hash(["B-AB12"]) == LicenseNumberIndex.hash(np.array(["B-AB12"], "U10")))
+        True
+        """
+        numbers = np.asarray(numbers, dtype=str)
+        codes = numbers.view(np.uint32).reshape(len(numbers), numbers.itemsize // 4).astype(np.uint64)
+        hashes = np.full(len(numbers), LicenseNumberIndex.FNV_OFFSET, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for column in codes.T:
+                hashes = np.where(column != 0, (hashes ^ column) * LicenseNumberIndex.FNV_PRIME, hashes)
+        return hashes
+
+    def contains(self, numbers=None, hashes=None):
+        hashes = self.hash(numbers) if hashes is None else hashes
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), max(len(self.hashes) - 1, 0))
+        return self.hashes[positions] == hashes if len(self.hashes) else np.zeros(len(hashes), dtype=bool)
+
+    def add(self, numbers=None, hashes=None):
+        hashes = np.unique(self.hash(numbers) if hashes is None else hashes)
+        hashes = hashes[~self.contains(hashes=hashes)]
+        # merging the sorted new hashes is linear, sorting the whole index again is not
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, hashes), hashes)
+
+    @staticmethod
+    def from_datasets(db_paths):
+        # h5py is only needed to read existing datasets, so it is not imported with the package
+        import h5py
+
+        index = LicenseNumberIndex()
+        for db_path in db_paths:
+            with h5py.File(db_path, "r") as db:
+                labels = db["labels"][:]
+            index.add(np.array([l.decode() if isinstance(l, bytes) else l for l in labels]))
+        return index
+
+
+class LicenseNumberSampler:
+    """Draws random license numbers of the form <county>-<letters><digits> in bulk, with the rules of
+    GermanLicensePlateImagesGenerator in notebook 3: one or two letters and 1 to max(8 - county - letters, 4)
+    digits. The numbers are composed as arrays of code points, without a Python loop over the numbers."""
+
+    LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜ"
+    DIGITS = "0123456789"
+    MAX_LENGTH = 10
+
+    def __init__(self, registry, seed=None):
+        self.registry = registry
+        self.random = np.random.RandomState(seed)
+
+        # county codes as a (counties, 3) matrix of code points, padded with zeros
+        counties = np.asarray(registry.counties, dtype="U3")
+        self.county_codes = counties.view(np.uint32).reshape(len(counties), 3)
+        self.county_lengths = np.char.str_len(counties)
+
+        self.letter_codes = np.array([ord(c) for c in LicenseNumberSampler.LETTERS], dtype=np.uint32)
+        self.digit_codes = np.array([ord(c) for c in LicenseNumberSampler.DIGITS], dtype=np.uint32)
+
+    def sample(self, n):
+        """Returns n license numbers (not necessarily unique) and the state index of their county."""
+        counties = self.random.randint(len(self.county_lengths), size=n)
+        county_lengths = self.county_lengths[counties]
+        letter_counts = self.random.randint(1, 3, size=n)
+        max_digits = np.maximum(8 - county_lengths - letter_counts, 4)
+        digit_counts = (self.random.random_sample(n) * max_digits).astype(np.int64) + 1
+
+        # scatter the county, dash, letters and digits into a (n, MAX_LENGTH) matrix of code points
+        codes = np.zeros((n, LicenseNumberSampler.MAX_LENGTH), dtype=np.uint32)
+        rows = np.arange(n)
+        codes[:, :3] = self.county_codes[counties]
+        codes[rows, county_lengths] = ord("-")
+
+        letters = self.letter_codes[self.random.randint(len(self.letter_codes), size=(n, 2))]
+        start = county_lengths + 1
+        for j in range(2):
+            valid = j < letter_counts
+            codes[rows[valid], start[valid] + j] = letters[valid, j]
+
+        digits = self.digit_codes[self.random.randint(len(self.digit_codes), size=(n, max_digits.max()))]
+        start = start + letter_counts
+        for j in range(digits.shape[1]):
+            valid = j < digit_counts
+            codes[rows[valid], start[valid] + j] = digits[valid, j]
+
+        # trailing zeros end the strings
+        numbers = codes.view("U%d" % LicenseNumberSampler.MAX_LENGTH).ravel()
+        return numbers, self.registry.states[counties]
+
+    def sample_unique(self, n, index=None):
+        """Returns n license numbers which are unique and not in the index (e.g. the numbers of existing datasets),
+        they are added to the index."""
+        index = LicenseNumberIndex() if index is None else index
+        numbers, states = [], []
+        missing = n
+        while missing > 0:
+            candidates, candidate_states = self.sample(int(missing * 1.1) + 16)
+            hashes = LicenseNumberIndex.hash(candidates)
+
+            # first occurrence of every number of the batch, in the order of drawing, and not known before
+            _, first = np.unique(hashes, return_index=True)
+            first = np.sort(first)
+            first = first[~index.contains(hashes=hashes[first])][:missing]
+
+            index.add(hashes=hashes[first])
+            numbers.append(candidates[first])
+            states.append(candidate_states[first])
+            missing -= len(first)
+
+        return np.concatenate(numbers), np.concatenate(states)
@@ -0,0 +1,163 @@
+import asyncio
+import random
+import re
+import time
+
+import cv2
+import numpy as np
+
+
+class RateLimiter:
+    """Spaces requests evenly to at most `rate` requests per second, shared by all tasks of an event loop."""
+
+    def __init__(self, rate):
+        self.interval = 1. / rate if rate else 0.
+        self.next_time = 0.
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RetryableError(Exception):
+    pass
+
+
+class AsyncPlateFetcher:
+    """Fetches license plate images from the plate generator web service of notebook 3 (or a stand-in server) with
+    many requests in flight over one shared connection pool.
+
+    All requests share a global rate limit, failed requests (connection errors, timeouts, 429 and 5xx responses,
+    corrupted images) are retried with exponential backoff. Plates whose license number is already in the output
+    HDF5 dataset are skipped, new plates are appended to it as they arrive.
+    """
+
+    BASE_URL = "http://nummernschild.heisnbrg.net/fe/task"
+    MONTHS = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']
+    YEARS = ['06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '17']
+    ID_PATTERN = re.compile('<id>(.*?)</id>', re.DOTALL | re.IGNORECASE)
+
+    def __init__(self, base_url=BASE_URL, rate=5., concurrency=8, retries=5, backoff=0.5, timeout=30.,
+                 image_shape=(32, 151), seed=None):
+        self.base_url = base_url
+        self.rate = rate
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.image_shape = image_shape
+        self.random = random.Random(seed)
+
+        self.stats = {"requests": 0, "retries": 0, "failed": 0, "skipped": 0, "fetched": 0}
+
+    def get_image_url(self, license_number, state, month, year):
+        # the same query as GermanLicensePlateImagesGenerator.get_image_url, the umlauts are latin-1 encoded
+        license_number = license_number.replace("-", "%3A").replace("Ä", "%C4").replace("Ö", "%D6").replace("Ü", "%DC")
+        return self.base_url + "?action=startTask&kennzeichen={0}&kennzeichenZeile2=&engschrift=false&pixelHoehe=32&breiteInMM=520&breiteInMMFest=true&sonder=FE&dd=01&mm=01&yy=00&kreis={1}&kreisName=&humm={2}&huyy={3}&sonderKreis=LEER&mm1=01&mm2=01&farbe=SCHWARZ&effekt=KEIN&tgaDownload=false".format(
+            license_number, state, month, year)
+
+    async def __get__(self, session, url):
+        from yarl import URL
+
+        await self.limiter.wait()
+        self.stats["requests"] += 1
+        async with session.get(URL(url, encoded=True)) as response:
+            if response.status == 429 or response.status >= 500:
+                raise RetryableError("HTTP %d" % response.status)
+            if response.status != 200:
+                return None
+            return await response.read()
+
+    def __decode__(self, content):
+        # the service sometimes returns corrupted images, they are fetched again
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None or image.shape != tuple(self.image_shape):
+            raise RetryableError("corrupted image")
+        return image
+
+    async def __fetch_once__(self, session, license_number, state, front):
+        month = self.random.choice(self.MONTHS) if front else ''
+        year = self.random.choice(self.YEARS) if front else ''
+
+        content = await self.__get__(session, self.get_image_url(license_number, state, month, year))
+        if content is None:
+            return None
+        ids = self.ID_PATTERN.findall(content.decode("utf-8", errors="replace"))
+        if not ids:
+            raise RetryableError("no task id")
+
+        if await self.__get__(session, self.base_url + "?action=status&id=%s" % ids[0]) is None:
+            return None
+        content = await self.__get__(session, self.base_url + "?action=showInPage&id=%s" % ids[0])
+        return None if content is None else self.__decode__(content)
+
+    async def fetch(self, session, license_number, state, front):
+        """Returns the grayscale plate image or None if the service does not provide it."""
+        import aiohttp
+
+        for attempt in range(self.retries + 1):
+            try:
+                return await self.__fetch_once__(session, license_number, state, front)
+            except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    print("[WARNING] giving up {}: {}".format(license_number, e))
+                    return None
+                self.stats["retries"] += 1
+                # exponential backoff with jitter, so that the retries of parallel requests spread out
+                await asyncio.sleep(self.backoff * 2 ** attempt * (0.5 + self.random.random()))
+
+    @staticmethod
+    def variant(front):
+        return "F" if front else "R"
+
+    async def run(self, jobs, writer):
+        """Fetches the plates of the jobs (license number, state code, front) into a HDF5DatasetWriter opened with
+        append=True and metaKey="variants", plates (license number and variant) which are already in the dataset are
+        skipped."""
+        # aiohttp is only needed to fetch plates, so it is not imported with the package
+        import aiohttp
+
+        self.limiter = RateLimiter(self.rate)
+        done = set()
+        if writer.idx > 0:
+            labels = [l.decode() if isinstance(l, bytes) else l for l in writer.labels[:writer.idx]]
+            variants = [v.decode() if isinstance(v, bytes) else v for v in writer.meta[:writer.idx]]
+            done = set(zip(labels, variants))
+        # rows written before the variants were stored count for both variants of their license number
+        legacy = {label for label, variant in done if not variant}
+
+        queue = asyncio.Queue(maxsize=2 * self.concurrency)
+
+        async def worker(session):
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                license_number, state, front = job
+                image = await self.fetch(session, license_number, state, front)
+                if image is None:
+                    self.stats["failed"] += 1
+                else:
+                    writer.add([image], [license_number], [AsyncPlateFetcher.variant(front)])
+                    self.stats["fetched"] += 1
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            workers = [asyncio.ensure_future(worker(session)) for _ in range(self.concurrency)]
+            for job in jobs:
+                # on-disk dedup: plates of the output dataset are not fetched again
+                if job[0] in legacy or (job[0], AsyncPlateFetcher.variant(job[2])) in done:
+                    self.stats["skipped"] += 1
+                    continue
+                await queue.put(job)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        return self.stats
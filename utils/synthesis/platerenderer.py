@@ -0,0 +1,179 @@
+import numpy as np
+
+from .glyphatlas import GlyphAtlas
+
+
+class PlateRenderer:
+    """Renders German license plates offline as grayscale images, by default 151x32 pixels like the plates of the
+    web generator in notebook 3.
+
+    All building blocks of a plate (EU band, glyphs, seals, background and border columns) are rendered once into
+    a single strip of image columns. A plate is then a list of column indexes into that strip, and a whole batch of
+    plates is composed by a single gather. Like the web generator, the front plates ('F') carry the inspection
+    sticker above the state seal, the rear plates ('R') only the state seal.
+    """
+
+    # gray levels of the plate parts
+    BACKGROUND = 235
+    INK = 20
+    BORDER = 60
+    BAND = 47
+    BAND_INK = 200
+
+    # plate dimensions in mm, the plate is 520x110 mm
+    PLATE_WIDTH_MM = 520.
+    BAND_WIDTH_MM = 40.
+    CHAR_HEIGHT_MM = 75.
+    CHAR_GAP_MM = 6.
+    GROUP_GAP_MM = 24.
+    SEAL_WIDTH_MM = 50.
+
+    NUM_STATES = 16
+
+    def __init__(self, atlas=None, width=151, height=32):
+        self.width = width
+        self.height = height
+
+        mm = width / PlateRenderer.PLATE_WIDTH_MM
+        self.band_width = int(round(PlateRenderer.BAND_WIDTH_MM * mm))
+        self.char_gap = max(1, int(round(PlateRenderer.CHAR_GAP_MM * mm)))
+        self.group_gap = int(round(PlateRenderer.GROUP_GAP_MM * mm))
+        self.seal_width = int(round(PlateRenderer.SEAL_WIDTH_MM * mm))
+
+        char_height = int(round(PlateRenderer.CHAR_HEIGHT_MM * mm))
+        self.atlas = (atlas or GlyphAtlas.from_hershey(char_height)).scaled(char_height)
+
+        # columns of the plate between the EU band and the right border
+        self.text_width = width - self.band_width - 1
+
+        self.__build_strip__()
+
+    def __column__(self):
+        # a background column with the border at the top and bottom
+        column = np.full(self.height, PlateRenderer.BACKGROUND, dtype=np.float32)
+        column[[0, -1]] = PlateRenderer.BORDER
+        return column
+
+    def __block__(self, width):
+        return np.repeat(self.__column__()[:, np.newaxis], width, axis=1)
+
+    @staticmethod
+    def __disc__(height, width, cy, cx, radius, supersampling=4):
+        # anti-aliased coverage of a disc, by supersampling
+        y = (np.arange(height * supersampling) + 0.5) / supersampling
+        x = (np.arange(width * supersampling) + 0.5) / supersampling
+        inside = (y[:, np.newaxis] - cy) ** 2 + (x[np.newaxis, :] - cx) ** 2 <= radius ** 2
+        return inside.reshape(height, supersampling, width, supersampling).mean(axis=(1, 3))
+
+    @staticmethod
+    def __paint__(block, coverage, level, top=0, left=0):
+        h, w = coverage.shape
+        region = block[top:top + h, left:left + w]
+        region[:] = region * (1. - coverage) + level * coverage
+
+    def __glyph_block__(self, glyph):
+        block = self.__block__(glyph.shape[1])
+        top = (self.height - glyph.shape[0]) // 2
+        self.__paint__(block, glyph / 255., PlateRenderer.INK, top)
+        return block
+
+    def __band_block__(self):
+        # left border and the blue EU band with the ring of stars and the country code D
+        block = np.full((self.height, self.band_width), PlateRenderer.BAND, dtype=np.float32)
+        block[:, 0] = PlateRenderer.BORDER
+        block[[0, -1], :] = PlateRenderer.BORDER
+
+        cx, cy, ring = self.band_width / 2., self.height * 0.3, self.band_width * 0.28
+        for angle in np.arange(12) * np.pi / 6.:
+            star = self.__disc__(self.height, self.band_width, cy + ring * np.sin(angle), cx + ring * np.cos(angle),
+                                 max(0.45, self.band_width * 0.05))
+            self.__paint__(block, star, PlateRenderer.BAND_INK)
+
+        letter = self.atlas.scaled(max(3, int(round(self.height * 0.3))))["D"] / 255.
+        top = int(self.height * 0.62)
+        left = max(1, (self.band_width - letter.shape[1]) // 2)
+        letter = letter[:self.height - 1 - top, :self.band_width - left]
+        self.__paint__(block, letter, 255, top, left)
+        return block
+
+    def __seal_block__(self, month, state):
+        # the inspection sticker (month 1..12 at the top of the sticker, 0: no sticker) above the state seal
+        block = self.__block__(self.seal_width)
+        radius = min(self.seal_width, self.height) * 0.2
+        cx = self.seal_width / 2.
+        sticker_y, seal_y = self.height * 0.3, self.height * 0.7
+
+        if month > 0:
+            sticker = self.__disc__(self.height, self.seal_width, sticker_y, cx, radius)
+            self.__paint__(block, sticker, 150)
+
+            # the notch shows the month like a clock hand
+            angle = month * np.pi / 6. - np.pi / 2.
+            notch = self.__disc__(self.height, self.seal_width, sticker_y + radius * 0.55 * np.sin(angle),
+                                  cx + radius * 0.55 * np.cos(angle), radius * 0.35)
+            self.__paint__(block, notch, 60)
+
+        seal = self.__disc__(self.height, self.seal_width, seal_y, cx, radius)
+        self.__paint__(block, seal, 90)
+        crest = self.__disc__(self.height, self.seal_width, seal_y, cx, radius * 0.65)
+        self.__paint__(block, crest, 110 + 8 * state)
+        return block
+
+    def __build_strip__(self):
+        blocks = []
+        self.tokens = {}
+
+        def add(name, block):
+            start = sum(b.shape[1] for b in blocks)
+            blocks.append(block)
+            self.tokens[name] = np.arange(start, start + block.shape[1])
+
+        add("background", self.__block__(1))
+        add("border", np.full((self.height, 1), PlateRenderer.BORDER, dtype=np.float32))
+        add("band", self.__band_block__())
+        for character in GlyphAtlas.CHARACTERS:
+            add(character, self.__glyph_block__(self.atlas[character]))
+        for month in range(13):
+            for state in range(PlateRenderer.NUM_STATES):
+                add(("seal", month, state), self.__seal_block__(month, state))
+
+        self.strip = np.clip(np.round(np.hstack(blocks)), 0, 255).astype(np.uint8)
+
+    def __gap__(self, width):
+        return np.repeat(self.tokens["background"], width)
+
+    def columns(self, number, month=0, state=0):
+        """Column indexes into the strip of the plate with the license number, e.g. 'B-AB123'."""
+        county, _, rest = number.partition("-")
+        letters = rest.rstrip("0123456789")
+        digits = rest[len(letters):]
+
+        parts = []
+        for group in [county, letters, digits]:
+            glyphs = [self.tokens[c] for c in group]
+            text = [np.concatenate([g, self.__gap__(self.char_gap)]) for g in glyphs[:-1]] + glyphs[-1:]
+            parts.append(np.concatenate(text) if text else np.zeros(0, dtype=np.int64))
+
+        content = np.concatenate([parts[0], self.tokens[("seal", month, state)], parts[1],
+                                  self.__gap__(self.group_gap), parts[2]])
+
+        # long numbers are narrowed by dropping columns evenly, short ones are centered
+        if len(content) > self.text_width:
+            content = content[np.round(np.linspace(0, len(content) - 1, self.text_width)).astype(np.int64)]
+        left = (self.text_width - len(content)) // 2
+        right = self.text_width - len(content) - left
+
+        return np.concatenate([self.tokens["band"], self.__gap__(left), content, self.__gap__(right),
+                               self.tokens["border"]])
+
+    def render(self, numbers, months=None, states=None):
+        """Renders a batch of plates, returns an uint8 array (N, height, width).
+
+        months: month of the inspection sticker per plate (1..12), 0 or None for plates without sticker
+        states: index of the state seal per plate (0..15)
+        """
+        months = np.zeros(len(numbers), dtype=np.int64) if months is None else months
+        states = np.zeros(len(numbers), dtype=np.int64) if states is None else states
+
+        columns = np.stack([self.columns(n, m, s) for n, m, s in zip(numbers, months, states)])
+        return np.ascontiguousarray(self.strip[:, columns].transpose(1, 0, 2))
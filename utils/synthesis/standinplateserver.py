@@ -0,0 +1,70 @@
+import itertools
+import random
+from urllib.parse import parse_qs
+
+import cv2
+
+from .platerenderer import PlateRenderer
+
+
+class StandInPlateServer:
+    """Local stand-in for the plate generator web service, to test the fetcher without network access.
+
+    It answers the startTask, status and showInPage actions like the real service with plates of the PlateRenderer
+    and fails a fraction of the requests (503 responses and corrupted images) to exercise the retries.
+    """
+
+    def __init__(self, renderer=None, failure_rate=0.1, corrupt_rate=0.05, seed=None):
+        self.renderer = renderer or PlateRenderer()
+        self.failure_rate = failure_rate
+        self.corrupt_rate = corrupt_rate
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.tasks = {}
+        self.requests = 0
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        if self.random.random() < self.failure_rate:
+            return web.Response(status=503)
+
+        # the license number is latin-1 encoded, like the real service expects it
+        query = {k: v[0] for k, v in parse_qs(request.rel_url.raw_query_string, keep_blank_values=True,
+                                              encoding="latin-1").items()}
+        action = query.get("action")
+
+        if action == "startTask":
+            task_id = str(next(self.ids))
+            self.tasks[task_id] = (query["kennzeichen"].replace(":", "-"), int(query["humm"] or 0))
+            return web.Response(text="<task><id>%s</id></task>" % task_id, content_type="text/xml")
+
+        if action == "status":
+            if query.get("id") not in self.tasks:
+                return web.Response(status=404)
+            return web.Response(text="<status>done</status>", content_type="text/xml")
+
+        if action == "showInPage":
+            if query.get("id") not in self.tasks:
+                return web.Response(status=404)
+            number, month = self.tasks.pop(query["id"])
+            _, png = cv2.imencode(".png", self.renderer.render([number], [month])[0])
+            content = png.tobytes()
+            if self.random.random() < self.corrupt_rate:
+                content = content[:len(content) // 2]
+            return web.Response(body=content, content_type="image/png")
+
+        return web.Response(status=400)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Starts the server, returns the runner (stop it with `await runner.cleanup()`) and the base URL."""
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/fe/task", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        return runner, "http://%s:%d/fe/task" % runner.addresses[0][:2]
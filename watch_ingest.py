@@ -0,0 +1,252 @@
+"""
+Usage:
+
+# Watch a camera spool directory and recognize new images as they arrive:
+python watch_ingest.py --spool_dir=<PATH_TO_SPOOL_DIR> --output=<PATH_TO_OUTPUT>/results.csv --done_dir=<PATH_TO_DONE_DIR> --detection_model=output/plate_detection/glpd-model.tflite --recognition_model=output/license_recognition/glpr-model.tflite
+
+Images are passed through a decode -> detect -> recognize pipeline. The stages are connected by bounded queues, so the
+watcher stops picking up files when inference falls behind and the backlog stays on disk instead of in memory.
+Processed images are moved to --done_dir, or deleted if no done directory is given.
+
+"""
+
+import argparse
+import csv
+import os
+import queue
+import signal
+import threading
+import time
+
+from config.license_recognition import config
+from utils.inference import PlateDetector, LicenseRecognizer, LicensePlatePipeline
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# marks the end of the stream for the next stage
+STOP = None
+
+
+class SpoolWatcher:
+    def __init__(self, spool_dir, poll_interval=1.0, settle_time=1.0):
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+
+        try:
+            import inotify_simple
+            self.inotify = inotify_simple.INotify()
+            self.inotify.add_watch(spool_dir, inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO)
+        except (ImportError, OSError):
+            # inotify is not available (missing package or not on Linux), poll the directory instead
+            self.inotify = None
+
+    @staticmethod
+    def is_image(name):
+        return name.lower().endswith(IMAGE_EXTENSIONS) and not name.startswith(".")
+
+    def scan(self):
+        # files are only reported once they haven't been modified for settle_time seconds,
+        # to not pick up images the camera is still writing
+        now = time.time()
+        paths = []
+        with os.scandir(self.spool_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and self.is_image(entry.name) and now - entry.stat().st_mtime >= self.settle_time:
+                    paths.append(entry.path)
+        return sorted(paths)
+
+    def wait(self):
+        if self.inotify is None:
+            time.sleep(self.poll_interval)
+            return self.scan()
+
+        events = self.inotify.read(timeout=int(self.poll_interval * 1000))
+        if not events:
+            # rescan when idle, events may have been dropped by the kernel while the pipeline was blocked
+            return self.scan()
+
+        return [os.path.join(self.spool_dir, e.name) for e in events if self.is_image(e.name)]
+
+    def watch(self, stop_event):
+        # files present at startup are processed first, afterwards only new files are reported
+        yield self.scan()
+        while not stop_event.is_set():
+            yield self.wait()
+
+
+class IngestPipeline:
+    def __init__(self, detector, recognizer, output_path, done_dir=None, queue_size=32):
+        self.detector = detector
+        self.recognizer = recognizer
+        self.done_dir = done_dir
+
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.detect_queue = queue.Queue(maxsize=queue_size)
+        self.recognize_queue = queue.Queue(maxsize=queue_size)
+
+        # paths which entered the pipeline but are not completed yet, the watcher reports them again otherwise
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.processed = 0
+
+        exists = os.path.exists(output_path)
+        self.output = open(output_path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.output)
+        if not exists:
+            self.writer.writerow(["file", "number", "score", "time"])
+
+        if done_dir is not None:
+            os.makedirs(done_dir, exist_ok=True)
+
+    @staticmethod
+    def __put__(q, item, stop_event):
+        # blocks while the next stage is busy, this is the backpressure of the pipeline
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def submit(self, path, stop_event):
+        with self.lock:
+            if path in self.in_flight:
+                return
+            self.in_flight.add(path)
+
+        if not self.__put__(self.decode_queue, path, stop_event):
+            with self.lock:
+                self.in_flight.discard(path)
+
+    def decode_stage(self):
+        while True:
+            path = self.decode_queue.get()
+            if path is STOP:
+                self.detect_queue.put(STOP)
+                return
+
+            try:
+                image = LicensePlatePipeline.load_image(path)
+            except OSError:
+                image = None  # file vanished or is unreadable
+            except Exception as e:
+                # a failed item must not end the stage, the queues would fill up and block the watcher
+                self.__warn__(path, e)
+                image = None
+            self.detect_queue.put((path, image))
+
+    def detect_stage(self):
+        while True:
+            item = self.detect_queue.get()
+            if item is STOP:
+                self.recognize_queue.put(STOP)
+                return
+
+            path, image = item
+            try:
+                detection = self.detector.detect(image) if image is not None else None
+                plate_img = PlateDetector.crop(image, detection[0]) if detection is not None else None
+            except Exception as e:
+                self.__warn__(path, e)
+                detection = plate_img = None
+
+            if detection is None:
+                self.recognize_queue.put((path, None, 0.))
+                continue
+            self.recognize_queue.put((path, plate_img, detection[1]))
+
+    def recognize_stage(self):
+        while True:
+            item = self.recognize_queue.get()
+            if item is STOP:
+                return
+
+            path, plate_img, score = item
+            try:
+                number = self.recognizer.recognize(plate_img) if plate_img is not None and plate_img.size > 0 \
+                    else None
+            except Exception as e:
+                self.__warn__(path, e)
+                number = None
+
+            try:
+                self.complete(path, number, score)
+            except Exception as e:
+                self.__warn__(path, e)
+                with self.lock:
+                    self.in_flight.discard(path)
+
+    @staticmethod
+    def __warn__(path, error):
+        print("[WARNING] {}: {}: {}".format(path, type(error).__name__, error))
+
+    def complete(self, path, number, score):
+        # the result is on disk before the image leaves the spool directory
+        self.writer.writerow([os.path.basename(path), number, score, time.strftime("%Y-%m-%dT%H:%M:%S")])
+        self.output.flush()
+
+        try:
+            if self.done_dir is None:
+                os.remove(path)
+            else:
+                # atomic within the same file system
+                os.replace(path, os.path.join(self.done_dir, os.path.basename(path)))
+        except FileNotFoundError:
+            pass
+
+        with self.lock:
+            self.in_flight.discard(path)
+            self.processed += 1
+
+    def run(self, watcher, stop_event):
+        stages = [threading.Thread(target=stage, daemon=True)
+                  for stage in (self.decode_stage, self.detect_stage, self.recognize_stage)]
+        for stage in stages:
+            stage.start()
+
+        for paths in watcher.watch(stop_event):
+            for path in paths:
+                self.submit(path, stop_event)
+
+        # drain the queues and let every stage finish its pending work
+        self.decode_queue.put(STOP)
+        for stage in stages:
+            stage.join()
+        self.output.close()
+
+
+def main():
+    # Initiate argument parser
+    parser = argparse.ArgumentParser(description="Recognize license plates of images dropped into a spool directory")
+    parser.add_argument("--spool_dir", help="Directory the cameras write their images to", type=str, required=True)
+    parser.add_argument("--output", help="Result CSV file", type=str, required=True)
+    parser.add_argument("--done_dir", help="Processed images are moved here, deleted if omitted", type=str,
+                        default=None)
+    parser.add_argument("--detection_model", help="Path to the plate detection TFLite model", type=str,
+                        default="output/plate_detection/glpd-model.tflite")
+    parser.add_argument("--recognition_model", help="Path to the license recognition TFLite model", type=str,
+                        default="output/license_recognition/glpr-model.tflite")
+    parser.add_argument("--score_threshold", help="Minimum plate detection score", type=float, default=0.5)
+    parser.add_argument("--queue_size", help="Capacity of the queues between the stages", type=int, default=32)
+    parser.add_argument("--poll_interval", help="Polling interval in seconds without inotify", type=float,
+                        default=1.0)
+    args = parser.parse_args()
+
+    detector = PlateDetector(args.detection_model, args.score_threshold)
+    recognizer = LicenseRecognizer(args.recognition_model, config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
+    pipeline = IngestPipeline(detector, recognizer, args.output, args.done_dir, args.queue_size)
+    watcher = SpoolWatcher(args.spool_dir, args.poll_interval)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    print("[INFO] watching {} ({})".format(args.spool_dir, "polling" if watcher.inotify is None else "inotify"))
+    pipeline.run(watcher, stop_event)
+    print("[INFO] {} images processed".format(pipeline.processed))
+
+
+if __name__ == '__main__':
+    main()